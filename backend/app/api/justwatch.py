@@ -1,33 +1,138 @@
 """
 API routes for JustWatch functionality
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+import json
+import math
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from typing import List, Optional
 from app.models.justwatch_models import (
     SearchTitlesResponse,
     TitleNode,
-    TitleOfferViewModel
+    TitleOfferViewModel,
+    TitleFullResponse,
+    PriceHistoryPoint,
+    BestOffersResponse
 )
+from app import config
 from app.services.justwatch_service import JustWatchService
 from app.services.currency_converter import CurrencyConverter
+from app.services import metrics
+from app.services.http_cache import NO_STORE, cache_policy
+from app.services.offer_columns import COLUMNAR_MEDIA_TYPE, encode_offers_columnar, wants_columnar
+from app.services.offer_filters import OfferQuery, SORT_KEYS, apply_offer_query
+from app.services.resilience import UpstreamUnavailableError
 
 router = APIRouter(prefix="/api/justwatch", tags=["justwatch"])
 
+_TITLE_POLICY = cache_policy(config.HTTP_CACHE_TITLE_MAX_AGE, config.HTTP_CACHE_TITLE_MAX_AGE * 24)
+_OFFERS_POLICY = cache_policy(config.HTTP_CACHE_OFFERS_MAX_AGE, config.HTTP_CACHE_OFFERS_MAX_AGE * 12)
+_SEARCH_POLICY = cache_policy(config.HTTP_CACHE_SEARCH_MAX_AGE, config.HTTP_CACHE_SEARCH_MAX_AGE * 5)
+
+# Cache-Control per route path, applied by HttpCacheMiddleware
+cache_policies = {
+    "/api/justwatch/search": _SEARCH_POLICY,
+    "/api/justwatch/suggest": _SEARCH_POLICY,
+    "/api/justwatch/title/{node_id}": _TITLE_POLICY,
+    "/api/justwatch/titles": _TITLE_POLICY,
+    "/api/justwatch/locales": _TITLE_POLICY,
+    "/api/justwatch/title/{node_id}/full": _OFFERS_POLICY,
+    "/api/justwatch/offers/{node_id}": _OFFERS_POLICY,
+    "/api/justwatch/offers/{node_id}/stream": _OFFERS_POLICY,
+    "/api/justwatch/offers/{node_id}/history": _OFFERS_POLICY,
+    "/api/justwatch/offers/{node_id}/best": _OFFERS_POLICY,
+    "/api/justwatch/cache/stats": NO_STORE,
+}
+
 # Initialize services
 currency_converter = CurrencyConverter()
 justwatch_service = JustWatchService(currency_converter)
 
+offer_list_adapter = TypeAdapter(List[TitleOfferViewModel])
+suggestion_list_adapter = TypeAdapter(List[dict])
+title_list_adapter = TypeAdapter(List[Optional[TitleNode]])
+
+
+def _dump_compact(body: dict) -> bytes:
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _error_response(e: Exception) -> HTTPException:
+    """Map a service error to an HTTP error - 503 with Retry-After when the upstream is unavailable"""
+    if isinstance(e, UpstreamUnavailableError):
+        return HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def _cache_events():
+    """Scrape-time samples for the cache and coalescing counters"""
+    events = {}
+    for cache, stats in justwatch_service.cache_stats().items():
+        if cache in ("scheduler", "prefetch", "queryTemplates"):
+            continue
+        if cache == "singleFlight":
+            events[("single_flight", "calls")] = stats["calls"]
+            events[("single_flight", "coalesced")] = stats["coalesced"]
+        else:
+            for event in ("hits", "sharedHits", "staleHits", "misses", "evictions", "fallbacks"):
+                events[(cache, event)] = stats[event]
+    return events
+
+
+def _cache_sizes():
+    sizes = {}
+    for cache, stats in justwatch_service.cache_stats().items():
+        if cache in ("scheduler", "prefetch", "queryTemplates"):
+            continue
+        if cache == "singleFlight":
+            sizes[("single_flight",)] = stats["inFlight"]
+        else:
+            sizes[(cache,)] = stats["size"]
+    return sizes
+
+
+metrics.registry.register(metrics.CallbackMetric(
+    "justwatch_cache_events_total", "Cache and request-coalescing events", ("cache", "event"), _cache_events, "counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "justwatch_cache_entries", "Entries held per cache (in-flight calls for single_flight)", ("cache",), _cache_sizes
+))
+
 
 @router.get("/search", response_model=SearchTitlesResponse)
 async def search_titles(
     q: str = Query(..., description="Search query"),
-    country: str = Query("US", description="Country code")
+    country: str = Query("US", description="Country code"),
+    prefetch: Optional[bool] = Query(
+        None, description="Warm the top results in the background (default: JUSTWATCH_PREFETCH_ON_SEARCH, off)"
+    ),
+    enrich: bool = Query(False, description="Add an offer summary per result for the country")
 ):
     """Search for movies and TV shows"""
     try:
-        return await justwatch_service.search_titles(q, country)
+        if prefetch is None:
+            prefetch = config.PREFETCH_ON_SEARCH
+        return await justwatch_service.search_titles(q, country, prefetch=prefetch, enrich=enrich)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _error_response(e)
+
+
+@router.get("/suggest", response_model=List[TitleNode])
+async def suggest_titles(
+    q: str = Query(..., description="Partial title typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions")
+):
+    """Instant title suggestions from titles already seen by this server"""
+    # Entries are stored already in the response shape - skip re-validation
+    return Response(
+        content=suggestion_list_adapter.dump_json(justwatch_service.suggest_titles(q, limit)),
+        media_type="application/json"
+    )
 
 
 @router.get("/title/{node_id}", response_model=TitleNode)
@@ -41,20 +146,186 @@ async def get_title(node_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _error_response(e)
+
+
+@router.get("/title/{node_id}/full", response_model=TitleFullResponse)
+async def get_title_full(
+    node_id: str,
+    path: Optional[str] = Query(None, description="Full path of the title, if known - saves a round-trip"),
+    format: Optional[str] = Query(None, pattern="^(rows|compact)$", description="'compact' for columnar offers"),
+    accept: Optional[str] = Header(None)
+):
+    """Get title details, locales and all offers in one response"""
+    try:
+        full = await justwatch_service.get_title_full(node_id, path)
+        if full is None:
+            raise HTTPException(status_code=404, detail="Title not found")
+        headers = {"Vary": "Accept"}
+        if full.failed_countries:
+            headers["X-Failed-Countries"] = ",".join(full.failed_countries)
+        if wants_columnar(format, accept):
+            with metrics.time_stage("serialize"):
+                body = full.model_dump(mode="json", by_alias=True, exclude={"offers"})
+                body["offers"] = encode_offers_columnar(full.offers)
+                columnar = _dump_compact(body)
+            # Its own media type, as on /offers - the encodings must not share a Content-Type
+            return Response(content=columnar, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+        with metrics.time_stage("serialize"):
+            content = full.model_dump_json(by_alias=True)
+        return Response(content=content, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_response(e)
+
+
+@router.get("/titles", response_model=List[Optional[TitleNode]])
+async def get_titles(
+    ids: List[str] = Query(..., description="Node IDs, repeated or comma-separated")
+):
+    """Get details for many titles in one call, in request order (null for missing titles)
+
+    IDs whose lookup failed are null too and listed in the X-Failed-Ids header.
+    """
+    node_ids = [node_id.strip() for value in ids for node_id in value.split(",") if node_id.strip()]
+    if not node_ids:
+        raise HTTPException(status_code=400, detail="No title IDs given")
+    if len(node_ids) > config.TITLES_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {config.TITLES_MAX_IDS} title IDs per request")
+    try:
+        titles, failed_ids = await justwatch_service.get_titles(node_ids)
+        headers = {}
+        if failed_ids:
+            # Partial result - tell the client which titles to retry
+            headers["X-Failed-Ids"] = ",".join(failed_ids)
+        content = title_list_adapter.dump_json(titles, by_alias=True)
+        return Response(content=content, media_type="application/json", headers=headers)
+    except Exception as e:
+        raise _error_response(e)
 
 
 @router.get("/offers/{node_id}", response_model=List[TitleOfferViewModel])
 async def get_title_offers(
     node_id: str,
-    path: str = Query(..., description="Full path of the title")
+    path: str = Query(..., description="Full path of the title"),
+    monetization_type: Optional[List[str]] = Query(None, description="Only these monetization types (e.g. FLATRATE,RENT)"),
+    exclude_monetization_type: Optional[List[str]] = Query(None, description="Drop these monetization types (e.g. CINEMA)"),
+    presentation_type: Optional[List[str]] = Query(None, description="Only these presentation types (e.g. HD,_4K)"),
+    country: Optional[List[str]] = Query(None, description="Only these country codes"),
+    max_price: Optional[float] = Query(None, description="Maximum normalized USD price"),
+    provider: Optional[str] = Query(None, description="Provider name contains"),
+    cheapest: bool = Query(False, description="Keep only the cheapest offer per country and provider"),
+    sort: Optional[str] = Query(None, description=f"Sort key: {', '.join(SORT_KEYS)}"),
+    order: str = Query("asc", description="Sort direction: asc or desc"),
+    limit: Optional[int] = Query(None, description="Page size; the next page cursor is returned in X-Next-Cursor"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    format: Optional[str] = Query(None, pattern="^(rows|compact)$", description="'compact' for the columnar form"),
+    accept: Optional[str] = Header(None)
 ):
     """Get all offers for a title across all countries"""
     try:
-        offers = await justwatch_service.get_all_offers(node_id, path)
-        return offers
+        offer_query = OfferQuery(
+            monetization_types=monetization_type or [],
+            exclude_monetization_types=exclude_monetization_type or [],
+            presentation_types=presentation_type or [],
+            countries=country or [],
+            max_price=max_price,
+            provider=provider,
+            cheapest=cheapest,
+            sort=sort,
+            order=order,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        offers_response = await justwatch_service.get_all_offers_response(node_id, path)
+        headers = {}
+        if offers_response and offers_response.failed_countries:
+            # Partial result - tell the client which countries are missing
+            headers["X-Failed-Countries"] = ",".join(offers_response.failed_countries)
+        offers = justwatch_service.build_title_offer_view_models(node_id, offers_response)
+        page, next_cursor = apply_offer_query(offers, offer_query)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        # The representation depends on Accept as well as the URL
+        headers["Vary"] = "Accept"
+        if wants_columnar(format, accept):
+            with metrics.time_stage("serialize"):
+                content = _dump_compact(encode_offers_columnar(page))
+            return Response(content=content, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+        # Serialize straight to JSON bytes; the view models are built from validated data,
+        # so skip FastAPI's response_model re-validation
+        with metrics.time_stage("serialize"):
+            content = offer_list_adapter.dump_json(page, by_alias=True)
+        return Response(content=content, media_type="application/json", headers=headers)
+    except Exception as e:
+        raise _error_response(e)
+
+
+@router.get("/offers/{node_id}/stream")
+async def stream_title_offers(
+    node_id: str,
+    path: str = Query(..., description="Full path of the title")
+):
+    """Stream offers as newline-delimited JSON, one batch per country shard as it resolves"""
+    batches = justwatch_service.stream_all_offers(node_id, path)
+    try:
+        # Resolve locales and the first shard before committing to a 200
+        first_batch = await anext(batches, None)
+    except Exception as e:
+        await batches.aclose()
+        raise _error_response(e)
+
+    async def ndjson():
+        try:
+            if first_batch is not None:
+                yield first_batch.model_dump_json(by_alias=True) + "\n"
+            async for batch in batches:
+                yield batch.model_dump_json(by_alias=True) + "\n"
+        finally:
+            await batches.aclose()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/offers/{node_id}/best", response_model=BestOffersResponse)
+async def get_best_offers(
+    node_id: str,
+    path: Optional[str] = Query(None, description="Full path of the title, needed only if its offers aren't cached"),
+    monetization_type: Optional[str] = Query(None, description="Only this monetization type (e.g. RENT)"),
+    provider: Optional[str] = Query(None, description="Only this provider (exact name, any case)"),
+    quality: Optional[str] = Query(None, description="Only this quality: 4K, HD or SD"),
+    limit: Optional[int] = Query(None, ge=1, description="Cheapest countries to return")
+):
+    """Cheapest countries and price percentiles for a title, from its precomputed price index"""
+    try:
+        best = await justwatch_service.get_best_offers(node_id, path, monetization_type, provider, quality, limit)
+        if best is None:
+            raise HTTPException(status_code=404, detail="Title not found")
+        return Response(content=best.model_dump_json(by_alias=True), media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _error_response(e)
+
+
+@router.get("/offers/{node_id}/history", response_model=List[PriceHistoryPoint])
+async def get_price_history(
+    node_id: str,
+    country: Optional[str] = Query(None, description="Country code"),
+    offer_id: Optional[str] = Query(None, description="Offer ID")
+):
+    """Get recorded price changes for a title from the local offer store"""
+    if justwatch_service.offer_store is None:
+        raise HTTPException(status_code=503, detail="Offer store is disabled")
+    try:
+        return await justwatch_service.get_price_history(node_id, country, offer_id)
+    except Exception as e:
+        raise _error_response(e)
 
 
 @router.get("/locales")
@@ -64,4 +335,10 @@ async def get_available_locales(path: str = Query(..., description="Full path of
         locales = await justwatch_service.get_available_locales(path)
         return {"locales": locales}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _error_response(e)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss counters for the response caches"""
+    return justwatch_service.cache_stats()
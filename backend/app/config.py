@@ -0,0 +1,127 @@
+"""
+Runtime settings for the backend, read from environment variables
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Upstream endpoints (overridable to point at a local stand-in, see benchmarks/mock_upstream.py)
+JUSTWATCH_API_BASE_URL = os.getenv("JUSTWATCH_API_BASE_URL", "https://apis.justwatch.com")
+EXCHANGE_RATE_URL = os.getenv("JUSTWATCH_EXCHANGE_RATE_URL", "https://open.er-api.com/v6/latest/USD")
+
+# Upstream HTTP client
+HTTP2_ENABLED = _env_bool("JUSTWATCH_HTTP2", True)
+HTTP_TIMEOUT = _env_float("JUSTWATCH_HTTP_TIMEOUT", 30.0)
+HTTP_MAX_CONNECTIONS = _env_int("JUSTWATCH_HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = _env_int("JUSTWATCH_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+HTTP_KEEPALIVE_EXPIRY = _env_float("JUSTWATCH_HTTP_KEEPALIVE_EXPIRY", 30.0)
+
+# Response cache (TTLs in seconds)
+CACHE_MAX_SIZE = _env_int("JUSTWATCH_CACHE_MAX_SIZE", 5000)
+CACHE_TITLE_TTL = _env_float("JUSTWATCH_CACHE_TITLE_TTL", 6 * 60 * 60)
+CACHE_URL_TTL = _env_float("JUSTWATCH_CACHE_URL_TTL", 6 * 60 * 60)
+CACHE_SEARCH_TTL = _env_float("JUSTWATCH_CACHE_SEARCH_TTL", 5 * 60)
+CACHE_OFFER_SUMMARY_TTL = _env_float("JUSTWATCH_CACHE_OFFER_SUMMARY_TTL", 30 * 60)
+CACHE_STALE_TTL = _env_float("JUSTWATCH_CACHE_STALE_TTL", 60 * 60)
+
+# Price comparison index per title: cheapest countries kept per filter
+PRICE_INDEX_TOP_N = _env_int("JUSTWATCH_PRICE_INDEX_TOP_N", 10)
+PRICE_INDEX_CACHE_SIZE = _env_int("JUSTWATCH_PRICE_INDEX_CACHE_SIZE", 500)
+
+# Offers fan-out: countries per GraphQL query (0 = one query for all countries)
+OFFERS_SHARD_SIZE = _env_int("JUSTWATCH_OFFERS_SHARD_SIZE", 20)
+OFFERS_SHARD_CONCURRENCY = _env_int("JUSTWATCH_OFFERS_SHARD_CONCURRENCY", 8)
+
+# Exchange rates
+CURRENCY_SNAPSHOT_PATH = os.getenv(
+    "JUSTWATCH_CURRENCY_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "exchange_rates.json")
+)
+CURRENCY_REFRESH_TTL = _env_float("JUSTWATCH_CURRENCY_REFRESH_TTL", 6 * 60 * 60)
+CURRENCY_RETRY_INTERVAL = _env_float("JUSTWATCH_CURRENCY_RETRY_INTERVAL", 5 * 60)
+
+# Batched title lookups
+TITLES_BATCH_SIZE = _env_int("JUSTWATCH_TITLES_BATCH_SIZE", 25)
+TITLES_MAX_IDS = _env_int("JUSTWATCH_TITLES_MAX_IDS", 100)
+
+# Persistent offer store (SQLite)
+OFFER_STORE_ENABLED = _env_bool("JUSTWATCH_OFFER_STORE_ENABLED", True)
+OFFER_STORE_PATH = os.getenv(
+    "JUSTWATCH_OFFER_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "offers.sqlite3")
+)
+OFFER_STORE_TTL = _env_float("JUSTWATCH_OFFER_STORE_TTL", 60 * 60)
+OFFER_STORE_RETENTION_DAYS = _env_float("JUSTWATCH_OFFER_STORE_RETENTION_DAYS", 90)
+OFFER_STORE_MAX_TITLES = _env_int("JUSTWATCH_OFFER_STORE_MAX_TITLES", 20000)
+
+# Host-wide L2 response cache shared by uvicorn workers (SQLite)
+SHARED_CACHE_ENABLED = _env_bool("JUSTWATCH_SHARED_CACHE_ENABLED", False)
+SHARED_CACHE_PATH = os.getenv(
+    "JUSTWATCH_SHARED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "shared_cache.sqlite3")
+)
+SHARED_CACHE_MAX_ENTRIES = _env_int("JUSTWATCH_SHARED_CACHE_MAX_ENTRIES", 50000)
+
+# Typeahead suggestions
+SUGGEST_SNAPSHOT_PATH = os.getenv(
+    "JUSTWATCH_SUGGEST_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "suggestions.json")
+)
+SUGGEST_MAX_ENTRIES = _env_int("JUSTWATCH_SUGGEST_MAX_ENTRIES", 50000)
+SUGGEST_SNAPSHOT_INTERVAL = _env_float("JUSTWATCH_SUGGEST_SNAPSHOT_INTERVAL", 5 * 60)
+
+# HTTP caching and compression of API responses (max-ages in seconds)
+HTTP_CACHE_TITLE_MAX_AGE = _env_int("JUSTWATCH_HTTP_CACHE_TITLE_MAX_AGE", 60 * 60)
+HTTP_CACHE_OFFERS_MAX_AGE = _env_int("JUSTWATCH_HTTP_CACHE_OFFERS_MAX_AGE", 5 * 60)
+HTTP_CACHE_SEARCH_MAX_AGE = _env_int("JUSTWATCH_HTTP_CACHE_SEARCH_MAX_AGE", 60)
+COMPRESSION_MIN_SIZE = _env_int("JUSTWATCH_COMPRESSION_MIN_SIZE", 1024)
+COMPRESSION_THREAD_THRESHOLD = _env_int("JUSTWATCH_COMPRESSION_THREAD_THRESHOLD", 64 * 1024)
+
+# Observability
+SERVER_TIMING_ENABLED = _env_bool("JUSTWATCH_SERVER_TIMING", False)
+
+# Upstream resilience
+RETRY_MAX_ATTEMPTS = _env_int("JUSTWATCH_RETRY_MAX_ATTEMPTS", 2)
+RETRY_BACKOFF_BASE = _env_float("JUSTWATCH_RETRY_BACKOFF_BASE", 0.1)
+RETRY_BACKOFF_MAX = _env_float("JUSTWATCH_RETRY_BACKOFF_MAX", 2.0)
+RETRY_BUDGET_RATIO = _env_float("JUSTWATCH_RETRY_BUDGET_RATIO", 0.1)
+RETRY_BUDGET_CAP = _env_float("JUSTWATCH_RETRY_BUDGET_CAP", 20)
+HEDGE_ENABLED = _env_bool("JUSTWATCH_HEDGE_ENABLED", True)
+HEDGE_PERCENTILE = _env_float("JUSTWATCH_HEDGE_PERCENTILE", 95)
+HEDGE_MIN_DELAY = _env_float("JUSTWATCH_HEDGE_MIN_DELAY", 0.05)
+BREAKER_FAILURE_THRESHOLD = _env_int("JUSTWATCH_BREAKER_FAILURE_THRESHOLD", 5)
+BREAKER_RESET_TIMEOUT = _env_float("JUSTWATCH_BREAKER_RESET_TIMEOUT", 30)
+
+# Upstream admission control
+SCHEDULER_MAX_CONCURRENCY = _env_int("JUSTWATCH_SCHEDULER_MAX_CONCURRENCY", 32)
+SCHEDULER_INTERACTIVE_QUEUE = _env_int("JUSTWATCH_SCHEDULER_INTERACTIVE_QUEUE", 200)
+SCHEDULER_BULK_QUEUE = _env_int("JUSTWATCH_SCHEDULER_BULK_QUEUE", 64)
+SCHEDULER_INTERACTIVE_TIMEOUT = _env_float("JUSTWATCH_SCHEDULER_INTERACTIVE_TIMEOUT", 5)
+SCHEDULER_BULK_TIMEOUT = _env_float("JUSTWATCH_SCHEDULER_BULK_TIMEOUT", 15)
+SCHEDULER_BACKGROUND_QUEUE = _env_int("JUSTWATCH_SCHEDULER_BACKGROUND_QUEUE", 16)
+SCHEDULER_BACKGROUND_TIMEOUT = _env_float("JUSTWATCH_SCHEDULER_BACKGROUND_TIMEOUT", 2)
+SCHEDULER_BACKGROUND_SHARE = _env_float("JUSTWATCH_SCHEDULER_BACKGROUND_SHARE", 0.25)
+
+# Speculative prefetch of the top search results (0 = off); searches opt in with
+# prefetch=true unless PREFETCH_ON_SEARCH makes it the default
+PREFETCH_ON_SEARCH = _env_bool("JUSTWATCH_PREFETCH_ON_SEARCH", False)
+PREFETCH_TOP_K = _env_int("JUSTWATCH_PREFETCH_TOP_K", 3)
+PREFETCH_MAX_PENDING = _env_int("JUSTWATCH_PREFETCH_MAX_PENDING", 6)
+PREFETCH_BUSY_UTILIZATION = _env_float("JUSTWATCH_PREFETCH_BUSY_UTILIZATION", 0.5)
+PREFETCH_USAGE_WINDOW = _env_float("JUSTWATCH_PREFETCH_USAGE_WINDOW", 10 * 60)
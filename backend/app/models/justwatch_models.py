@@ -1,7 +1,8 @@
 """
 Pydantic models for JustWatch API responses and requests
 """
-from typing import Optional, List, Dict, Any
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -47,8 +48,21 @@ class SearchResult(BaseModel):
     edges: List[TitleNodeWrapper] = Field(default_factory=list)
 
 
+class OfferSummary(BaseModel):
+    """Offer availability for one title in one country, as shown on a search result"""
+    offer_count: int = Field(0, alias="offerCount")
+    monetization_counts: Dict[str, int] = Field(default_factory=dict, alias="monetizationCounts")
+    cheapest_price: Optional[float] = Field(None, alias="cheapestPrice")
+    cheapest_provider: Optional[str] = Field(None, alias="cheapestProvider")
+    top_providers: List[str] = Field(default_factory=list, alias="topProviders")
+
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
 class SearchTitlesResponse(BaseModel):
     popular_titles: SearchResult = Field(..., alias="popularTitles")
+    # Keyed by node ID; only present when enrichment was requested
+    offer_summaries: Optional[Dict[str, OfferSummary]] = Field(None, alias="offerSummaries")
 
 
 class OfferPackage(BaseModel):
@@ -59,7 +73,8 @@ class OfferPackage(BaseModel):
     icon: Optional[str] = None
 
 
-class OfferDetails(BaseModel):
+class OfferPricing(BaseModel):
+    """The price and provider of an offer - what the pricing query profile selects"""
     id: str
     presentation_type: Optional[str] = Field(None, alias="presentationType")
     monetization_type: Optional[str] = Field(None, alias="monetizationType")
@@ -69,6 +84,9 @@ class OfferDetails(BaseModel):
     last_change_retail_price_value: Optional[float] = Field(None, alias="lastChangeRetailPriceValue")
     type: Optional[str] = None
     package: Optional[OfferPackage] = None
+
+
+class OfferDetails(OfferPricing):
     standard_web_url: Optional[str] = Field(None, alias="standardWebURL")
     element_count: Optional[int] = Field(None, alias="elementCount")
     available_to: Optional[Any] = Field(None, alias="availableTo")
@@ -79,8 +97,34 @@ class OfferDetails(BaseModel):
     audio_languages: Optional[List[str]] = Field(None, alias="audioLanguages")
 
 
-class GetOffersResponse(BaseModel):
-    node: Dict[str, List[OfferDetails]]
+OfferT = TypeVar("OfferT", bound=OfferPricing)
+
+
+class GetOffersResponse(BaseModel, Generic[OfferT]):
+    """Offers per lowercase country - GetOffersResponse[OfferDetails] for the full profile,
+    GetOffersResponse[OfferPricing] for the pricing one"""
+    node: Dict[str, List[OfferT]]
+    failed_countries: List[str] = Field(default_factory=list, alias="failedCountries")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class OffersNodeData(BaseModel):
+    node: Optional[Dict[str, Optional[List[OfferDetails]]]] = None
+
+
+class GetOffersEnvelope(BaseModel):
+    """Raw GetTitleOffers GraphQL body - countries that failed upstream are null"""
+    data: Optional[OffersNodeData] = None
+
+
+class OfferPricingNodeData(BaseModel):
+    node: Optional[Dict[str, Optional[List[OfferPricing]]]] = None
+
+
+class GetOfferPricingEnvelope(BaseModel):
+    """Raw GetTitleOffers GraphQL body for the pricing profile"""
+    data: Optional[OfferPricingNodeData] = None
 
 
 class UrlMetadataResponse(BaseModel):
@@ -107,3 +151,81 @@ class TitleOfferViewModel(BaseModel):
     offer_details: OfferDetails = Field(alias="offerDetails")
 
     model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class OffersBatch(BaseModel):
+    offers: List[TitleOfferViewModel] = Field(default_factory=list)
+    failed_countries: List[str] = Field(default_factory=list, alias="failedCountries")
+
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class TitleFullResponse(BaseModel):
+    title: TitleNode
+    locales: List[str] = Field(default_factory=list)
+    offers: List[TitleOfferViewModel] = Field(default_factory=list)
+    failed_countries: List[str] = Field(default_factory=list, alias="failedCountries")
+
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class PriceHistoryPoint(BaseModel):
+    country: str
+    offer_id: str = Field(alias="offerId")
+    currency: Optional[str] = None
+    price: Optional[float] = None
+    recorded_at: datetime = Field(alias="recordedAt")
+
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class PriceEntry(BaseModel):
+    """The cheapest offer of a country within a price comparison group"""
+    country: str
+    provider: Optional[str] = None
+    monetization_type: Optional[str] = Field(None, alias="monetizationType")
+    presentation_type: Optional[str] = Field(None, alias="presentationType")
+    retail_price: Optional[str] = Field(None, alias="retailPrice")
+    retail_price_value: Optional[float] = Field(None, alias="retailPriceValue")
+    currency: Optional[str] = None
+    normalized_price: float = Field(alias="normalizedPrice")
+    package_url: Optional[str] = Field(None, alias="packageUrl")
+
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class PricePercentiles(BaseModel):
+    min: float
+    p25: float
+    median: float
+    p75: float
+    max: float
+
+
+class PriceFacets(BaseModel):
+    """Filter values a title's price index can be queried with"""
+    monetization_types: List[str] = Field(default_factory=list, alias="monetizationTypes")
+    providers: List[str] = Field(default_factory=list)
+    qualities: List[str] = Field(default_factory=list)
+
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
+
+
+class BestOffersResponse(BaseModel):
+    """Cheapest countries and price spread for one (monetization type, provider, quality) filter"""
+    node_id: str = Field(alias="nodeId")
+    monetization_type: Optional[str] = Field(None, alias="monetizationType")
+    provider: Optional[str] = None
+    quality: Optional[str] = None
+    offer_count: int = Field(0, alias="offerCount")
+    priced_count: int = Field(0, alias="pricedCount")
+    unknown_currency_count: int = Field(0, alias="unknownCurrencyCount")
+    unknown_currencies: List[str] = Field(default_factory=list, alias="unknownCurrencies")
+    cheapest: List[PriceEntry] = Field(default_factory=list)
+    percentiles: Optional[PricePercentiles] = None
+    facets: PriceFacets = Field(default_factory=PriceFacets)
+    # Countries whose offers could not be fetched - the ranking may be missing them
+    failed_countries: List[str] = Field(default_factory=list, alias="failedCountries")
+    built_at: float = Field(alias="builtAt")
+
+    model_config = ConfigDict(populate_by_name=True, by_alias=True)
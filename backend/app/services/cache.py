@@ -0,0 +1,178 @@
+"""
+In-process response cache with TTL expiry, LRU eviction and stale-while-revalidate
+
+An optional shared L2 (see shared_cache.py) is consulted on local misses and written
+through on loads, so workers on the same host warm each other's caches.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+if TYPE_CHECKING:
+    from app.services.shared_cache import SharedCacheNamespace
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class TTLCache:
+    def __init__(self, name: str, max_size: int, ttl: float, stale_ttl: float = 0.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.shared: Optional["SharedCacheNamespace"] = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fallbacks = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for key (fresh or stale) and mark it recently used
+
+        Expired entries stay in place until evicted so they can back a failed load.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.stale_until <= time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entries if full"""
+        now = time.monotonic()
+        self._store(key, CacheEntry(value, now + self.ttl, now + self.ttl + self.stale_ttl))
+        if self.shared is not None:
+            self.shared.put(key, value, self.ttl, self.stale_ttl)
+
+    def _store(self, key: Hashable, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_fresh(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value, counting the lookup as a hit or miss"""
+        entry = self.get(key)
+        if entry is not None and entry.fresh_until > time.monotonic():
+            self.hits += 1
+            return entry.value
+        self.misses += 1
+        return None
+
+    async def get_cached(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        """Return a cached value from this cache or the shared one, or None on a miss
+
+        Stale entries are returned and revalidated in the background with loader, as in
+        get_or_load; a miss is counted but not loaded, so callers can batch their misses.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            if entry.fresh_until > time.monotonic():
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._revalidate(key, loader)
+            return entry.value
+
+        if self.shared is not None:
+            entry = await self._get_shared(key)
+            if entry is not None:
+                self.shared_hits += 1
+                if entry.fresh_until <= time.monotonic():
+                    self._revalidate(key, loader)
+                return entry.value
+
+        self.misses += 1
+        return None
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached value, loading it on a miss and revalidating stale entries in the background"""
+        # None is never stored, so it always means a miss
+        value = await self.get_cached(key, loader)
+        if value is not None:
+            return value
+
+        try:
+            value = await loader()
+        except Exception:
+            # Upstream failing - an expired value beats an error
+            expired = self._entries.get(key)
+            if expired is None:
+                raise
+            self.fallbacks += 1
+            return expired.value
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    async def _get_shared(self, key: Hashable) -> Optional[CacheEntry]:
+        """Copy an entry from the shared cache into this one, keeping its remaining lifetime"""
+        try:
+            shared = await self.shared.get(key)
+        except Exception as e:
+            logger.warning("Shared cache read failed for %s: %s", self.name, e)
+            return None
+        if shared is None:
+            return None
+        # Wall-clock expiry from the shared store, re-based onto this process's monotonic clock
+        offset = time.monotonic() - time.time()
+        entry = CacheEntry(shared.value, shared.fresh_until + offset, shared.stale_until + offset)
+        self._store(key, entry)
+        return entry
+
+    def _revalidate(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                value = await loader()
+                if value is not None:
+                    self.set(key, value)
+            except Exception:
+                # Keep serving the stale value until it expires or a refresh succeeds
+                pass
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "sharedHits": self.shared_hits,
+            "staleHits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "fallbacks": self.fallbacks,
+        }
@@ -1,27 +1,140 @@
 """
 Currency conversion service using exchange rate API
+
+Rates are loaded from an on-disk snapshot at startup, refreshed in the background and
+swapped in atomically. A failed refresh keeps the last good rates in use.
 """
+import asyncio
+import json
+import logging
+import os
+import random
+import time
 import httpx
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Sequence
+from app import config
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_CURRENCY_PRICE = 999.0
+
+# Spread refreshes across workers so one fetches and the rest pick up its snapshot
+REFRESH_JITTER = 30.0
 
 
 class CurrencyConverter:
-    def __init__(self):
-        self.api_url = "https://open.er-api.com/v6/latest/USD"
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        snapshot_path: Optional[str] = config.CURRENCY_SNAPSHOT_PATH,
+        refresh_ttl: float = config.CURRENCY_REFRESH_TTL,
+        retry_interval: float = config.CURRENCY_RETRY_INTERVAL
+    ):
+        self.api_url = config.EXCHANGE_RATE_URL
         self.rates: Optional[Dict[str, float]] = None
+        self.fetched_at: Optional[float] = None
         self.initialized = False
+        self.http_client = http_client
+        self.snapshot_path = snapshot_path
+        self.refresh_ttl = refresh_ttl
+        self.retry_interval = retry_interval
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Load the snapshot and start refreshing rates in the background"""
+        await asyncio.to_thread(self._load_snapshot)
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop the background refresh"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
 
     async def initialize(self):
-        """Fetch exchange rates from API"""
-        if not self.initialized:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.api_url)
-                if response.status_code == 200:
-                    data = response.json()
-                    self.rates = data.get("rates", {})
-                    self.initialized = True
-                else:
-                    raise Exception("Error fetching exchange rates")
+        """Make sure rates are available, fetching them if no snapshot was loaded"""
+        if self.initialized:
+            return
+        async with self._refresh_lock:
+            # Callers that queued on the lock during a cold start find the rates already fetched
+            if not self.initialized:
+                await self._fetch_rates()
+
+    async def refresh(self):
+        """Fetch exchange rates from API and swap them in"""
+        async with self._refresh_lock:
+            await self._fetch_rates()
+
+    async def _fetch_rates(self):
+        # Callers hold _refresh_lock
+        if self.http_client is None:
+            raise RuntimeError("HTTP client not initialized")
+        response = await self.http_client.get(self.api_url)
+        if response.status_code != 200:
+            raise Exception("Error fetching exchange rates")
+        rates = response.json().get("rates", {})
+        if not rates:
+            raise Exception("Exchange rate API returned no rates")
+        self._swap_rates(rates, time.time())
+        if self.snapshot_path:
+            await asyncio.to_thread(self._save_snapshot)
+
+    def _swap_rates(self, rates: Dict[str, float], fetched_at: float):
+        # A single reference assignment - readers see either the old or the new table
+        self.rates = rates
+        self.fetched_at = fetched_at
+        self.initialized = True
+
+    def _is_stale(self) -> bool:
+        return self.fetched_at is None or time.time() - self.fetched_at >= self.refresh_ttl
+
+    async def _refresh_loop(self):
+        while True:
+            if self._is_stale() and self.snapshot_path:
+                # Another worker may have refreshed the shared snapshot already
+                await asyncio.to_thread(self._load_snapshot)
+            if self._is_stale():
+                try:
+                    await self.refresh()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Exchange rate refresh failed, keeping previous rates: %s", e)
+                    await asyncio.sleep(self.retry_interval)
+                    continue
+            delay = max(self.fetched_at + self.refresh_ttl - time.time(), 1.0)
+            await asyncio.sleep(delay + random.uniform(0, REFRESH_JITTER))
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            rates = snapshot["rates"]
+            fetched_at = float(snapshot.get("fetchedAt", 0))
+            if rates and (self.fetched_at is None or fetched_at > self.fetched_at):
+                self._swap_rates(rates, fetched_at)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable exchange rate snapshot %s: %s", self.snapshot_path, e)
+
+    def _save_snapshot(self):
+        snapshot = {"fetchedAt": self.fetched_at, "rates": self.rates}
+        # Per-process temp file - several workers may write the same snapshot
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning("Could not write exchange rate snapshot %s: %s", self.snapshot_path, e)
 
     def convert_to_usd(self, currency_code: Optional[str], amount: float) -> float:
         """Convert amount in given currency to USD"""
@@ -32,4 +145,23 @@ class CurrencyConverter:
             exchange_rate = self.rates[currency_code]
             return round(amount / exchange_rate, 2)
         else:
-            return 999.0 if amount != 0 else 0.0
+            return UNKNOWN_CURRENCY_PRICE if amount != 0 else 0.0
+
+    def is_known(self, currency_code: Optional[str]) -> bool:
+        """True when there is an exchange rate for the currency"""
+        return bool(currency_code and self.rates and self.rates.get(currency_code))
+
+    def convert_many(self, currencies: Sequence[Optional[str]], amounts: Sequence[float]) -> List[float]:
+        """Convert a batch of amounts to USD in one pass against a single rate table"""
+        rates = self.rates
+        if not self.initialized or not rates:
+            raise Exception("Currency converter not initialized")
+
+        result = []
+        for currency_code, amount in zip(currencies, amounts):
+            exchange_rate = rates.get(currency_code) if currency_code else None
+            if exchange_rate:
+                result.append(round(amount / exchange_rate, 2))
+            else:
+                result.append(UNKNOWN_CURRENCY_PRICE if amount != 0 else 0.0)
+        return result
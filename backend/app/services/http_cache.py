@@ -0,0 +1,191 @@
+"""
+HTTP caching and compression for API responses
+
+Buffered 200 responses on routes with a cache policy get a Cache-Control header, a
+strong ETag computed from the body, conditional GET support (304 Not Modified) and
+zstd/brotli/gzip compression above a size threshold. Hashing and compressing large
+bodies runs in a worker thread so the event loop keeps serving other requests.
+Streaming responses only get the Cache-Control header.
+"""
+import asyncio
+import gzip
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from app import config
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def cache_policy(max_age: int, stale_while_revalidate: int = 0) -> str:
+    """Cache-Control value for a public response"""
+    value = f"public, max-age={max_age}"
+    if stale_while_revalidate:
+        value += f", stale-while-revalidate={stale_while_revalidate}"
+    return value
+
+
+NO_STORE = "no-store"
+
+# Most preferred first; brotli and zstd are used only when available
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {}
+if zstd is not None:
+    COMPRESSORS["zstd"] = lambda body: zstd.compress(body, level=3)
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=5)
+COMPRESSORS["gzip"] = lambda body: gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported content coding allowed by an Accept-Encoding header"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in COMPRESSORS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def _etag_matches(if_none_match: str, digest: str) -> bool:
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        # Compressed representations carry the coding as a suffix of the same digest
+        if tag.strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _digest_and_compress(body: bytes, encoding: Optional[str]) -> Tuple[str, Optional[bytes]]:
+    return _digest(body), COMPRESSORS[encoding](body) if encoding else None
+
+
+class HttpCacheMiddleware:
+    """ASGI middleware applying per-route cache policies, ETags and compression"""
+
+    def __init__(
+        self,
+        app,
+        policies: Dict[str, str],
+        min_size: int = config.COMPRESSION_MIN_SIZE,
+        thread_threshold: int = config.COMPRESSION_THREAD_THRESHOLD
+    ):
+        self.app = app
+        self.policies = policies
+        self.min_size = min_size
+        self.thread_threshold = thread_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        start_message: Optional[dict] = None
+        body_parts: List[bytes] = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                policy = self.policies.get(getattr(route, "path", None))
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                if policy is None or message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                    return
+                if "cache-control" not in headers:
+                    headers["cache-control"] = policy
+                message = {**message, "headers": headers.raw}
+                if "content-length" not in headers or "content-encoding" in headers:
+                    # Streaming or already encoded - nothing to hash or compress
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(start_message, b"".join(body_parts), request_headers, send)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _finish(self, start_message: dict, body: bytes, request_headers: Headers, send):
+        headers = MutableHeaders(raw=list(start_message["headers"]))
+        cacheable = NO_STORE not in headers["cache-control"]
+        encoding = None
+        if len(body) >= self.min_size:
+            headers.add_vary_header("Accept-Encoding")
+            encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+
+        if_none_match = request_headers.get("if-none-match") if cacheable else None
+        if if_none_match:
+            # Revalidation - hash first so a match skips compression entirely
+            digest = await self._offload(len(body), _digest, body)
+            if _etag_matches(if_none_match, digest):
+                headers["etag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+                del headers["content-length"]
+                if "content-type" in headers:
+                    del headers["content-type"]
+                await send({**start_message, "status": 304, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            compressed = await self._offload(len(body), COMPRESSORS[encoding], body) if encoding else None
+        else:
+            digest, compressed = await self._offload(len(body), _digest_and_compress, body, encoding)
+
+        if cacheable:
+            headers["etag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+        if compressed is not None and len(compressed) < len(body):
+            body = compressed
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+        elif encoding and cacheable:
+            # Sent uncompressed after all - the ETag must name the identity representation
+            headers["etag"] = f'"{digest}"'
+
+        await send({**start_message, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _offload(self, size: int, fn: Callable, *args):
+        """Run CPU-heavy work on large bodies in a worker thread"""
+        if size >= self.thread_threshold:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
@@ -0,0 +1,21 @@
+"""
+Shared upstream HTTP client - one pooled connection pool per process
+"""
+import httpx
+from app import config
+
+
+def create_http_client(
+    http2: bool = config.HTTP2_ENABLED,
+    timeout: float = config.HTTP_TIMEOUT,
+    max_connections: int = config.HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections: int = config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = config.HTTP_KEEPALIVE_EXPIRY,
+) -> httpx.AsyncClient:
+    """Create a long-lived pooled client for JustWatch and exchange rate calls"""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.AsyncClient(http2=http2, timeout=timeout, limits=limits)
@@ -1,27 +1,376 @@
 """
 JustWatch API service - handles GraphQL queries to JustWatch
 """
+import asyncio
+import functools
+import json
+import logging
+import time
 import httpx
-from typing import List, Optional
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    overload
+)
 from app.models.justwatch_models import (
     SearchTitlesResponse,
     TitleNode,
     GetOffersResponse,
     UrlMetadataResponse,
     TitleOfferViewModel,
-    TitleNodeWrapper
+    TitleNodeWrapper,
+    OffersBatch,
+    PriceHistoryPoint,
+    TitleFullResponse,
+    OfferDetails,
+    OfferPricing,
+    OfferSummary,
+    OfferT,
+    BestOffersResponse
 )
+from app import config
+from app.services import metrics
+from app.services.cache import TTLCache
 from app.services.currency_converter import CurrencyConverter
+from app.services.offer_store import OfferStore
+from app.services.offer_summary import summarize_offers
+from app.services.resilience import CircuitBreaker, ResilientCaller, RetryBudget
+from app.services.prefetcher import Prefetcher
+from app.services.price_index import PriceIndex
+from app.services.query_templates import FULL, PRICING, OfferProfile, QueryTemplates
+from app.services.scheduler import (
+    Priority,
+    UpstreamOverloadedError,
+    UpstreamScheduler,
+    SharedPriority,
+    current_floor,
+    is_background,
+    shared_priority
+)
+from app.services.shared_cache import SharedCache
+from app.services.single_flight import SingleFlight
+from app.services.suggest_index import SEARCH_HIT_WEIGHT, TITLE_HIT_WEIGHT, SuggestIndex
 from urllib.parse import urlparse, parse_qs
 
+logger = logging.getLogger(__name__)
+
 
 class JustWatchService:
-    def __init__(self, currency_converter: CurrencyConverter):
-        self.base_url = "https://apis.justwatch.com"
+    def __init__(
+        self,
+        currency_converter: CurrencyConverter,
+        http_client: Optional[httpx.AsyncClient] = None,
+        offer_store: Optional[OfferStore] = None,
+        throttle: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self.base_url = config.JUSTWATCH_API_BASE_URL.rstrip("/")
         self.graphql_url = f"{self.base_url}/graphql"
         self.currency_converter = currency_converter
+        self.http_client = http_client
+        self.offer_store = offer_store
+        self.title_cache = TTLCache("title", config.CACHE_MAX_SIZE, config.CACHE_TITLE_TTL, config.CACHE_STALE_TTL)
+        self.url_cache = TTLCache("url_metadata", config.CACHE_MAX_SIZE, config.CACHE_URL_TTL, config.CACHE_STALE_TTL)
+        self.search_cache = TTLCache("search", config.CACHE_MAX_SIZE, config.CACHE_SEARCH_TTL, config.CACHE_STALE_TTL)
+        self.summary_cache = TTLCache(
+            "offer_summary", config.CACHE_MAX_SIZE, config.CACHE_OFFER_SUMMARY_TTL, config.CACHE_STALE_TTL
+        )
+        # Offers are refreshed after OFFER_STORE_TTL - so is the price index built from them.
+        # An index is far larger than the other cached values, so it gets its own cap
+        self.price_index_cache = TTLCache(
+            "price_index", config.PRICE_INDEX_CACHE_SIZE, config.OFFER_STORE_TTL, config.CACHE_STALE_TTL
+        )
+        self.suggest_index = SuggestIndex()
+        self.single_flight = SingleFlight()
+        self._call_priorities: Dict[tuple, SharedPriority] = {}
+        self.query_templates = QueryTemplates()
+        self.resilience = ResilientCaller(
+            max_retries=config.RETRY_MAX_ATTEMPTS,
+            backoff_base=config.RETRY_BACKOFF_BASE,
+            backoff_max=config.RETRY_BACKOFF_MAX,
+            hedge_percentile=config.HEDGE_PERCENTILE if config.HEDGE_ENABLED else None,
+            hedge_min_delay=config.HEDGE_MIN_DELAY,
+            budget=RetryBudget(config.RETRY_BUDGET_RATIO, config.RETRY_BUDGET_CAP, config.RETRY_BUDGET_CAP),
+            breaker=CircuitBreaker(config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_TIMEOUT),
+            throttle=throttle
+        )
+        self.scheduler = UpstreamScheduler(
+            max_concurrency=config.SCHEDULER_MAX_CONCURRENCY,
+            queue_limits={
+                Priority.INTERACTIVE: config.SCHEDULER_INTERACTIVE_QUEUE,
+                Priority.BULK: config.SCHEDULER_BULK_QUEUE,
+                Priority.BACKGROUND: config.SCHEDULER_BACKGROUND_QUEUE
+            },
+            queue_timeouts={
+                Priority.INTERACTIVE: config.SCHEDULER_INTERACTIVE_TIMEOUT,
+                Priority.BULK: config.SCHEDULER_BULK_TIMEOUT,
+                Priority.BACKGROUND: config.SCHEDULER_BACKGROUND_TIMEOUT
+            },
+            background_share=config.SCHEDULER_BACKGROUND_SHARE
+        )
+        self.prefetcher = Prefetcher(self.scheduler, self._prefetch_title)
+
+    def _client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client opened by the application lifespan"""
+        if self.http_client is None:
+            raise RuntimeError("HTTP client not initialized")
+        return self.http_client
+
+    async def _post_graphql(self, graphql_query: dict) -> dict:
+        """POST a GraphQL document to JustWatch and return the decoded body"""
+        return json.loads(await self._post_graphql_raw(graphql_query))
+
+    async def _post_graphql_raw(self, graphql_query: dict) -> bytes:
+        """POST a GraphQL document to JustWatch, coalescing identical in-flight queries"""
+        key = (
+            graphql_query.get("operationName"),
+            json.dumps(graphql_query.get("variables"), sort_keys=True),
+            graphql_query["query"],
+        )
+        operation = graphql_query.get("operationName") or "graphql"
+        return await self._coalesced(key, operation, lambda: self._send_graphql(graphql_query))
+
+    async def _coalesced(self, key: tuple, operation: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        """Run an upstream call once for all concurrent callers with the same key
+
+        The shared call runs at the floor of its most urgent caller: a request joining a
+        background prefetch moves it up instead of waiting behind it.
+        """
+        call_priority = self._call_priorities.get(key)
+        if call_priority is not None:
+            call_priority.raise_to(current_floor())
+
+        def start() -> Awaitable[Any]:
+            # Registered before the call's task first runs, so no joiner can miss it
+            shared = self._call_priorities[key] = SharedPriority(current_floor())
+            task = asyncio.ensure_future(self._run_shared(shared, operation, send))
+            # A done callback also runs for a task cancelled before it started
+            task.add_done_callback(lambda _: self._forget_call_priority(key, shared))
+            return task
+
+        try:
+            return await self.single_flight.do(key, start)
+        except UpstreamOverloadedError as e:
+            # The call we joined was a prefetch shed at background priority before we
+            # joined it - a caller who is actually waiting gets its own attempt
+            if e.priority != Priority.BACKGROUND or is_background():
+                raise
+            return await self.single_flight.do(key, start)
+
+    async def _run_shared(self, shared: SharedPriority, operation: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        with shared_priority(shared):
+            return await self.resilience.call(operation, send)
+
+    def _forget_call_priority(self, key: tuple, shared: SharedPriority):
+        if self._call_priorities.get(key) is shared:
+            del self._call_priorities[key]
+
+    async def _send_graphql(self, graphql_query: dict) -> bytes:
+        operation = graphql_query.get("operationName") or "graphql"
+        # Heavy multi-country offers queries must not starve search and title lookups
+        priority = Priority.BULK if operation == "GetTitleOffers" else Priority.INTERACTIVE
+        async with self.scheduler.slot(priority):
+            with metrics.UPSTREAM_IN_FLIGHT.track_in_progress(operation=operation):
+                start = time.perf_counter()
+                response = await self._client().post(self.graphql_url, json=graphql_query)
+                metrics.UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation)
+        metrics.UPSTREAM_RESPONSE_BYTES.inc(len(response.content), operation=operation)
+        response.raise_for_status()
+        return response.content
+
+    async def _get_json(self, url: str) -> dict:
+        """GET a JustWatch REST URL, coalescing identical in-flight requests"""
+        operation = urlparse(url).path
+        return await self._coalesced(("GET", url), operation, lambda: self._send_get(url))
+
+    async def _send_get(self, url: str) -> dict:
+        operation = urlparse(url).path
+        async with self.scheduler.slot(Priority.INTERACTIVE):
+            with metrics.UPSTREAM_IN_FLIGHT.track_in_progress(operation=operation):
+                start = time.perf_counter()
+                response = await self._client().get(url)
+                metrics.UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation)
+        metrics.UPSTREAM_RESPONSE_BYTES.inc(len(response.content), operation=operation)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_price_history(
+        self,
+        node_id: str,
+        country: Optional[str] = None,
+        offer_id: Optional[str] = None
+    ) -> List[PriceHistoryPoint]:
+        """Recorded price changes for a title, answered from the offer store only"""
+        if self.offer_store is None:
+            raise RuntimeError("Offer store is disabled")
+        return await self.offer_store.price_history(node_id, country, offer_id)
+
+    def attach_shared_cache(self, shared_cache: Optional[SharedCache]):
+        """Back the response caches with a cache shared by all workers on this host"""
+        self.title_cache.shared = shared_cache.namespace("title", TitleNode) if shared_cache else None
+        self.url_cache.shared = shared_cache.namespace("url_metadata", UrlMetadataResponse) if shared_cache else None
+        self.search_cache.shared = shared_cache.namespace("search", SearchTitlesResponse) if shared_cache else None
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters for each response cache and the request coalescer"""
+        caches = (self.title_cache, self.url_cache, self.search_cache, self.summary_cache, self.price_index_cache)
+        stats = {cache.name: cache.stats() for cache in caches}
+        stats["singleFlight"] = self.single_flight.stats()
+        stats["queryTemplates"] = self.query_templates.stats()
+        stats["scheduler"] = self.scheduler.stats()
+        stats["prefetch"] = self.prefetcher.stats()
+        return stats
+
+    async def search_titles(
+        self,
+        query: str,
+        country: str = "US",
+        prefetch: bool = False,
+        enrich: bool = False
+    ) -> SearchTitlesResponse:
+        """Search for titles, served from cache when possible
+
+        With prefetch, the top results are warmed in the background for the detail page.
+        With enrich, each result gets an offer summary for the searched country.
+        """
+        country = country.upper()
+        key = (" ".join(query.split()).casefold(), country)
+        response = await self.search_cache.get_or_load(key, lambda: self._fetch_search_titles(query, country))
+        summaries_task = None
+        if enrich:
+            # Start the summary lookup first so it overlaps the index update below
+            summaries_task = asyncio.ensure_future(
+                self.get_offer_summaries([edge.node.id for edge in response.popular_titles.edges], country)
+            )
+        # The blank query lists popular titles on page load - index them without counting a hit
+        self.suggest_index.observe(
+            (edge.node for edge in response.popular_titles.edges),
+            weight=SEARCH_HIT_WEIGHT if key[0] else 0
+        )
+        if prefetch:
+            self.prefetcher.schedule(
+                (edge.node.id, edge.node.content.full_path if edge.node.content else None)
+                for edge in response.popular_titles.edges
+            )
+        if summaries_task is not None:
+            # A copy - the cached response is shared by every caller
+            response = response.model_copy(update={"offer_summaries": await summaries_task})
+        return response
+
+    async def get_offer_summaries(self, node_ids: List[str], country: str) -> Dict[str, OfferSummary]:
+        """Offer summaries for titles in one country, keyed by node ID
+
+        Served from the summary cache, then from fresh offers in the offer store, and the
+        rest are fetched with a single GraphQL document of aliased node selections. The
+        summaries are best effort: titles whose offers could not be loaded are left out.
+        """
+        country = country.upper()
+        summaries: Dict[str, OfferSummary] = {}
+        misses = []
+        for node_id in dict.fromkeys(node_ids):
+            summary = self.summary_cache.get_fresh((node_id, country))
+            if summary is not None:
+                summaries[node_id] = summary
+            else:
+                misses.append(node_id)
+        if not misses:
+            return summaries
+
+        await self.currency_converter.initialize()
+        if self.offer_store is not None:
+            loaded = await asyncio.gather(
+                *(self.offer_store.load(node_id, [country], config.OFFER_STORE_TTL) for node_id in misses)
+            )
+            remaining = []
+            for node_id, (stored, stale) in zip(misses, loaded):
+                if stale:
+                    remaining.append(node_id)
+                else:
+                    summaries[node_id] = self._summarize(node_id, country, stored.node.get(country.lower(), []))
+            misses = remaining
+
+        if misses:
+            try:
+                fetched = await self._query_offer_summaries(misses, country)
+            except Exception as e:
+                logger.warning("Offer summaries for %d titles in %s failed: %s", len(misses), country, e)
+                fetched = {}
+            for node_id, offers in fetched.items():
+                summaries[node_id] = self._summarize(node_id, country, offers)
+        return summaries
+
+    def _summarize(self, node_id: str, country: str, offers: Sequence[OfferPricing]) -> OfferSummary:
+        prices = self.currency_converter.convert_many(
+            [offer.currency for offer in offers],
+            [offer.retail_price_value or 0 for offer in offers]
+        )
+        # Unknown currencies convert to a sentinel price that must not win "cheapest"
+        known = self.currency_converter.is_known
+        summary = summarize_offers(
+            offers,
+            [price if known(offer.currency) else None for offer, price in zip(offers, prices)]
+        )
+        self.summary_cache.set((node_id, country), summary)
+        return summary
+
+    async def _query_offer_summaries(self, node_ids: List[str], country: str) -> Dict[str, List[OfferPricing]]:
+        """Get the offers of several titles in one country with one GraphQL document
+
+        Only the pricing profile is selected. Titles that don't exist or that failed
+        upstream are missing from the result.
+        """
+        variables = {
+            "country": country,
+            "language": "en",
+            "platform": "WEB",
+            "filter": {}
+        }
+        for index, node_id in enumerate(node_ids):
+            variables[f"id{index}"] = node_id
 
-    async def search_titles(self, query: str, country: str = "US") -> SearchTitlesResponse:
+        graphql_query = {
+            "operationName": "GetSearchOffers",
+            "query": self.query_templates.search_offers(len(node_ids), PRICING),
+            "variables": variables
+        }
+
+        data = await self._post_graphql(graphql_query)
+        nodes = data.get("data") or {}
+        result = {}
+        for index, node_id in enumerate(node_ids):
+            node_data = nodes.get(f"n{index}")
+            if node_data and node_data.get("offers") is not None:
+                result[node_id] = [OfferPricing(**offer) for offer in node_data["offers"]]
+        return result
+
+    async def _prefetch_title(self, node_id: str, path: Optional[str]) -> List[str]:
+        """Warm what the detail page loads for a title, returning the kinds warmed"""
+        title = await self.get_title(node_id)
+        if title is None:
+            return []
+        path = path or (title.content.full_path if title.content else None)
+        if not path:
+            return ["title"]
+        if self.offer_store is None:
+            # Offers are only kept in the store; still warm the URL metadata they need
+            await self.get_url_metadata(path)
+            return ["title"]
+        await self.get_all_offers_response(node_id, path)
+        return ["title", "offers"]
+
+    def suggest_titles(self, query: str, limit: int = 10) -> List[dict]:
+        """Instant suggestions from titles already seen, without an upstream call"""
+        return self.suggest_index.suggest(query, limit)
+
+    async def _fetch_search_titles(self, query: str, country: str) -> SearchTitlesResponse:
         """Search for titles using GraphQL query"""
         graphql_query = {
             "operationName": "GetSearchTitles",
@@ -99,13 +448,17 @@ class JustWatchService:
             }
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(self.graphql_url, json=graphql_query)
-            response.raise_for_status()
-            data = response.json()
-            return SearchTitlesResponse(**data["data"])
+        data = await self._post_graphql(graphql_query)
+        return SearchTitlesResponse(**data["data"])
 
     async def get_title(self, node_id: str) -> Optional[TitleNode]:
+        """Get title details by node ID, served from cache when possible"""
+        self.prefetcher.note_access("title", node_id)
+        title = await self.title_cache.get_or_load(node_id, lambda: self._fetch_title(node_id))
+        self.suggest_index.observe([title], weight=0 if is_background() else TITLE_HIT_WEIGHT)
+        return title
+
+    async def _fetch_title(self, node_id: str) -> Optional[TitleNode]:
         """Get title details by node ID"""
         graphql_query = {
             "operationName": "GetTitleNode",
@@ -162,26 +515,95 @@ class JustWatchService:
             }
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(self.graphql_url, json=graphql_query)
-            response.raise_for_status()
-            data = response.json()
-            node_data = data["data"]["node"]
-            if node_data:
-                wrapper = TitleNodeWrapper(node=TitleNode(**node_data))
-                return wrapper.node
-            return None
+        data = await self._post_graphql(graphql_query)
+        node_data = data["data"]["node"]
+        if node_data:
+            wrapper = TitleNodeWrapper(node=TitleNode(**node_data))
+            return wrapper.node
+        return None
+
+    async def get_titles(self, node_ids: List[str]) -> Tuple[List[Optional[TitleNode]], List[str]]:
+        """Get many titles in request order, with None for missing nodes, and the IDs that failed
+
+        Titles are looked up in the cache like get_title; the misses are fetched with
+        aliased node(id:) selections, several per GraphQL document. A failed document
+        only fails its own IDs, unless every document failed.
+        """
+        unique_ids = list(dict.fromkeys(node_ids))
+        cached = await asyncio.gather(*(
+            self.title_cache.get_cached(node_id, functools.partial(self._fetch_title, node_id))
+            for node_id in unique_ids
+        ))
+        found: Dict[str, Optional[TitleNode]] = {}
+        misses = []
+        for node_id, title in zip(unique_ids, cached):
+            if title is not None:
+                found[node_id] = title
+            else:
+                misses.append(node_id)
+
+        batch_size = max(config.TITLES_BATCH_SIZE, 1)
+        chunks = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+        results = await asyncio.gather(*(self._fetch_titles(chunk) for chunk in chunks), return_exceptions=True)
+        failed_ids = []
+        errors = []
+        for chunk, titles in zip(chunks, results):
+            if isinstance(titles, BaseException):
+                if not isinstance(titles, Exception):
+                    raise titles
+                logger.warning("Title batch of %d failed: %s", len(chunk), titles)
+                errors.append(titles)
+                failed_ids.extend(chunk)
+                continue
+            for node_id, title in titles.items():
+                found[node_id] = title
+                if title is not None:
+                    self.title_cache.set(node_id, title)
+        if errors and not found:
+            # Nothing to return - surface the upstream error instead of a list of nulls
+            raise errors[0]
+
+        self.suggest_index.observe(found.values(), weight=0)
+        return [found.get(node_id) for node_id in node_ids], failed_ids
+
+    async def _fetch_titles(self, node_ids: List[str]) -> Dict[str, Optional[TitleNode]]:
+        """Get several titles with one GraphQL document of aliased node selections"""
+        variables = {
+            "country": "US",
+            "language": "en",
+            "formatPoster": "JPG",
+            "profile": "S718",
+            "backdropProfile": "S1920"
+        }
+        for index, node_id in enumerate(node_ids):
+            variables[f"id{index}"] = node_id
+
+        graphql_query = {
+            "operationName": "GetTitleNodes",
+            "query": self.query_templates.title_nodes(len(node_ids)),
+            "variables": variables
+        }
+
+        data = await self._post_graphql(graphql_query)
+        nodes = data.get("data") or {}
+        result = {}
+        for index, node_id in enumerate(node_ids):
+            node_data = nodes.get(f"n{index}")
+            result[node_id] = TitleNode(**node_data) if node_data else None
+        return result
 
     async def get_url_metadata(self, path: str) -> Optional[UrlMetadataResponse]:
+        """Get URL metadata for a title path, served from cache when possible"""
+        key = path.strip().rstrip("/").lower()
+        return await self.url_cache.get_or_load(key, lambda: self._fetch_url_metadata(path))
+
+    async def _fetch_url_metadata(self, path: str) -> Optional[UrlMetadataResponse]:
         """Get URL metadata for a title path"""
         from urllib.parse import quote
         url = f"{self.base_url}/content/urls?path={quote(path)}"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return UrlMetadataResponse(**data)
+
+        data = await self._get_json(url)
+        return UrlMetadataResponse(**data)
 
     async def get_available_locales(self, path: str) -> List[str]:
         """Get available locales for a title"""
@@ -190,76 +612,146 @@ class JustWatchService:
             return [tag["locale"] for tag in metadata.href_lang_tags if "locale" in tag]
         return []
 
-    async def get_title_offers(self, node_id: str, countries: List[str]) -> Optional[GetOffersResponse]:
-        """Get offers for a title in multiple countries"""
-        # Build dynamic variables and query for all countries
-        variables = {
-            "nodeId": node_id,
-            "language": "en",
-            "filterBuy": {},
-            "platform": "WEB"
-        }
-        
-        # Build dynamic GraphQL query for all countries - each country is hardcoded in the query
-        country_queries = []
-        for country in countries:
-            country_lower = country.lower()
-            country_queries.append(f"""
-                {country_lower}: offers(country: {country.upper()}, platform: $platform, filter: $filterBuy) {{
-                    ...TitleOffer
-                    __typename
-                }}
-            """)
-        
-        query_body = "\n".join(country_queries)
-        
+    @overload
+    async def get_title_offers(
+        self,
+        node_id: str,
+        countries: List[str],
+        shard_size: Optional[int] = None
+    ) -> Optional[GetOffersResponse[OfferDetails]]: ...
+
+    @overload
+    async def get_title_offers(
+        self,
+        node_id: str,
+        countries: List[str],
+        shard_size: Optional[int] = None,
+        *,
+        profile: OfferProfile[OfferT]
+    ) -> Optional[GetOffersResponse[OfferT]]: ...
+
+    async def get_title_offers(
+        self,
+        node_id: str,
+        countries: List[str],
+        shard_size: Optional[int] = None,
+        *,
+        profile: OfferProfile[Any] = FULL
+    ) -> Optional[GetOffersResponse[Any]]:
+        """Get offers for a title in multiple countries, split into concurrent shards
+
+        The pricing profile returns GetOffersResponse[OfferPricing]; view models and the
+        offer store take the full profile's GetOffersResponse[OfferDetails] only.
+        """
+        results = {}
+        async for index, shard, result in self.iter_title_offer_shards(node_id, countries, shard_size, profile=profile):
+            results[index] = (shard, result)
+
+        merged = profile.response(node={})
+        errors = []
+        for index in sorted(results):
+            shard, result = results[index]
+            if isinstance(result, Exception):
+                errors.append(result)
+                merged.failed_countries.extend(country.upper() for country in shard)
+            elif result is None:
+                # Node not found - the same answer every shard would give
+                return None
+            else:
+                merged.node.update(result.node)
+                merged.failed_countries.extend(result.failed_countries)
+
+        if errors and len(errors) == len(results):
+            # Nothing succeeded - surface the error rather than an empty list
+            raise errors[0]
+        return merged
+
+    @overload
+    def iter_title_offer_shards(
+        self,
+        node_id: str,
+        countries: List[str],
+        shard_size: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, List[str], Union[GetOffersResponse[OfferDetails], None, Exception]]]: ...
+
+    @overload
+    def iter_title_offer_shards(
+        self,
+        node_id: str,
+        countries: List[str],
+        shard_size: Optional[int] = None,
+        *,
+        profile: OfferProfile[OfferT]
+    ) -> AsyncIterator[Tuple[int, List[str], Union[GetOffersResponse[OfferT], None, Exception]]]: ...
+
+    async def iter_title_offer_shards(
+        self,
+        node_id: str,
+        countries: List[str],
+        shard_size: Optional[int] = None,
+        *,
+        profile: OfferProfile[Any] = FULL
+    ) -> AsyncIterator[Tuple[int, List[str], Union[GetOffersResponse[Any], None, Exception]]]:
+        """Fetch offers in concurrent country shards, yielding each shard as soon as it resolves
+
+        Yields (shard index, shard countries, result), where a failed shard's result is the exception.
+        """
+        if shard_size is None:
+            shard_size = config.OFFERS_SHARD_SIZE
+        if shard_size <= 0:
+            shard_size = max(len(countries), 1)
+
+        shards = [countries[i:i + shard_size] for i in range(0, len(countries), shard_size)]
+        semaphore = asyncio.Semaphore(config.OFFERS_SHARD_CONCURRENCY)
+
+        async def fetch_shard(index: int, shard: List[str]):
+            async with semaphore:
+                try:
+                    return index, shard, await self._query_title_offers(node_id, shard, profile)
+                except Exception as e:
+                    logger.warning("Offers shard %s for %s failed: %s", ",".join(shard), node_id, e)
+                    return index, shard, e
+
+        tasks = [asyncio.ensure_future(fetch_shard(index, shard)) for index, shard in enumerate(shards)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer may stop early - don't leave shards running behind it
+            for task in tasks:
+                task.cancel()
+
+    async def _query_title_offers(
+        self,
+        node_id: str,
+        countries: List[str],
+        profile: OfferProfile[OfferT]
+    ) -> Optional[GetOffersResponse[OfferT]]:
+        """Get offers for a title in multiple countries with a single GraphQL query"""
         graphql_query = {
             "operationName": "GetTitleOffers",
-            "query": f"""
-                query GetTitleOffers($nodeId: ID!, $language: Language!, $filterBuy: OfferFilter!, $platform: Platform!) {{
-                    node(id: $nodeId) {{
-                        ... on MovieOrShowOrSeasonOrEpisode {{
-                            {query_body}
-                        }}
-                    }}
-                }}
-                
-                fragment TitleOffer on Offer {{
-                    id
-                    presentationType
-                    monetizationType
-                    retailPrice(language: $language)
-                    retailPriceValue
-                    currency
-                    lastChangeRetailPriceValue
-                    type
-                    package {{
-                        id
-                        packageId
-                        clearName
-                        technicalName
-                        icon(profile: S100)
-                        __typename
-                    }}
-                    standardWebURL
-                    elementCount
-                    availableTo
-                    deeplinkRoku: deeplinkURL(platform: ROKU_OS)
-                    subtitleLanguages
-                    videoTechnology
-                    audioTechnology
-                    audioLanguages
-                    __typename
-                }}
-            """,
-            "variables": variables
+            "query": self.query_templates.title_offers(countries, profile),
+            "variables": {
+                "nodeId": node_id,
+                "language": "en",
+                "filterBuy": {},
+                "platform": "WEB"
+            }
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(self.graphql_url, json=graphql_query)
-            response.raise_for_status()
-            data = response.json()
-            return GetOffersResponse(**data["data"])
+        # Validate the raw bytes in one pass - no intermediate dicts for large offer payloads
+        raw = await self._post_graphql_raw(graphql_query)
+        with metrics.time_stage("parse"):
+            envelope = profile.envelope.model_validate_json(raw)
+        if envelope.data is None:
+            raise Exception("GetTitleOffers returned no data")
+        node_data = envelope.data.node
+        if node_data is None:
+            return None
+        # Countries that errored upstream come back as null next to the ones that resolved
+        failed = [country.upper() for country, offers in node_data.items() if offers is None]
+        resolved = {country: offers for country, offers in node_data.items() if offers is not None}
+        return profile.response.model_construct(node=resolved, failed_countries=failed)
 
     def _clean_package_url(self, package_url: Optional[str]) -> Optional[str]:
         """Clean package URL by removing tracking parameters"""
@@ -305,11 +797,175 @@ class JustWatchService:
 
     async def get_all_offers(self, node_id: str, path: str) -> List[TitleOfferViewModel]:
         """Get all offers for a title across all available countries"""
+        offers_response = await self.get_all_offers_response(node_id, path)
+        return self.build_title_offer_view_models(node_id, offers_response)
+
+    def build_title_offer_view_models(
+        self,
+        node_id: str,
+        offers_response: Optional[GetOffersResponse[OfferDetails]]
+    ) -> List[TitleOfferViewModel]:
+        """View models for all of a title's offers, refreshing its price index when due
+
+        Partial responses are not indexed - a missing country could be the cheapest.
+        """
+        offers = self.build_offer_view_models(offers_response)
+        if offers_response is not None and not offers_response.failed_countries:
+            entry = self.price_index_cache.get(node_id)
+            if entry is None or entry.fresh_until <= time.monotonic():
+                self.price_index_cache.set(node_id, self._build_price_index(node_id, offers))
+        return offers
+
+    async def get_best_offers(
+        self,
+        node_id: str,
+        path: Optional[str] = None,
+        monetization_type: Optional[str] = None,
+        provider: Optional[str] = None,
+        quality: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Optional[BestOffersResponse]:
+        """Cheapest countries and price percentiles for a title, from its price index
+
+        An index built from a partial response answers this request but is not cached -
+        a missing country could be the cheapest.
+        """
+        partial: List[PriceIndex] = []
+
+        async def load() -> Optional[PriceIndex]:
+            index = await self._load_price_index(node_id, path)
+            if index is not None and index.failed_countries:
+                partial.append(index)
+                return None
+            return index
+
+        index = await self.price_index_cache.get_or_load(node_id, load)
+        if index is None and partial:
+            index = partial[0]
+        if index is None:
+            return None
+        return index.best(monetization_type, provider, quality, limit)
+
+    async def _load_price_index(self, node_id: str, path: Optional[str]) -> Optional[PriceIndex]:
+        if not path:
+            title = await self.get_title(node_id)
+            path = title.content.full_path if title and title.content else None
+            if not path:
+                return None
+        offers_response = await self.get_all_offers_response(node_id, path)
+        if offers_response is None:
+            return None
+        return self._build_price_index(
+            node_id, self.build_offer_view_models(offers_response), offers_response.failed_countries
+        )
+
+    def _build_price_index(
+        self,
+        node_id: str,
+        offers: List[TitleOfferViewModel],
+        failed_countries: Optional[List[str]] = None
+    ) -> PriceIndex:
+        with metrics.time_stage("price_index"):
+            return PriceIndex.build(
+                node_id, offers, self.currency_converter.is_known, config.PRICE_INDEX_TOP_N, failed_countries
+            )
+
+    async def get_title_full(self, node_id: str, path: Optional[str] = None) -> Optional[TitleFullResponse]:
+        """Title details, locales and offers for the title page in one call
+
+        When the caller already knows the full path, the title lookup runs alongside
+        the locale lookup and offer fan-out instead of ahead of them.
+        """
+        title_task = asyncio.ensure_future(self.get_title(node_id))
+        try:
+            if not path:
+                title = await title_task
+                path = title.content.full_path if title and title.content else None
+                if not path:
+                    return TitleFullResponse.model_construct(title=title) if title else None
+            offers_response, title = await asyncio.gather(self.get_all_offers_response(node_id, path), title_task)
+        finally:
+            if not title_task.done():
+                title_task.cancel()
+        if title is None:
+            return None
+        # Served from the URL metadata cache the offer lookup just filled
+        locales = await self.get_available_locales(path)
+        return TitleFullResponse.model_construct(
+            title=title,
+            locales=locales,
+            offers=self.build_title_offer_view_models(node_id, offers_response),
+            failed_countries=offers_response.failed_countries if offers_response else []
+        )
+
+    async def get_all_offers_response(self, node_id: str, path: str) -> Optional[GetOffersResponse[OfferDetails]]:
+        """Get raw offers for a title across all available countries"""
+        self.prefetcher.note_access("offers", node_id)
         # Initialize currency converter
         await self.currency_converter.initialize()
-        
+
+        countries = await self._get_offer_countries(path)
+        if self.offer_store is None:
+            with metrics.time_stage("title_offers"):
+                return await self.get_title_offers(node_id, countries)
+
+        # Serve fresh countries from the store and only re-query the stale ones
+        with metrics.time_stage("offer_store"):
+            stored, stale = await self.offer_store.load(node_id, countries, config.OFFER_STORE_TTL)
+        if not stale:
+            return stored
+        try:
+            with metrics.time_stage("title_offers"):
+                fetched = await self.get_title_offers(node_id, stale)
+        except Exception:
+            # Upstream unhealthy - fall back to whatever the store has, however old
+            expired, missing = await self.offer_store.load(node_id, stale, float("inf"))
+            node = {**stored.node, **expired.node}
+            if not node:
+                raise
+            return GetOffersResponse[OfferDetails].model_construct(
+                node={country.lower(): node[country.lower()] for country in countries if country.lower() in node},
+                failed_countries=[country.upper() for country in missing]
+            )
+        if fetched is None:
+            return None
+        with metrics.time_stage("offer_store"):
+            await self.offer_store.save(node_id, stale, fetched)
+
+        node = {**stored.node, **fetched.node}
+        return GetOffersResponse[OfferDetails].model_construct(
+            node={country.lower(): node[country.lower()] for country in countries if country.lower() in node},
+            failed_countries=fetched.failed_countries
+        )
+
+    async def stream_all_offers(self, node_id: str, path: str) -> AsyncGenerator[OffersBatch, None]:
+        """Yield view models shard by shard as soon as each one is fetched and converted"""
+        self.prefetcher.note_access("offers", node_id)
+        await self.currency_converter.initialize()
+
+        countries = await self._get_offer_countries(path)
+        if self.offer_store is not None:
+            # Fresh countries from the store go out first, in one batch
+            stored, countries = await self.offer_store.load(node_id, countries, config.OFFER_STORE_TTL)
+            if stored.node:
+                yield OffersBatch(offers=self.build_offer_view_models(stored))
+
+        async for _, shard, result in self.iter_title_offer_shards(node_id, countries):
+            if isinstance(result, Exception):
+                yield OffersBatch(offers=[], failed_countries=[country.upper() for country in shard])
+            elif result is not None:
+                if self.offer_store is not None:
+                    await self.offer_store.save(node_id, shard, result)
+                yield OffersBatch(
+                    offers=self.build_offer_view_models(result),
+                    failed_countries=result.failed_countries
+                )
+
+    async def _get_offer_countries(self, path: str) -> List[str]:
+        """Countries to query offers for - the title's locales, or a fallback list"""
         # Try to get available locales, but fall back to common countries if that fails
-        locales = await self.get_available_locales(path)
+        with metrics.time_stage("url_metadata"):
+            locales = await self.get_available_locales(path)
         if locales:
             countries = [locale.split("_")[-1] for locale in locales]
         else:
@@ -319,35 +975,47 @@ class JustWatchService:
                 "MX", "AR", "IN", "NL", "SE", "NO", "DK", "FI", "IE", "NZ",
                 "AT", "CH", "BE", "PT", "PL", "CZ", "GR", "TR", "ZA", "KR"
             ]
-        
-        # Get offers
-        offers_response = await self.get_title_offers(node_id, countries)
+        return countries
+
+    def build_offer_view_models(
+        self,
+        offers_response: Optional[GetOffersResponse[OfferDetails]]
+    ) -> List[TitleOfferViewModel]:
+        """Convert raw offers into view models with USD-normalized prices"""
         if not offers_response:
             return []
-        
-        # Convert to view models
+
+        # Convert all prices in one pass, then build view models
+        rows = [
+            (country, offer)
+            for country, offers in offers_response.node.items()
+            for offer in offers
+        ]
+        with metrics.time_stage("currency_conversion"):
+            usd_prices = self.currency_converter.convert_many(
+                [offer.currency for _, offer in rows],
+                [offer.retail_price_value or 0 for _, offer in rows]
+            )
+
+        start = time.perf_counter()
         result = []
-        for country, offers in offers_response.node.items():
-            for offer in offers:
-                usd_price = self.currency_converter.convert_to_usd(
-                    offer.currency,
-                    offer.retail_price_value or 0
-                )
-                
-                view_model = TitleOfferViewModel(
-                    country=country.upper(),
-                    package_url=self._clean_package_url(offer.standard_web_url),
-                    package_clear_name=offer.package.clear_name if offer.package else None,
-                    retail_price=offer.retail_price,
-                    retail_price_value=offer.retail_price_value,
-                    normalized_price=usd_price,
-                    presentation_type=offer.presentation_type,
-                    monetization_type=offer.monetization_type,
-                    subtitle_languages=self._format_languages(offer.subtitle_languages),
-                    audio_languages=self._format_languages(offer.audio_languages),
-                    technology=self._format_technology(offer.video_technology, offer.audio_technology),
-                    offer_details=offer
-                )
-                result.append(view_model)
-        
+        for (country, offer), usd_price in zip(rows, usd_prices):
+            # Every field below comes from already-validated offers - skip re-validation
+            view_model = TitleOfferViewModel.model_construct(
+                country=country.upper(),
+                package_url=self._clean_package_url(offer.standard_web_url),
+                package_clear_name=offer.package.clear_name if offer.package else None,
+                retail_price=offer.retail_price,
+                retail_price_value=offer.retail_price_value,
+                normalized_price=usd_price,
+                presentation_type=offer.presentation_type,
+                monetization_type=offer.monetization_type,
+                subtitle_languages=self._format_languages(offer.subtitle_languages),
+                audio_languages=self._format_languages(offer.audio_languages),
+                technology=self._format_technology(offer.video_technology, offer.audio_technology),
+                offer_details=offer
+            )
+            result.append(view_model)
+        metrics.record_stage("view_models", time.perf_counter() - start)
+
         return result
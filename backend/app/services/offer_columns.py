@@ -0,0 +1,104 @@
+"""
+Compact columnar encoding of offer view models
+
+Row-shaped offers repeat the provider, technology strings, language lists and a full
+nested copy of the offer details on every row. The columnar form sends one array per
+field instead, with countries, packages, repeated strings and string lists replaced by
+indexes into per-response dictionaries. Fields the row format derives from the offer
+details (provider name, joined languages and technology, duplicated types and prices)
+are left out and rebuilt by the client, so decoding is lossless.
+"""
+from typing import Any, Dict, List, Optional
+from app.models.justwatch_models import TitleOfferViewModel
+
+COLUMNAR_FORMAT = "columnar-v1"
+COLUMNAR_MEDIA_TYPE = "application/vnd.justwatch.offers+json; format=columnar-v1"
+
+
+class _Dictionary:
+    """Assigns a stable index to each distinct value, in first-seen order"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._index: Dict[Any, int] = {}
+
+    def encode(self, key, value=None) -> Optional[int]:
+        if key is None:
+            return None
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.values)
+            self.values.append(key if value is None else value)
+        return index
+
+
+def wants_columnar(format: Optional[str], accept: Optional[str]) -> bool:
+    """True when the client asked for the columnar form by query parameter or Accept header"""
+    if format is not None:
+        return format == "compact"
+    return bool(accept) and "format=columnar-v1" in accept and "application/vnd.justwatch.offers+json" in accept
+
+
+def _package_url_ref(package_url: Optional[str], standard_web_url: Optional[str]):
+    # Cleaned package URLs are usually the web URL itself or a prefix of it - send the length
+    if package_url is None:
+        return None
+    if standard_web_url is not None and standard_web_url.startswith(package_url):
+        return len(package_url)
+    return package_url
+
+
+def encode_offers_columnar(offers: List[TitleOfferViewModel]) -> dict:
+    """Encode view models as dictionary-compressed column arrays"""
+    countries = _Dictionary()
+    packages = _Dictionary()
+    strings = _Dictionary()
+    lists = _Dictionary()
+
+    columns: Dict[str, list] = {name: [] for name in (
+        "country", "id", "package", "presentationType", "monetizationType", "type", "currency",
+        "retailPrice", "retailPriceValue", "lastChangeRetailPriceValue", "normalizedPrice",
+        "standardWebURL", "packageUrl", "elementCount", "availableTo", "deeplinkRoku",
+        "subtitleLanguages", "audioLanguages", "videoTechnology", "audioTechnology"
+    )}
+
+    for offer in offers:
+        details = offer.offer_details
+        package = details.package
+        columns["country"].append(countries.encode(offer.country))
+        columns["id"].append(details.id)
+        columns["package"].append(
+            packages.encode(package.id, package.model_dump(by_alias=True)) if package else None
+        )
+        columns["presentationType"].append(strings.encode(details.presentation_type))
+        columns["monetizationType"].append(strings.encode(details.monetization_type))
+        columns["type"].append(strings.encode(details.type))
+        columns["currency"].append(strings.encode(details.currency))
+        columns["retailPrice"].append(details.retail_price)
+        columns["retailPriceValue"].append(details.retail_price_value)
+        columns["lastChangeRetailPriceValue"].append(details.last_change_retail_price_value)
+        columns["normalizedPrice"].append(offer.normalized_price)
+        columns["standardWebURL"].append(details.standard_web_url)
+        columns["packageUrl"].append(_package_url_ref(offer.package_url, details.standard_web_url))
+        columns["elementCount"].append(details.element_count)
+        columns["availableTo"].append(details.available_to)
+        columns["deeplinkRoku"].append(details.deeplink_roku)
+        for name, values in (
+            ("subtitleLanguages", details.subtitle_languages),
+            ("audioLanguages", details.audio_languages),
+            ("videoTechnology", details.video_technology),
+            ("audioTechnology", details.audio_technology),
+        ):
+            columns[name].append(lists.encode(tuple(values), values) if values is not None else None)
+
+    return {
+        "format": COLUMNAR_FORMAT,
+        "count": len(offers),
+        "dictionaries": {
+            "countries": countries.values,
+            "packages": packages.values,
+            "strings": strings.values,
+            "lists": lists.values,
+        },
+        "columns": columns,
+    }
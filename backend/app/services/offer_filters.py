@@ -0,0 +1,133 @@
+"""
+Server-side filtering, sorting and cursor pagination for offer view models
+"""
+import base64
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from app.models.justwatch_models import TitleOfferViewModel
+
+SORT_KEYS = ("country", "provider", "type", "priceLocal", "priceUSD", "quality")
+
+
+def quality_rank(presentation_type: Optional[str]) -> int:
+    """Higher number = better quality (same ranking as the title page)"""
+    if not presentation_type:
+        return 0
+    quality = presentation_type.upper()
+    if "4K" in quality or "UHD" in quality:
+        return 5
+    if "HD" in quality:
+        return 4
+    if "SD" in quality:
+        return 3
+    return 2
+
+
+_SORT_FUNCS: Dict[str, Callable[[TitleOfferViewModel], object]] = {
+    "country": lambda offer: offer.country,
+    "provider": lambda offer: offer.package_clear_name or "",
+    "type": lambda offer: offer.monetization_type or "",
+    "priceLocal": lambda offer: offer.retail_price_value or 0,
+    "priceUSD": lambda offer: offer.normalized_price or 0,
+    "quality": lambda offer: quality_rank(offer.presentation_type),
+}
+
+
+def _upper_set(values: Optional[List[str]]) -> Set[str]:
+    """Accept both repeated query params and comma-separated values"""
+    result = set()
+    for value in values or []:
+        result.update(part.strip().upper() for part in value.split(",") if part.strip())
+    return result
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, offset = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError
+        return int(offset)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+@dataclass
+class OfferQuery:
+    monetization_types: List[str] = field(default_factory=list)
+    exclude_monetization_types: List[str] = field(default_factory=list)
+    presentation_types: List[str] = field(default_factory=list)
+    countries: List[str] = field(default_factory=list)
+    max_price: Optional[float] = None
+    provider: Optional[str] = None
+    cheapest: bool = False
+    sort: Optional[str] = None
+    order: str = "asc"
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+
+    def __post_init__(self):
+        if self.sort is not None and self.sort not in SORT_KEYS:
+            raise ValueError(f"Invalid sort key '{self.sort}', expected one of {', '.join(SORT_KEYS)}")
+        if self.order not in ("asc", "desc"):
+            raise ValueError("Invalid order, expected 'asc' or 'desc'")
+        if self.limit is not None and self.limit <= 0:
+            raise ValueError("Invalid limit, expected a positive number")
+        self._monetization_types = _upper_set(self.monetization_types)
+        self._excluded_monetization_types = _upper_set(self.exclude_monetization_types)
+        self._presentation_types = _upper_set(self.presentation_types)
+        self._countries = _upper_set(self.countries)
+        self._provider = self.provider.lower() if self.provider else None
+        self._offset = decode_cursor(self.cursor) if self.cursor else 0
+
+    def matches(self, offer: TitleOfferViewModel) -> bool:
+        monetization_type = (offer.monetization_type or "").upper()
+        if self._monetization_types and monetization_type not in self._monetization_types:
+            return False
+        if monetization_type in self._excluded_monetization_types:
+            return False
+        if self._presentation_types and (offer.presentation_type or "").upper() not in self._presentation_types:
+            return False
+        if self._countries and offer.country.upper() not in self._countries:
+            return False
+        if self.max_price is not None and offer.normalized_price > self.max_price:
+            return False
+        if self._provider and self._provider not in (offer.package_clear_name or "").lower():
+            return False
+        return True
+
+
+def _cheapest_per_country_provider(offers: List[TitleOfferViewModel]) -> List[TitleOfferViewModel]:
+    """Keep only the cheapest offer (by USD price) for each country/provider pair"""
+    cheapest: Dict[Tuple[str, str], TitleOfferViewModel] = {}
+    for offer in offers:
+        key = (offer.country, offer.package_clear_name or "")
+        current = cheapest.get(key)
+        if current is None or offer.normalized_price < current.normalized_price:
+            cheapest[key] = offer
+    return list(cheapest.values())
+
+
+def apply_offer_query(
+    offers: List[TitleOfferViewModel],
+    query: OfferQuery
+) -> Tuple[List[TitleOfferViewModel], Optional[str]]:
+    """Filter, reduce, sort and paginate offers. Returns the page and the next cursor, if any"""
+    result = [offer for offer in offers if query.matches(offer)]
+
+    if query.cheapest:
+        result = _cheapest_per_country_provider(result)
+
+    if query.sort:
+        result.sort(key=_SORT_FUNCS[query.sort], reverse=query.order == "desc")
+
+    offset = query._offset
+    if query.limit is None:
+        return result[offset:], None
+    end = offset + query.limit
+    next_cursor = encode_cursor(end) if end < len(result) else None
+    return result[offset:end], next_cursor
@@ -0,0 +1,203 @@
+"""
+Persistent offer store - SQLite-backed offers per (node, country, offer) with price history
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from app.models.justwatch_models import GetOffersResponse, OfferDetails, PriceHistoryPoint
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS country_fetches (
+    node_id TEXT NOT NULL,
+    country TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (node_id, country)
+);
+CREATE TABLE IF NOT EXISTS offers (
+    node_id TEXT NOT NULL,
+    country TEXT NOT NULL,
+    offer_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (node_id, country, offer_id)
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    node_id TEXT NOT NULL,
+    country TEXT NOT NULL,
+    offer_id TEXT NOT NULL,
+    currency TEXT,
+    price REAL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS price_history_node ON price_history (node_id, country, offer_id, recorded_at);
+CREATE INDEX IF NOT EXISTS price_history_recorded_at ON price_history (recorded_at);
+CREATE INDEX IF NOT EXISTS country_fetches_fetched_at ON country_fetches (fetched_at);
+"""
+
+# Prune after this many title writes
+_PRUNE_EVERY = 200
+
+
+class OfferStore:
+    def __init__(self, path: str, retention_days: float, max_titles: int):
+        self.path = path
+        self.retention_seconds = retention_days * 24 * 60 * 60
+        self.max_titles = max_titles
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def load(
+        self,
+        node_id: str,
+        countries: List[str],
+        max_age: float
+    ) -> Tuple[GetOffersResponse[OfferDetails], List[str]]:
+        """Stored offers for countries fetched within max_age, and the countries that need a refresh"""
+        return await asyncio.to_thread(self._load, node_id, countries, max_age)
+
+    async def save(self, node_id: str, countries: List[str], offers_response: GetOffersResponse[OfferDetails]):
+        """Replace stored offers for the fetched countries and record price changes"""
+        await asyncio.to_thread(self._save, node_id, countries, offers_response)
+
+    async def price_history(
+        self,
+        node_id: str,
+        country: Optional[str] = None,
+        offer_id: Optional[str] = None
+    ) -> List[PriceHistoryPoint]:
+        """Recorded price points for a title, oldest first"""
+        return await asyncio.to_thread(self._price_history, node_id, country, offer_id)
+
+    def _load(self, node_id: str, countries: List[str], max_age: float) -> Tuple[GetOffersResponse[OfferDetails], List[str]]:
+        cutoff = time.time() - max_age
+        with self._lock:
+            fresh = {
+                country for country, in self._conn.execute(
+                    "SELECT country FROM country_fetches WHERE node_id = ? AND fetched_at >= ?",
+                    (node_id, cutoff)
+                )
+            }
+            rows = self._conn.execute(
+                "SELECT country, data FROM offers WHERE node_id = ? ORDER BY rowid",
+                (node_id,)
+            ).fetchall()
+
+        node: Dict[str, List[OfferDetails]] = {}
+        stale = []
+        for country in countries:
+            if country.upper() in fresh:
+                node[country.lower()] = []
+            else:
+                stale.append(country)
+        for country, data in rows:
+            key = country.lower()
+            if key in node:
+                node[key].append(OfferDetails.model_validate_json(data))
+        return GetOffersResponse[OfferDetails].model_construct(node=node), stale
+
+    def _save(self, node_id: str, countries: List[str], offers_response: GetOffersResponse[OfferDetails]):
+        now = time.time()
+        failed = set(offers_response.failed_countries)
+        fetched = [country.upper() for country in countries if country.upper() not in failed]
+        with self._lock, self._conn:
+            last_prices = {
+                (country, offer_id): (currency, price)
+                for country, offer_id, currency, price in self._conn.execute(
+                    """
+                    SELECT country, offer_id, currency, price FROM price_history
+                    WHERE node_id = ? AND rowid IN (
+                        SELECT MAX(rowid) FROM price_history WHERE node_id = ? GROUP BY country, offer_id
+                    )
+                    """,
+                    (node_id, node_id)
+                )
+            }
+            for country in fetched:
+                self._conn.execute("DELETE FROM offers WHERE node_id = ? AND country = ?", (node_id, country))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO country_fetches (node_id, country, fetched_at) VALUES (?, ?, ?)",
+                    (node_id, country, now)
+                )
+                for offer in offers_response.node.get(country.lower(), []):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO offers (node_id, country, offer_id, data) VALUES (?, ?, ?, ?)",
+                        (node_id, country, offer.id, offer.model_dump_json(by_alias=True))
+                    )
+                    price = (offer.currency, offer.retail_price_value)
+                    if last_prices.get((country, offer.id)) != price:
+                        self._conn.execute(
+                            """
+                            INSERT INTO price_history (node_id, country, offer_id, currency, price, recorded_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            """,
+                            (node_id, country, offer.id, offer.currency, offer.retail_price_value, now)
+                        )
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        """Drop data past the retention window and the least recently fetched titles over the cap"""
+        cutoff = now - self.retention_seconds
+        self._conn.execute("DELETE FROM price_history WHERE recorded_at < ?", (cutoff,))
+        self._conn.execute("DELETE FROM country_fetches WHERE fetched_at < ?", (cutoff,))
+        self._conn.execute(
+            """
+            DELETE FROM country_fetches WHERE node_id IN (
+                SELECT node_id FROM country_fetches GROUP BY node_id
+                ORDER BY MAX(fetched_at) DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_titles,)
+        )
+        # Offers and history only live as long as their title is tracked
+        self._conn.execute(
+            "DELETE FROM offers WHERE (node_id, country) NOT IN (SELECT node_id, country FROM country_fetches)"
+        )
+        self._conn.execute(
+            "DELETE FROM price_history WHERE node_id NOT IN (SELECT node_id FROM country_fetches)"
+        )
+
+    def prune(self):
+        with self._lock, self._conn:
+            self._prune(time.time())
+
+    def _price_history(
+        self,
+        node_id: str,
+        country: Optional[str],
+        offer_id: Optional[str]
+    ) -> List[PriceHistoryPoint]:
+        sql = "SELECT country, offer_id, currency, price, recorded_at FROM price_history WHERE node_id = ?"
+        params: list = [node_id]
+        if country:
+            sql += " AND country = ?"
+            params.append(country.upper())
+        if offer_id:
+            sql += " AND offer_id = ?"
+            params.append(offer_id)
+        sql += " ORDER BY recorded_at, rowid"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            PriceHistoryPoint(
+                country=country,
+                offer_id=offer_id,
+                currency=currency,
+                price=price,
+                recorded_at=recorded_at
+            )
+            for country, offer_id, currency, price, recorded_at in rows
+        ]
@@ -0,0 +1,36 @@
+"""
+Per-title offer availability summaries for search results
+"""
+from collections import Counter
+from typing import Optional, Sequence
+from app.models.justwatch_models import OfferPricing, OfferSummary
+
+TOP_PROVIDERS = 3
+
+
+def summarize_offers(offers: Sequence[OfferPricing], normalized_prices: Sequence[Optional[float]]) -> OfferSummary:
+    """Offer counts by monetization type, the cheapest paid offer and the providers with most offers
+
+    A None price marks an offer in a currency without an exchange rate; it is
+    counted but can't be the cheapest.
+    """
+    monetization_counts: Counter = Counter()
+    provider_counts: Counter = Counter()
+    cheapest_price = None
+    cheapest_provider = None
+    for offer, price in zip(offers, normalized_prices):
+        monetization_counts[offer.monetization_type or "UNKNOWN"] += 1
+        provider = offer.package.clear_name if offer.package else None
+        if provider:
+            provider_counts[provider] += 1
+        # Free and ad-supported offers have no price - they show up in the counts instead
+        if offer.retail_price_value and price is not None and (cheapest_price is None or price < cheapest_price):
+            cheapest_price = price
+            cheapest_provider = provider
+    return OfferSummary(
+        offer_count=len(offers),
+        monetization_counts=dict(monetization_counts),
+        cheapest_price=cheapest_price,
+        cheapest_provider=cheapest_provider,
+        top_providers=[provider for provider, _ in provider_counts.most_common(TOP_PROVIDERS)]
+    )
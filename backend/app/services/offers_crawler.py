@@ -0,0 +1,391 @@
+"""
+Bulk offers crawler - fetches offers for many titles into a JSONL or Parquet file
+
+Titles are read lazily from an input file and handed to a fixed pool of workers, so
+memory stays bounded by the pool size rather than the number of titles. Every upstream
+request made by the crawl, retries and hedges included, takes a token from a global
+token bucket before it is queued for an upstream slot. Rows are written in
+batches and the checkpoint only records a title once its rows have been flushed, so an
+interrupted run resumes after the last durable title; at most the titles of one unflushed
+batch are fetched again. A title with failed countries is checkpointed with those countries,
+and the next run fetches only them.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from app.models.justwatch_models import TitleOfferViewModel
+from app.services.resilience import UpstreamUnavailableError
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# One flat row per offer - the same columns in both output formats
+ROW_FIELDS: List[Tuple[str, str]] = [
+    ("nodeId", "string"),
+    ("path", "string"),
+    ("country", "string"),
+    ("offerId", "string"),
+    ("packageId", "int64"),
+    ("packageClearName", "string"),
+    ("packageTechnicalName", "string"),
+    ("monetizationType", "string"),
+    ("presentationType", "string"),
+    ("type", "string"),
+    ("retailPrice", "string"),
+    ("retailPriceValue", "float64"),
+    ("lastChangeRetailPriceValue", "float64"),
+    ("currency", "string"),
+    ("normalizedPrice", "float64"),
+    ("elementCount", "int64"),
+    ("availableTo", "string"),
+    ("standardWebURL", "string"),
+    ("packageUrl", "string"),
+    ("subtitleLanguages", "string"),
+    ("audioLanguages", "string"),
+    ("technology", "string"),
+    ("crawledAt", "float64"),
+]
+
+
+def offer_row(node_id: str, path: Optional[str], offer: TitleOfferViewModel, crawled_at: float) -> Dict[str, Any]:
+    """Flatten a view model into an output row"""
+    details = offer.offer_details
+    package = details.package
+    return {
+        "nodeId": node_id,
+        "path": path,
+        "country": offer.country,
+        "offerId": details.id,
+        "packageId": package.package_id if package else None,
+        "packageClearName": offer.package_clear_name,
+        "packageTechnicalName": package.technical_name if package else None,
+        "monetizationType": details.monetization_type,
+        "presentationType": details.presentation_type,
+        "type": details.type,
+        "retailPrice": details.retail_price,
+        "retailPriceValue": details.retail_price_value,
+        "lastChangeRetailPriceValue": details.last_change_retail_price_value,
+        "currency": details.currency,
+        "normalizedPrice": offer.normalized_price,
+        "elementCount": details.element_count,
+        "availableTo": str(details.available_to) if details.available_to is not None else None,
+        "standardWebURL": details.standard_web_url,
+        "packageUrl": offer.package_url,
+        "subtitleLanguages": offer.subtitle_languages,
+        "audioLanguages": offer.audio_languages,
+        "technology": offer.technology,
+        "crawledAt": crawled_at,
+    }
+
+
+def read_titles(path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (node_id, full_path) from a file of "node_id [full_path]" lines
+
+    Fields may be separated by whitespace, a tab or a comma; blank lines and lines
+    starting with # are skipped. The path is looked up when it is missing.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.replace(",", " ").split(None, 1)
+            yield parts[0], parts[1].strip() if len(parts) > 1 else None
+
+
+class RateLimiter:
+    """Token bucket shared by every upstream request of the crawl"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        if self.rate <= 0:
+            return
+        # Waiters queue on the lock so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Checkpoint:
+    """Append-only log of titles whose rows have been written
+
+    A line is a node ID, optionally followed by a tab and the countries still missing for
+    it. The last line for a title wins, so a later run completing the title supersedes it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        self.missing: Dict[str, List[str]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    node_id, _, countries = line.rstrip("\n").partition("\t")
+                    if not node_id:
+                        continue
+                    if countries:
+                        self.missing[node_id] = countries.split(",")
+                        self.done.discard(node_id)
+                    else:
+                        self.done.add(node_id)
+                        self.missing.pop(node_id, None)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.done
+
+    def missing_countries(self, node_id: str) -> Optional[List[str]]:
+        """Countries that failed when the title was last crawled, if it is partial"""
+        return self.missing.get(node_id)
+
+    def commit(self, finished: List[Tuple[str, List[str]]]):
+        """Record (node ID, failed countries) pairs, durably"""
+        if not finished:
+            return
+        self._file.write("".join(
+            f"{node_id}\t{','.join(failed)}\n" if failed else f"{node_id}\n" for node_id, failed in finished
+        ))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        for node_id, failed in finished:
+            if failed:
+                self.missing[node_id] = failed
+            else:
+                self.done.add(node_id)
+                self.missing.pop(node_id, None)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    """Appends rows as JSON lines; an interrupted run continues the same file"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        self._file.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes each flushed batch as its own part file in the output directory
+
+    A Parquet file is unreadable until its footer is written, so batches are not
+    row groups of one long-lived file: each part is complete, and renamed into
+    place, before the titles in it are checkpointed.
+    """
+
+    def __init__(self, path: str):
+        if pyarrow is None:
+            raise RuntimeError("Parquet output requires the pyarrow package")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.schema = pyarrow.schema([(name, type_name) for name, type_name in ROW_FIELDS])
+        self._run = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._parts = 0
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        self._parts += 1
+        part_path = os.path.join(self.path, f"part-{self._run}-{self._parts:05d}.parquet")
+        tmp_path = f"{part_path}.tmp"
+        table = pyarrow.Table.from_pylist(rows, schema=self.schema)
+        pyarrow.parquet.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, part_path)
+
+    def close(self):
+        pass
+
+
+def open_writer(output: str, output_format: str):
+    if output_format == "parquet":
+        return ParquetWriter(output)
+    return JsonlWriter(output)
+
+
+@dataclass
+class CrawlStats:
+    titles: int = 0
+    skipped: int = 0
+    resumed: int = 0
+    offers: int = 0
+    not_found: int = 0
+    partial: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "titles": self.titles,
+            "skipped": self.skipped,
+            "resumed": self.resumed,
+            "offers": self.offers,
+            "notFound": self.not_found,
+            "partial": self.partial,
+            "failed": self.failed,
+            "seconds": round(elapsed, 1),
+            "titlesPerSecond": round(self.titles / elapsed, 2) if elapsed > 0 else None,
+        }
+
+
+class OffersCrawler:
+    def __init__(
+        self,
+        service,
+        writer,
+        checkpoint: Checkpoint,
+        concurrency: int = 8,
+        batch_rows: int = 5000,
+        countries: Optional[List[str]] = None,
+        max_attempts: int = 3
+    ):
+        self.service = service
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.batch_rows = batch_rows
+        self.countries = countries
+        self.max_attempts = max_attempts
+        self.stats = CrawlStats()
+        self._rows: List[Dict[str, Any]] = []
+        self._finished: List[Tuple[str, List[str]]] = []
+        self._write_lock = asyncio.Lock()
+
+    async def run(self, titles: Iterator[Tuple[str, Optional[str]]]) -> CrawlStats:
+        """Crawl every title not already in the checkpoint"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            for node_id, path in titles:
+                if node_id in self.checkpoint:
+                    self.stats.skipped += 1
+                    continue
+                missing = self.checkpoint.missing_countries(node_id)
+                if missing:
+                    self.stats.resumed += 1
+                await queue.put((node_id, path, missing))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # Whatever finished before an interruption is kept
+            await self._flush()
+        return self.stats
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            node_id, path, missing = item
+            try:
+                rows, failed = await self._crawl_title(node_id, path, missing)
+            except Exception as e:
+                # Not checkpointed - the next run tries the title again
+                self.stats.failed += 1
+                logger.warning("Offers for %s failed: %s", node_id, e)
+                continue
+            await self._add(node_id, rows, failed)
+
+    async def _crawl_title(
+        self,
+        node_id: str,
+        path: Optional[str],
+        missing: Optional[List[str]]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        attempt = 1
+        while True:
+            try:
+                return await self._fetch(node_id, path, missing)
+            except UpstreamUnavailableError as e:
+                # Breaker open or queue full - wait as long as the service asks, then try again
+                if attempt >= self.max_attempts:
+                    raise
+                attempt += 1
+                await asyncio.sleep(e.retry_after)
+
+    async def _fetch(
+        self,
+        node_id: str,
+        path: Optional[str],
+        missing: Optional[List[str]]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Rows for a title and the countries that failed - only `missing` ones when resuming it"""
+        if not self.countries and not path:
+            title = await self.service.get_title(node_id)
+            path = title.content.full_path if title and title.content else None
+            if not path:
+                self.stats.not_found += 1
+                return [], []
+        # get_all_offers_response does this itself; get_title_offers leaves it to the caller
+        await self.service.currency_converter.initialize()
+        countries = missing or self.countries
+        if countries:
+            offers_response = await self.service.get_title_offers(node_id, countries)
+        else:
+            offers_response = await self.service.get_all_offers_response(node_id, path)
+        if offers_response is None:
+            self.stats.not_found += 1
+            return [], []
+        failed = list(offers_response.failed_countries)
+        if failed:
+            self.stats.partial += 1
+            logger.info("Offers for %s missing countries %s", node_id, ",".join(failed))
+        crawled_at = time.time()
+        rows = [
+            offer_row(node_id, path, offer, crawled_at)
+            for offer in self.service.build_offer_view_models(offers_response)
+        ]
+        return rows, failed
+
+    async def _add(self, node_id: str, rows: List[Dict[str, Any]], failed: List[str]):
+        self.stats.titles += 1
+        self.stats.offers += len(rows)
+        self._rows.extend(rows)
+        # Checkpointed with its failed countries, so the next run fetches only those
+        self._finished.append((node_id, failed))
+        if len(self._rows) >= self.batch_rows:
+            await self._flush()
+
+    async def _flush(self):
+        async with self._write_lock:
+            rows, self._rows = self._rows, []
+            finished, self._finished = self._finished, []
+            if rows:
+                await asyncio.to_thread(self.writer.write_rows, rows)
+            # Only after the rows are on disk
+            self.checkpoint.commit(finished)
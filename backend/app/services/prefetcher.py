@@ -0,0 +1,126 @@
+"""
+Speculative prefetching of the titles a user is likely to open next
+
+After a search, the top results are warmed in the background - title details, URL
+metadata and offers - so the detail page is served from the caches and the offer store.
+Prefetches run at background priority, are deduplicated per title, capped in number,
+and skipped or cancelled while the upstream pool is busy. Warmed entries are tracked
+for a while so the metrics show how many prefetches a real request actually used.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from app import config
+from app.services import metrics
+from app.services.scheduler import Priority, UpstreamScheduler, is_background, priority_floor
+
+logger = logging.getLogger(__name__)
+
+PREFETCHES = metrics.registry.counter(
+    "justwatch_prefetch_total", "Prefetch attempts by outcome", ("outcome",)
+)
+PREFETCH_WARMED = metrics.registry.counter(
+    "justwatch_prefetch_warmed_total", "Entries warmed by prefetching", ("kind",)
+)
+PREFETCH_USED = metrics.registry.counter(
+    "justwatch_prefetch_used_total", "Prefetched entries later requested by a client", ("kind",)
+)
+PREFETCH_PENDING = metrics.registry.gauge(
+    "justwatch_prefetch_pending", "Prefetches currently running"
+)
+
+# Kept per kind and title, well above what max_pending * top_k can produce in one usage window
+MAX_TRACKED = 4096
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        scheduler: UpstreamScheduler,
+        warm: Callable[[str, Optional[str]], Awaitable[List[str]]],
+        top_k: int = config.PREFETCH_TOP_K,
+        max_pending: int = config.PREFETCH_MAX_PENDING,
+        busy_utilization: float = config.PREFETCH_BUSY_UTILIZATION,
+        usage_window: float = config.PREFETCH_USAGE_WINDOW
+    ):
+        self.scheduler = scheduler
+        self.warm = warm
+        self.top_k = top_k
+        self.max_pending = max_pending
+        self.busy_utilization = busy_utilization
+        self.usage_window = usage_window
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._warmed: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    def schedule(self, candidates: Iterable[Tuple[str, Optional[str]]]):
+        """Start prefetching the first top_k (node_id, full_path) candidates"""
+        if self.top_k <= 0:
+            return
+        if self.scheduler.is_busy(self.busy_utilization):
+            # Real traffic needs the slots - drop speculative work, running or not
+            PREFETCHES.inc(outcome="skipped_busy")
+            self.cancel_all()
+            return
+        for node_id, path in list(candidates)[:self.top_k]:
+            if node_id in self._pending or self._is_warm("title", node_id):
+                PREFETCHES.inc(outcome="deduplicated")
+            elif len(self._pending) >= self.max_pending:
+                PREFETCHES.inc(outcome="dropped")
+            else:
+                PREFETCHES.inc(outcome="started")
+                task = asyncio.create_task(self._run(node_id, path))
+                self._pending[node_id] = task
+                task.add_done_callback(lambda _, key=node_id: self._done(key))
+                PREFETCH_PENDING.set(len(self._pending))
+
+    def note_access(self, kind: str, node_id: str):
+        """Record a client request for an entry, counting it if a prefetch warmed it"""
+        if is_background():
+            return
+        warmed_at = self._warmed.pop((kind, node_id), None)
+        if warmed_at is not None and time.monotonic() - warmed_at <= self.usage_window:
+            PREFETCH_USED.inc(kind=kind)
+
+    def cancel_all(self):
+        """Cancel every running prefetch"""
+        for task in self._pending.values():
+            task.cancel()
+
+    async def stop(self):
+        """Cancel running prefetches and wait for them to finish"""
+        tasks = list(self._pending.values())
+        self.cancel_all()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._pending), "tracked": len(self._warmed)}
+
+    async def _run(self, node_id: str, path: Optional[str]):
+        with priority_floor(Priority.BACKGROUND):
+            try:
+                kinds = await self.warm(node_id, path)
+            except asyncio.CancelledError:
+                PREFETCHES.inc(outcome="cancelled")
+                raise
+            except Exception as e:
+                PREFETCHES.inc(outcome="failed")
+                logger.debug("Prefetch of %s failed: %s", node_id, e)
+                return
+        now = time.monotonic()
+        for kind in kinds:
+            self._warmed[(kind, node_id)] = now
+            self._warmed.move_to_end((kind, node_id))
+            PREFETCH_WARMED.inc(kind=kind)
+        while len(self._warmed) > MAX_TRACKED:
+            self._warmed.popitem(last=False)
+        PREFETCHES.inc(outcome="completed")
+
+    def _is_warm(self, kind: str, node_id: str) -> bool:
+        warmed_at = self._warmed.get((kind, node_id))
+        return warmed_at is not None and time.monotonic() - warmed_at <= self.usage_window
+
+    def _done(self, node_id: str):
+        self._pending.pop(node_id, None)
+        PREFETCH_PENDING.set(len(self._pending))
@@ -0,0 +1,223 @@
+"""
+Per-title price comparison index across countries and providers
+
+Built once from a title's offer view models and cached. Only a price entry's fields are
+kept from each priced offer, so the view models are not held by the cache. Offers are grouped by
+every combination of monetization type, provider and quality, with "any" in each
+position, so a lookup for any filter is a single dictionary access. Each group keeps the
+cheapest offer per country and the group's prices; its response, with the cheapest
+countries and the price percentiles, is built the first time it is looked up. Offers in
+currencies without an exchange rate can't be compared in USD: they are counted and
+flagged instead of ranked at the converter's placeholder price.
+"""
+import heapq
+import time
+from itertools import product
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.models.justwatch_models import (
+    BestOffersResponse,
+    PriceEntry,
+    PriceFacets,
+    PricePercentiles,
+    TitleOfferViewModel
+)
+
+GroupKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def quality_label(presentation_type: Optional[str]) -> str:
+    """Quality bucket of a presentation type: 4K, HD, SD or OTHER"""
+    quality = (presentation_type or "").upper()
+    if "4K" in quality or "UHD" in quality:
+        return "4K"
+    if "HD" in quality:
+        return "HD"
+    if "SD" in quality:
+        return "SD"
+    return "OTHER"
+
+
+class _PricedOffer(NamedTuple):
+    """The fields of a PriceEntry, without the rest of the view model"""
+    country: str
+    provider: Optional[str]
+    monetization_type: Optional[str]
+    presentation_type: Optional[str]
+    retail_price: Optional[str]
+    retail_price_value: Optional[float]
+    currency: Optional[str]
+    normalized_price: float
+    package_url: Optional[str]
+
+
+def _price(cheapest: Tuple[float, _PricedOffer]) -> float:
+    return cheapest[0]
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    # Nearest rank on an ascending list
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class _GroupBuilder:
+    __slots__ = ("offer_count", "prices", "cheapest", "unknown_currencies", "unknown_count")
+
+    def __init__(self):
+        self.offer_count = 0
+        self.prices: List[float] = []
+        # Cheapest (price, offer) per country; entries are only built for the top N
+        self.cheapest: Dict[str, Tuple[float, _PricedOffer]] = {}
+        self.unknown_currencies: Dict[str, None] = {}
+        self.unknown_count = 0
+
+
+class PriceIndex:
+    def __init__(
+        self,
+        node_id: str,
+        builders: Dict[GroupKey, _GroupBuilder],
+        providers: Dict[str, str],
+        top_n: int,
+        failed_countries: Optional[List[str]] = None
+    ):
+        self.node_id = node_id
+        self.top_n = top_n
+        # Countries missing from the offers it was built from - such an index is not cached
+        self.failed_countries = failed_countries or []
+        self.built_at = time.time()
+        self._builders = builders
+        self._providers = providers
+        self.facets = PriceFacets.model_construct(
+            monetization_types=sorted({key[0] for key in builders if key[0] is not None}),
+            providers=sorted(providers.values(), key=str.casefold),
+            qualities=sorted({key[2] for key in builders if key[2] is not None})
+        )
+        # Responses are built on first lookup - most filter combinations are never asked for
+        self._groups: Dict[GroupKey, BestOffersResponse] = {}
+        self._entries: Dict[int, PriceEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._builders)
+
+    @classmethod
+    def build(
+        cls,
+        node_id: str,
+        offers: List[TitleOfferViewModel],
+        is_known_currency: Callable[[Optional[str]], bool],
+        top_n: int,
+        failed_countries: Optional[List[str]] = None
+    ) -> "PriceIndex":
+        """Index view models by every (monetization type, provider, quality) filter"""
+        builders: Dict[GroupKey, _GroupBuilder] = {}
+        providers: Dict[str, str] = {}
+        for offer in offers:
+            monetization = (offer.monetization_type or "UNKNOWN").upper()
+            provider = offer.package_clear_name
+            quality = quality_label(offer.presentation_type)
+            provider_key = None
+            if provider:
+                provider_key = provider.casefold()
+                providers.setdefault(provider_key, provider)
+
+            currency = offer.offer_details.currency
+            priced = offer.retail_price_value is not None and offer.retail_price_value > 0
+            unknown = priced and not is_known_currency(currency)
+            price = offer.normalized_price
+            country = offer.country
+            priced_offer = None
+            if priced and not unknown:
+                priced_offer = _PricedOffer(
+                    country,
+                    provider,
+                    offer.monetization_type,
+                    offer.presentation_type,
+                    offer.retail_price,
+                    offer.retail_price_value,
+                    currency,
+                    price,
+                    offer.package_url
+                )
+
+            # A set - an offer without a provider only has the "any provider" keys
+            for key in set(product((monetization, None), (provider_key, None), (quality, None))):
+                builder = builders.get(key)
+                if builder is None:
+                    builder = builders[key] = _GroupBuilder()
+                builder.offer_count += 1
+                if unknown:
+                    builder.unknown_count += 1
+                    builder.unknown_currencies[currency or "UNKNOWN"] = None
+                elif priced_offer is not None:
+                    builder.prices.append(price)
+                    current = builder.cheapest.get(country)
+                    if current is None or price < current[0]:
+                        builder.cheapest[country] = (price, priced_offer)
+        return cls(node_id, builders, providers, top_n, failed_countries)
+
+    def best(
+        self,
+        monetization_type: Optional[str] = None,
+        provider: Optional[str] = None,
+        quality: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> BestOffersResponse:
+        """The group for a filter - empty when no offer matches it"""
+        key = (
+            monetization_type.upper() if monetization_type else None,
+            provider.casefold() if provider else None,
+            quality_label(quality) if quality else None
+        )
+        group = self._groups.get(key)
+        if group is None:
+            builder = self._builders.get(key)
+            if builder is None:
+                return self._response(key, provider, _GroupBuilder())
+            provider_name = self._providers.get(key[1]) if key[1] is not None else None
+            group = self._groups[key] = self._response(key, provider_name, builder)
+        if limit is not None and limit < len(group.cheapest):
+            return group.model_copy(update={"cheapest": group.cheapest[:limit]})
+        return group
+
+    def _response(self, key: GroupKey, provider: Optional[str], builder: _GroupBuilder) -> BestOffersResponse:
+        prices = sorted(builder.prices)
+        return BestOffersResponse.model_construct(
+            node_id=self.node_id,
+            monetization_type=key[0],
+            provider=provider,
+            quality=key[2],
+            offer_count=builder.offer_count,
+            priced_count=len(prices),
+            unknown_currency_count=builder.unknown_count,
+            unknown_currencies=list(builder.unknown_currencies),
+            cheapest=[
+                self._entry(offer) for _, offer in heapq.nsmallest(self.top_n, builder.cheapest.values(), key=_price)
+            ],
+            percentiles=PricePercentiles.model_construct(
+                min=prices[0],
+                p25=_percentile(prices, 0.25),
+                median=_percentile(prices, 0.5),
+                p75=_percentile(prices, 0.75),
+                max=prices[-1]
+            ) if prices else None,
+            facets=self.facets,
+            failed_countries=self.failed_countries,
+            built_at=self.built_at
+        )
+
+    def _entry(self, offer: _PricedOffer) -> PriceEntry:
+        # Groups overlap heavily, so the same offer is often among several groups' cheapest
+        entry = self._entries.get(id(offer))
+        if entry is None:
+            entry = self._entries[id(offer)] = PriceEntry.model_construct(
+                country=offer.country,
+                provider=offer.provider,
+                monetization_type=offer.monetization_type,
+                presentation_type=offer.presentation_type,
+                retail_price=offer.retail_price,
+                retail_price_value=offer.retail_price_value,
+                currency=offer.currency,
+                normalized_price=offer.normalized_price,
+                package_url=offer.package_url
+            )
+        return entry
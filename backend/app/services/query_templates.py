@@ -0,0 +1,250 @@
+"""
+GraphQL query templates - documents rendered once per shape, and offer projection profiles
+
+Offers and batched-node documents have their aliases written into the query text, so the
+document depends on the country set or the number of nodes. Each distinct document is
+rendered once, with its whitespace collapsed, and reused from a bounded LRU. Offer
+profiles choose which offer fields a document selects and the model that parses them:
+"full" for the title page, "pricing" for callers that only need price and provider.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Tuple, Type
+from app.models.justwatch_models import (
+    GetOfferPricingEnvelope,
+    GetOffersEnvelope,
+    GetOffersResponse,
+    OfferDetails,
+    OfferPricing,
+    OfferT
+)
+
+_PRICING_SELECTION = """
+    id
+    presentationType
+    monetizationType
+    retailPrice(language: $language)
+    retailPriceValue
+    currency
+    lastChangeRetailPriceValue
+    type
+    package {
+        id
+        packageId
+        clearName
+        technicalName
+    }
+"""
+
+_FULL_SELECTION = """
+    id
+    presentationType
+    monetizationType
+    retailPrice(language: $language)
+    retailPriceValue
+    currency
+    lastChangeRetailPriceValue
+    type
+    package {
+        id
+        packageId
+        clearName
+        technicalName
+        icon(profile: S100)
+        __typename
+    }
+    standardWebURL
+    elementCount
+    availableTo
+    deeplinkRoku: deeplinkURL(platform: ROKU_OS)
+    subtitleLanguages
+    videoTechnology
+    audioTechnology
+    audioLanguages
+    __typename
+"""
+
+_TITLE_DETAILS_SELECTION = """
+    id
+    objectId
+    objectType
+    content(country: $country, language: $language) {
+        title
+        fullPath
+        originalReleaseYear
+        originalReleaseDate
+        productionCountries
+        runtime
+        shortDescription
+        genres {
+            shortName
+            __typename
+        }
+        externalIds {
+            imdbId
+            tmdbId
+            __typename
+        }
+        posterUrl(profile: $profile, format: $formatPoster)
+        backdrops(profile: $backdropProfile, format: $formatPoster) {
+            backdropUrl
+            __typename
+        }
+        __typename
+    }
+    __typename
+"""
+
+
+@dataclass(frozen=True)
+class OfferProfile(Generic[OfferT]):
+    name: str
+    selection: str
+    model: Type[OfferT]
+    envelope: Type[GetOffersEnvelope] | Type[GetOfferPricingEnvelope]
+    response: Type[GetOffersResponse[OfferT]]
+
+
+FULL = OfferProfile(
+    "full", _FULL_SELECTION, OfferDetails, GetOffersEnvelope, GetOffersResponse[OfferDetails]
+)
+PRICING = OfferProfile(
+    "pricing", _PRICING_SELECTION, OfferPricing, GetOfferPricingEnvelope, GetOffersResponse[OfferPricing]
+)
+OFFER_PROFILES: Dict[str, OfferProfile[Any]] = {profile.name: profile for profile in (FULL, PRICING)}
+
+
+def _compact(document: str) -> str:
+    # None of the documents contain string literals, so all whitespace runs are insignificant
+    return " ".join(document.split())
+
+
+class QueryTemplates:
+    """LRU of rendered GraphQL documents keyed by operation and shape"""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._documents: "OrderedDict[Tuple[str, Hashable], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _get(self, operation: str, key: Hashable, render: Callable[[], str]) -> str:
+        cache_key = (operation, key)
+        document = self._documents.get(cache_key)
+        if document is not None:
+            self.hits += 1
+            self._documents.move_to_end(cache_key)
+            return document
+        self.misses += 1
+        document = self._documents[cache_key] = _compact(render())
+        if len(self._documents) > self.max_size:
+            self._documents.popitem(last=False)
+        return document
+
+    def title_offers(self, countries: Iterable[str], profile: OfferProfile = FULL) -> str:
+        """GetTitleOffers with one aliased offers(country:) selection per country"""
+        key = (tuple(country.upper() for country in countries), profile.name)
+        return self._get("GetTitleOffers", key, lambda: self._render_title_offers(key[0], profile))
+
+    def title_nodes(self, count: int) -> str:
+        """GetTitleNodes with node(id: $id0) ... node(id: $id{count - 1}) selections"""
+        return self._get("GetTitleNodes", count, lambda: self._render_title_nodes(count))
+
+    def search_offers(self, count: int, profile: OfferProfile = PRICING) -> str:
+        """GetSearchOffers - one country's offers for count aliased nodes"""
+        return self._get(
+            "GetSearchOffers", (count, profile.name), lambda: self._render_search_offers(count, profile)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._documents), "maxSize": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _render_title_offers(countries: Tuple[str, ...], profile: OfferProfile) -> str:
+        # Each country is hardcoded in the query as the alias of its offers selection
+        country_queries = "".join(
+            f"""
+                {country.lower()}: offers(country: {country}, platform: $platform, filter: $filterBuy) {{
+                    ...TitleOffer
+                    __typename
+                }}
+            """
+            for country in countries
+        )
+        return f"""
+            query GetTitleOffers($nodeId: ID!, $language: Language!, $filterBuy: OfferFilter!, $platform: Platform!) {{
+                node(id: $nodeId) {{
+                    ... on MovieOrShowOrSeasonOrEpisode {{
+                        {country_queries}
+                    }}
+                }}
+            }}
+
+            fragment TitleOffer on Offer {{
+                {profile.selection}
+            }}
+        """
+
+    @staticmethod
+    def _render_title_nodes(count: int) -> str:
+        id_params = ", ".join(f"$id{index}: ID!" for index in range(count))
+        node_queries = "".join(
+            f"""
+                n{index}: node(id: $id{index}) {{
+                    ...TitleDetails
+                }}
+            """
+            for index in range(count)
+        )
+        return f"""
+            query GetTitleNodes(
+                {id_params},
+                $language: Language!,
+                $country: Country!,
+                $formatPoster: ImageFormat,
+                $profile: PosterProfile,
+                $backdropProfile: BackdropProfile
+            ) {{
+                {node_queries}
+            }}
+
+            fragment TitleDetails on Node {{
+                ... on MovieOrShow {{
+                    {_TITLE_DETAILS_SELECTION}
+                }}
+            }}
+        """
+
+    @staticmethod
+    def _render_search_offers(count: int, profile: OfferProfile) -> str:
+        id_params = ", ".join(f"$id{index}: ID!" for index in range(count))
+        node_queries = "".join(
+            f"""
+                n{index}: node(id: $id{index}) {{
+                    ... on MovieOrShowOrSeasonOrEpisode {{
+                        offers(country: $country, platform: $platform, filter: $filter) {{
+                            ...SearchOffer
+                        }}
+                    }}
+                }}
+            """
+            for index in range(count)
+        )
+        return f"""
+            query GetSearchOffers(
+                {id_params},
+                $country: Country!,
+                $language: Language!,
+                $platform: Platform!,
+                $filter: OfferFilter!
+            ) {{
+                {node_queries}
+            }}
+
+            fragment SearchOffer on Offer {{
+                {profile.selection}
+            }}
+        """
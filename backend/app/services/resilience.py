@@ -0,0 +1,238 @@
+"""
+Upstream resilience - hedged requests, jittered retries under a global budget, and a circuit breaker
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import httpx
+from app.services import metrics
+
+HEDGES = metrics.registry.counter(
+    "justwatch_upstream_hedges_total", "Hedged duplicate upstream requests", ("operation", "outcome")
+)
+RETRIES = metrics.registry.counter(
+    "justwatch_upstream_retries_total", "Upstream retries", ("operation",)
+)
+BUDGET_EXHAUSTED = metrics.registry.counter(
+    "justwatch_upstream_retry_budget_exhausted_total", "Retries or hedges skipped for lack of budget", ("kind",)
+)
+BREAKER_STATE = metrics.registry.gauge(
+    "justwatch_upstream_circuit_open", "1 while the upstream circuit breaker is open"
+)
+
+
+class UpstreamUnavailableError(Exception):
+    """The upstream can't be called right now; clients should retry after retry_after seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient(error: BaseException) -> bool:
+    """Errors worth retrying: connection problems, timeouts, 429 and 5xx"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies per operation"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, operation: str, seconds: float):
+        samples = self._samples.get(operation)
+        if samples is None:
+            samples = self._samples[operation] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, operation: str, percentile: float) -> Optional[float]:
+        samples = self._samples.get(operation)
+        if not samples or len(samples) < 20:
+            # Too little data for a meaningful threshold
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+
+class RetryBudget:
+    """Token bucket: every request deposits `ratio` tokens, every retry or hedge spends one"""
+
+    def __init__(self, ratio: float, initial: float, cap: float):
+        self.ratio = ratio
+        self.cap = cap
+        self.tokens = initial
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.cap)
+
+    def try_spend(self, kind: str) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        BUDGET_EXHAUSTED.inc(kind=kind)
+        return False
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after reset_timeout lets one probe through (half-open)"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_call(self) -> bool:
+        """Raise while open; return True if this call is the half-open probe"""
+        if self.opened_at is None:
+            return False
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if remaining > 0 or self._probing:
+            raise UpstreamUnavailableError("Upstream circuit breaker is open", max(remaining, 1.0))
+        self._probing = True
+        return True
+
+    def release_probe(self):
+        """End a probe that gave no verdict on the upstream, so the next call probes instead"""
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        BREAKER_STATE.set(0)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            BREAKER_STATE.set(1)
+
+
+class ResilientCaller:
+    def __init__(
+        self,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        hedge_percentile: Optional[float],
+        hedge_min_delay: float,
+        budget: RetryBudget,
+        breaker: CircuitBreaker,
+        throttle: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.budget = budget
+        self.breaker = breaker
+        # Awaited before every attempt, hedges included - e.g. a rate limit
+        self.throttle = throttle
+        self.latencies = LatencyTracker()
+
+    async def call(self, operation: str, fn: Callable[[], Awaitable[Any]], idempotent: bool = True) -> Any:
+        """Call fn with hedging and retries (idempotent calls only), guarded by the circuit breaker"""
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            # Before the breaker and the attempt: a request waiting for its turn holds
+            # neither the half-open probe nor an upstream slot, and isn't timed
+            await self._throttle()
+            probing = self.breaker.before_call()
+            try:
+                if idempotent:
+                    result = await self._hedged(operation, fn)
+                else:
+                    result = await self._timed(operation, fn)
+            except UpstreamUnavailableError:
+                # Shed locally (breaker or admission control) - the upstream was never asked,
+                # so a shed probe says nothing about it either
+                if probing:
+                    self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # The upstream answered; a 4xx or a parse error says nothing about its health
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if not idempotent or attempt >= self.max_retries or self.breaker.is_open:
+                    raise
+                if not self.budget.try_spend("retry"):
+                    raise
+                RETRIES.inc(operation=operation)
+                attempt += 1
+                # Full jitter keeps retries from synchronizing across callers
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                continue
+            except BaseException:
+                # Cancelled mid-attempt - a probe must not hold the half-open slot forever
+                if probing:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def _throttle(self):
+        if self.throttle is not None:
+            await self.throttle()
+
+    async def _throttled(self, operation: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        await self._throttle()
+        return await self._timed(operation, fn)
+
+    async def _timed(self, operation: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        result = await fn()
+        self.latencies.record(operation, time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, operation: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        threshold = None
+        if self.hedge_percentile is not None:
+            threshold = self.latencies.percentile(operation, self.hedge_percentile)
+        if threshold is None:
+            return await self._timed(operation, fn)
+
+        primary = asyncio.ensure_future(self._timed(operation, fn))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(threshold, self.hedge_min_delay))
+            if not done:
+                if self.budget.try_spend("hedge"):
+                    tasks.append(asyncio.ensure_future(self._throttled(operation, fn)))
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+            winner = next(iter(done))
+            if winner.exception() is not None and len(tasks) > 1:
+                # One attempt failed - the other may still succeed
+                others = [task for task in tasks if task is not winner]
+                await asyncio.wait(others)
+                successful = [task for task in others if task.exception() is None]
+                if successful:
+                    winner = successful[0]
+            if len(tasks) > 1:
+                HEDGES.inc(operation=operation, outcome="hedge_won" if winner is not primary else "primary_won")
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    # Mark exceptions of losing attempts as retrieved
+                    task.exception()
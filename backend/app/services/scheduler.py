@@ -0,0 +1,232 @@
+"""
+Priority-aware admission control for upstream requests
+
+All upstream calls share one bounded concurrency pool. When it is full, callers wait in a
+per-class queue and freed slots go to the highest-priority class first. A full queue or a
+wait past the class's timeout sheds the request with UpstreamOverloadedError (HTTP 503).
+
+Work started under priority_floor() (e.g. speculative prefetching) never runs ahead of
+the class it was lowered to, whatever the operation. Background work is also capped at a
+share of the pool, so a burst of prefetches can't fill every slot before a real request
+arrives. A call shared by several callers runs under a SharedPriority: when a more urgent
+caller joins, the call's floor is lowered and any slot request it has queued moves up to
+the new class.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional
+from app.services import metrics
+from app.services.resilience import UpstreamUnavailableError
+
+QUEUE_DEPTH = metrics.registry.gauge(
+    "justwatch_scheduler_queue_depth", "Upstream requests waiting for a slot", ("priority",)
+)
+QUEUE_WAIT_SECONDS = metrics.registry.histogram(
+    "justwatch_scheduler_wait_seconds", "Time spent waiting for an upstream slot", ("priority",)
+)
+SHED = metrics.registry.counter(
+    "justwatch_scheduler_shed_total", "Upstream requests rejected by admission control", ("priority", "reason")
+)
+ACTIVE = metrics.registry.gauge(
+    "justwatch_scheduler_active", "Upstream slots in use"
+)
+
+
+class Priority(IntEnum):
+    """Lower value = served first"""
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+_priority_floor: ContextVar[Priority] = ContextVar("upstream_priority_floor", default=Priority.INTERACTIVE)
+_shared_priority: ContextVar[Optional["SharedPriority"]] = ContextVar("upstream_shared_priority", default=None)
+
+# Result of a queued slot request that was moved to a more urgent class
+_PROMOTED = object()
+
+
+class SharedPriority:
+    """Priority floor of a call shared by several callers - the most urgent caller sets it"""
+
+    def __init__(self, floor: Priority):
+        self.floor = floor
+        self._waiting: Dict[asyncio.Future, "UpstreamScheduler"] = {}
+
+    def raise_to(self, priority: Priority):
+        """Lower the floor to priority, re-queueing slot requests already waiting at the old one"""
+        if priority >= self.floor:
+            return
+        self.floor = priority
+        for waiter, scheduler in list(self._waiting.items()):
+            scheduler._promote(waiter)
+
+
+@contextmanager
+def priority_floor(priority: Priority) -> Iterator[None]:
+    """Run upstream calls made in this block at no better than the given priority"""
+    token = _priority_floor.set(priority)
+    try:
+        yield
+    finally:
+        _priority_floor.reset(token)
+
+
+@contextmanager
+def shared_priority(shared: SharedPriority) -> Iterator[None]:
+    """Run upstream calls made in this block at the shared call's floor, which may change"""
+    token = _shared_priority.set(shared)
+    try:
+        yield
+    finally:
+        _shared_priority.reset(token)
+
+
+def current_floor() -> Priority:
+    """The floor of the current context - a shared call's, if inside one"""
+    shared = _shared_priority.get()
+    return shared.floor if shared is not None else _priority_floor.get()
+
+
+def effective_priority(priority: Priority) -> Priority:
+    """The priority a call gets once the current context's floor is applied"""
+    return max(priority, current_floor())
+
+
+def is_background() -> bool:
+    """True inside speculative work that no caller is waiting on"""
+    return _priority_floor.get() >= Priority.BACKGROUND
+
+
+class UpstreamOverloadedError(UpstreamUnavailableError):
+    def __init__(self, message: str, retry_after: float, priority: Priority):
+        super().__init__(message, retry_after)
+        self.priority = priority
+
+
+class UpstreamScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        queue_limits: Dict[Priority, int],
+        queue_timeouts: Dict[Priority, float],
+        background_share: float = 1.0
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_limits = queue_limits
+        self.queue_timeouts = queue_timeouts
+        self.background_limit = max(1, int(max_concurrency * background_share))
+        self.active = 0
+        self._active: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._queues: Dict[Priority, Deque[asyncio.Future]] = {priority: deque() for priority in Priority}
+
+    def queue_depth(self, priority: Priority) -> int:
+        return len(self._queues[priority])
+
+    def is_busy(self, utilization: float = 1.0) -> bool:
+        """True when anything is queued or at least the given share of slots is in use"""
+        return any(self._queues.values()) or self.active >= self.max_concurrency * utilization
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        """Hold one upstream slot for the duration of the block, at priority after the context's floor"""
+        priority = await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def _can_start(self, priority: Priority) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        return priority != Priority.BACKGROUND or self._active[Priority.BACKGROUND] < self.background_limit
+
+    async def _acquire(self, base_priority: Priority) -> Priority:
+        shared = _shared_priority.get()
+        while True:
+            priority = effective_priority(base_priority)
+            label = priority.name.lower()
+            # Waiters of a lower class don't block a free slot - they are only queued when
+            # the pool is full or, for background work, when its share is used up
+            ahead = any(self._queues[queued] for queued in Priority if queued <= priority)
+            if not ahead and self._can_start(priority):
+                self._take(priority)
+                QUEUE_WAIT_SECONDS.observe(0.0, priority=label)
+                return priority
+
+            queue = self._queues[priority]
+            if len(queue) >= self.queue_limits[priority]:
+                SHED.inc(priority=label, reason="queue_full")
+                raise UpstreamOverloadedError("Upstream queue is full", retry_after=1.0, priority=priority)
+
+            waiter = asyncio.get_running_loop().create_future()
+            queue.append(waiter)
+            QUEUE_DEPTH.set(len(queue), priority=label)
+            if shared is not None:
+                shared._waiting[waiter] = self
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeouts[priority])
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled() and waiter.result() is not _PROMOTED:
+                    # The slot was handed over just as we gave up - pass it on
+                    self._release(priority)
+                else:
+                    waiter.cancel()
+                    if waiter in queue:
+                        queue.remove(waiter)
+                QUEUE_DEPTH.set(len(queue), priority=label)
+                if isinstance(e, asyncio.TimeoutError):
+                    SHED.inc(priority=label, reason="timeout")
+                    raise UpstreamOverloadedError("Timed out waiting for an upstream slot", retry_after=2.0, priority=priority)
+                raise
+            finally:
+                if shared is not None:
+                    shared._waiting.pop(waiter, None)
+                QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, priority=label)
+            if waiter.result() is not _PROMOTED:
+                return priority
+            # Promoted - queue again at the new class, with its own timeout
+
+    def _promote(self, waiter: asyncio.Future):
+        if waiter.done():
+            return
+        for priority, queue in self._queues.items():
+            if waiter in queue:
+                queue.remove(waiter)
+                QUEUE_DEPTH.set(len(queue), priority=priority.name.lower())
+                break
+        waiter.set_result(_PROMOTED)
+
+    def _take(self, priority: Priority):
+        self.active += 1
+        self._active[priority] += 1
+        ACTIVE.set(self.active)
+
+    def _release(self, priority: Priority):
+        self.active -= 1
+        self._active[priority] -= 1
+        ACTIVE.set(self.active)
+        # Hand the slot to the highest-priority waiter that may start, if any
+        for queued in Priority:
+            queue = self._queues[queued]
+            while queue and self._can_start(queued):
+                waiter = queue.popleft()
+                QUEUE_DEPTH.set(len(queue), priority=queued.name.lower())
+                if not waiter.done():
+                    self._take(queued)
+                    waiter.set_result(None)
+                    return
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "maxConcurrency": self.max_concurrency,
+            "backgroundActive": self._active[Priority.BACKGROUND],
+            "backgroundLimit": self.background_limit,
+            **{f"{priority.name.lower()}Queued": len(queue) for priority, queue in self._queues.items()},
+        }
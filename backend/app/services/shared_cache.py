@@ -0,0 +1,156 @@
+"""
+Host-wide L2 cache shared by all worker processes - SQLite in WAL mode
+
+Sits behind each worker's in-process TTLCache: a local miss checks here before going
+upstream, and values loaded by any worker are written through for the others. Values
+are stored as zlib-compressed JSON with None fields dropped. Expiry uses wall-clock
+time so it means the same thing in every process. Writes are batched and run in a
+worker thread so they never hold up a response.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+from pydantic import TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_stale_until ON entries (stale_until);
+CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at);
+"""
+
+# Prune after this many written entries
+_PRUNE_EVERY = 500
+
+
+@dataclass
+class SharedEntry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class SharedCache:
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Other workers may hold the write lock briefly - wait for it rather than fail
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Tuple[bytes, float, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._writes = 0
+
+    def namespace(self, name: str, value_type: Any) -> "SharedCacheNamespace":
+        """A view of the cache for one kind of value"""
+        return SharedCacheNamespace(self, name, TypeAdapter(value_type))
+
+    async def get(self, namespace: str, key: str) -> Optional[Tuple[bytes, float, float]]:
+        pending = self._pending.get((namespace, key))
+        if pending is not None:
+            return pending
+        return await asyncio.to_thread(self._get, namespace, key)
+
+    def put(self, namespace: str, key: str, payload: bytes, fresh_until: float, stale_until: float):
+        """Queue a write; queued writes go out together in one transaction"""
+        self._pending[(namespace, key)] = (payload, fresh_until, stale_until)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush())
+
+    async def flush(self):
+        """Wait until every queued write has been committed"""
+        if self._flush_task is not None:
+            await self._flush_task
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def _flush(self):
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except sqlite3.Error as e:
+                logger.warning("Dropped %d shared cache writes: %s", len(batch), e)
+
+    def _get(self, namespace: str, key: str) -> Optional[Tuple[bytes, float, float]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, fresh_until, stale_until FROM entries "
+                "WHERE namespace = ? AND key = ? AND stale_until > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+
+    def _write(self, batch: Dict[Tuple[str, str], Tuple[bytes, float, float]]):
+        now = time.time()
+        rows = [
+            (namespace, key, payload, fresh_until, stale_until, now)
+            for (namespace, key), (payload, fresh_until, stale_until) in batch.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries "
+                "(namespace, key, value, fresh_until, stale_until, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._writes += len(rows)
+            if self._writes >= _PRUNE_EVERY:
+                self._writes = 0
+                self._prune(now)
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM entries WHERE stale_until <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY stored_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+
+class SharedCacheNamespace:
+    def __init__(self, cache: SharedCache, name: str, adapter: TypeAdapter):
+        self.cache = cache
+        self.name = name
+        self.adapter = adapter
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return key if isinstance(key, str) else json.dumps(key, separators=(",", ":"))
+
+    async def get(self, key: Hashable) -> Optional[SharedEntry]:
+        """The shared entry for key if it has not fully expired"""
+        row = await self.cache.get(self.name, self._key(key))
+        if row is None:
+            return None
+        payload, fresh_until, stale_until = row
+        value = self.adapter.validate_json(zlib.decompress(payload))
+        return SharedEntry(value, fresh_until, stale_until)
+
+    def put(self, key: Hashable, value: Any, ttl: float, stale_ttl: float):
+        """Write a value through for the other workers"""
+        payload = zlib.compress(self.adapter.dump_json(value, by_alias=True, exclude_none=True), 6)
+        now = time.time()
+        self.cache.put(self.name, self._key(key), payload, now + ttl, now + ttl + stale_ttl)
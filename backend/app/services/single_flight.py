@@ -0,0 +1,52 @@
+"""
+Single-flight request coalescing - concurrent callers for the same key share one upstream call
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn once for all concurrent callers with the same key and return its result to each"""
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] += 1
+        try:
+            # Shield so that one cancelled caller does not cancel the call for everyone else
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(key) == 1 and self._calls.get(key) is task:
+                # Last caller gave up - nobody is left to use the result
+                task.cancel()
+            raise
+        finally:
+            if key in self._waiters and self._calls.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            # Mark the exception retrieved; waiters already received it
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"inFlight": len(self._calls), "calls": self.calls, "coalesced": self.coalesced}
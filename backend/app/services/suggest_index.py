@@ -0,0 +1,224 @@
+"""
+In-memory typeahead index over titles seen in search and title responses
+
+Each title is stored in the compact shape a search result row needs and indexed
+by the prefixes of its normalized title words. Suggestions are ranked by how
+often the title has been seen or opened here. The index is snapshot to disk
+periodically and on shutdown so it survives restarts.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app import config
+from app.models.justwatch_models import TitleNode
+
+logger = logging.getLogger(__name__)
+
+# Prefixes longer than this are verified against the stored words instead of indexed
+MAX_PREFIX_LENGTH = 12
+
+# Rankings over more candidates than this are memoized until the index next changes
+MEMO_MIN_CANDIDATES = 500
+MEMO_MAX_SIZE = 256
+
+SEARCH_HIT_WEIGHT = 1
+TITLE_HIT_WEIGHT = 3
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_words(text: str) -> List[str]:
+    """Split text into accent-folded, case-folded words"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WORD_RE.findall(folded)
+
+
+def _compact(title: TitleNode) -> dict:
+    content = title.content
+    external_ids = content.external_ids
+    return {
+        "id": title.id,
+        "objectId": title.object_id,
+        "objectType": title.object_type,
+        "content": {
+            "title": content.title,
+            "fullPath": content.full_path,
+            "originalReleaseYear": content.original_release_year,
+            "productionCountries": content.production_countries,
+            "posterUrl": content.poster_url,
+            "externalIds": {
+                "imdbId": external_ids.imdb_id,
+                "tmdbId": external_ids.tmdb_id
+            } if external_ids else None
+        }
+    }
+
+
+class SuggestEntry:
+    __slots__ = ("node", "words", "hits")
+
+    def __init__(self, node: dict, hits: int = 0):
+        self.node = node
+        self.words = tuple(dict.fromkeys(normalize_words(node["content"]["title"])))
+        self.hits = hits
+
+
+class SuggestIndex:
+    def __init__(
+        self,
+        snapshot_path: Optional[str] = config.SUGGEST_SNAPSHOT_PATH,
+        max_entries: int = config.SUGGEST_MAX_ENTRIES,
+        snapshot_interval: float = config.SUGGEST_SNAPSHOT_INTERVAL
+    ):
+        self.snapshot_path = snapshot_path
+        self.max_entries = max_entries
+        self.snapshot_interval = snapshot_interval
+        self._entries: Dict[str, SuggestEntry] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+        self._memo: Dict[Tuple[Tuple[str, ...], int], List[dict]] = {}
+        self._dirty = False
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def start(self):
+        """Load the snapshot and start writing snapshots in the background"""
+        if not self.snapshot_path:
+            return
+        entries = await asyncio.to_thread(self._load_snapshot)
+        for node, hits in entries:
+            self._add(SuggestEntry(node, hits))
+        if self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def stop(self):
+        """Stop the background snapshots and write a final one"""
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+        await self.save()
+
+    def observe(self, titles: Iterable[Optional[TitleNode]], weight: int = SEARCH_HIT_WEIGHT):
+        """Add or refresh titles and count a hit for each"""
+        for title in titles:
+            if title is None or title.content is None or not title.content.title:
+                continue
+            entry = self._entries.get(title.id)
+            node = _compact(title)
+            if entry is None:
+                self._add(SuggestEntry(node, weight))
+            elif entry.node != node:
+                self._remove(title.id)
+                self._add(SuggestEntry(node, entry.hits + weight))
+            else:
+                entry.hits += weight
+            self._dirty = True
+            self._memo.clear()
+        if len(self._entries) > self.max_entries:
+            self._evict()
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """Best-ranked titles whose words start with every word of the query"""
+        words = normalize_words(query)
+        if not words or limit <= 0:
+            return []
+        memo_key = (tuple(words), limit)
+        memoized = self._memo.get(memo_key)
+        if memoized is not None:
+            return memoized
+        candidate_sets = []
+        for word in words:
+            ids = self._prefixes.get(word[:MAX_PREFIX_LENGTH])
+            if not ids:
+                return []
+            candidate_sets.append(ids)
+        candidate_sets.sort(key=len)
+        candidates = candidate_sets[0].intersection(*candidate_sets[1:])
+
+        long_words = [word for word in words if len(word) > MAX_PREFIX_LENGTH]
+        matches = []
+        for node_id in candidates:
+            entry = self._entries[node_id]
+            if long_words and not all(any(w.startswith(word) for w in entry.words) for word in long_words):
+                continue
+            matches.append(entry)
+        best = heapq.nsmallest(limit, matches, key=lambda e: (-e.hits, len(e.node["content"]["title"])))
+        result = [entry.node for entry in best]
+        # Short prefixes match most of the index; remember them while typing bursts hit the same prefix
+        if len(candidates) >= MEMO_MIN_CANDIDATES and len(self._memo) < MEMO_MAX_SIZE:
+            self._memo[memo_key] = result
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "prefixes": len(self._prefixes), "maxSize": self.max_entries}
+
+    def _add(self, entry: SuggestEntry):
+        node_id = entry.node["id"]
+        self._entries[node_id] = entry
+        for word in entry.words:
+            for end in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1):
+                self._prefixes.setdefault(word[:end], set()).add(node_id)
+
+    def _remove(self, node_id: str):
+        entry = self._entries.pop(node_id)
+        for word in entry.words:
+            for end in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1):
+                prefix = word[:end]
+                ids = self._prefixes.get(prefix)
+                if ids is not None:
+                    ids.discard(node_id)
+                    if not ids:
+                        del self._prefixes[prefix]
+
+    def _evict(self):
+        # Drop the least-seen tenth at once so eviction cost is amortized over many inserts
+        excess = len(self._entries) - self.max_entries + max(self.max_entries // 10, 1)
+        for node_id in heapq.nsmallest(excess, self._entries, key=lambda k: self._entries[k].hits):
+            self._remove(node_id)
+
+    async def save(self):
+        """Write a snapshot if anything changed since the last one"""
+        if not self.snapshot_path or not self._dirty:
+            return
+        # Copy on the event loop, write in a thread
+        snapshot = [[entry.node, entry.hits] for entry in self._entries.values()]
+        self._dirty = False
+        await asyncio.to_thread(self._save_snapshot, snapshot)
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self.save()
+
+    def _load_snapshot(self) -> List[Tuple[dict, int]]:
+        if not os.path.exists(self.snapshot_path):
+            return []
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            return [(node, int(hits)) for node, hits in snapshot["entries"] if node["content"]["title"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable suggestion snapshot %s: %s", self.snapshot_path, e)
+            return []
+
+    def _save_snapshot(self, entries: List[list]):
+        # Per-process temp file - several workers may write the same snapshot
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning("Could not write suggestion snapshot %s: %s", self.snapshot_path, e)
@@ -0,0 +1,56 @@
+"""
+Benchmark: fresh httpx client per request vs. the shared pooled client
+
+Usage:
+    python -m benchmarks.bench_http_client [--url URL] [--requests N]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from app.services.http_client import create_http_client
+
+DEFAULT_URL = "https://apis.justwatch.com/content/urls?path=/us/movie/inception"
+
+
+async def _fresh_client(url: str, requests: int) -> list:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            await client.get(url)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _shared_client(url: str, requests: int, http2: bool) -> list:
+    timings = []
+    async with create_http_client(http2=http2) as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            await client.get(url)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(label: str, timings: list):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+    print(f"{label:<22} mean={statistics.mean(timings_ms):8.1f}ms  "
+          f"p50={statistics.median(timings_ms):8.1f}ms  p95={p95:8.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    _report("fresh client", await _fresh_client(args.url, args.requests))
+    _report("shared client (h1.1)", await _shared_client(args.url, args.requests, http2=False))
+    _report("shared client (h2)", await _shared_client(args.url, args.requests, http2=True))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: CPU time per /offers request for the legacy validate-everything pipeline
+vs. the single-parse fast path, on a recorded-style 100-country offers payload
+
+Usage:
+    python -m benchmarks.bench_offers_pipeline [--countries N] [--iterations N]
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import List
+from pydantic import TypeAdapter
+from app.models.justwatch_models import GetOffersEnvelope, GetOffersResponse, OfferDetails, TitleOfferViewModel
+from app.services.currency_converter import CurrencyConverter
+from app.services.justwatch_service import JustWatchService
+from benchmarks.fake_upstream import COUNTRIES, CURRENCIES, offers_payload
+
+offer_list_adapter = TypeAdapter(List[TitleOfferViewModel])
+
+
+def _legacy(service: JustWatchService, raw: bytes) -> bytes:
+    """The pre-fast-path pipeline: dict decode, model validation, validated view models,
+    then response_model validation and serialization"""
+    data = json.loads(raw)
+    offers_response = GetOffersResponse[OfferDetails](**data["data"])
+    result = []
+    for country, offers in offers_response.node.items():
+        for offer in offers:
+            usd_price = service.currency_converter.convert_to_usd(offer.currency, offer.retail_price_value or 0)
+            result.append(TitleOfferViewModel(
+                country=country.upper(),
+                package_url=service._clean_package_url(offer.standard_web_url),
+                package_clear_name=offer.package.clear_name if offer.package else None,
+                retail_price=offer.retail_price,
+                retail_price_value=offer.retail_price_value,
+                normalized_price=usd_price,
+                presentation_type=offer.presentation_type,
+                monetization_type=offer.monetization_type,
+                subtitle_languages=service._format_languages(offer.subtitle_languages),
+                audio_languages=service._format_languages(offer.audio_languages),
+                technology=service._format_technology(offer.video_technology, offer.audio_technology),
+                offer_details=offer
+            ))
+    # FastAPI response_model: dump to plain data, re-validate, serialize
+    plain = offer_list_adapter.dump_python(result, by_alias=True)
+    return offer_list_adapter.dump_json(offer_list_adapter.validate_python(plain), by_alias=True)
+
+
+def _fast(service: JustWatchService, raw: bytes) -> bytes:
+    envelope = GetOffersEnvelope.model_validate_json(raw)
+    offers_response = GetOffersResponse[OfferDetails].model_construct(node=envelope.data.node, failed_countries=[])
+    return offer_list_adapter.dump_json(service.build_offer_view_models(offers_response), by_alias=True)
+
+
+def _measure(fn, service: JustWatchService, raw: bytes, iterations: int) -> List[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.process_time()
+        fn(service, raw)
+        timings.append(time.process_time() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--countries", type=int, default=100)
+    parser.add_argument("--offers-per-country", type=int, default=12)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    raw = json.dumps(offers_payload(COUNTRIES[:args.countries], args.offers_per_country)).encode()
+    converter = CurrencyConverter(snapshot_path=None)
+    converter._swap_rates({currency: 1.0 + i / 10 for i, currency in enumerate(CURRENCIES)}, time.time())
+    service = JustWatchService(converter)
+
+    legacy_output = json.loads(_legacy(service, raw))
+    fast_output = json.loads(_fast(service, raw))
+    assert legacy_output == fast_output, "fast path changed the wire format"
+
+    print(f"payload: {len(raw) / 1024:.0f} KiB, {len(fast_output)} offers")
+    legacy = statistics.median(_measure(_legacy, service, raw, args.iterations)) * 1000
+    fast = statistics.median(_measure(_fast, service, raw, args.iterations)) * 1000
+    print(f"legacy pipeline  {legacy:8.2f} ms CPU/request")
+    print(f"fast pipeline    {fast:8.2f} ms CPU/request")
+    print(f"saved            {legacy - fast:8.2f} ms CPU/request ({(1 - fast / legacy) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
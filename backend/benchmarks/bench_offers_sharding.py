@@ -0,0 +1,48 @@
+"""
+Benchmark: time-to-complete of get_title_offers for several shard sizes vs. a single query
+
+Runs against the synthetic upstream in benchmarks.fake_upstream, where latency grows with the
+number of countries in a document and one country is consistently slow.
+
+Usage:
+    python -m benchmarks.bench_offers_sharding [--countries N] [--rounds N]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from app.services.currency_converter import CurrencyConverter
+from app.services.justwatch_service import JustWatchService
+from benchmarks.fake_upstream import COUNTRIES, make_transport
+
+
+async def _run(countries: list, shard_size: int, rounds: int, transport: httpx.MockTransport) -> list:
+    timings = []
+    async with httpx.AsyncClient(transport=transport) as client:
+        service = JustWatchService(CurrencyConverter(client), client)
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await service.get_title_offers("tm92641", countries, shard_size=shard_size)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--countries", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--slow-country-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    countries = COUNTRIES[:args.countries]
+    transport = make_transport(countries, slow_country_latency=args.slow_country_latency)
+    for shard_size in (0, 50, 25, 10, 5):
+        timings = await _run(countries, shard_size, args.rounds, transport)
+        label = "single query" if shard_size == 0 else f"shard size {shard_size}"
+        print(f"{label:<14} median={statistics.median(timings) * 1000:8.1f}ms  "
+              f"min={min(timings) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark: upstream payload size and parse time per offers query profile, and template rendering
+
+Payloads are synthetic multi-country GetTitleOffers bodies trimmed to the fields each
+profile selects, parsed with that profile's envelope the way _query_title_offers does.
+
+Usage:
+    python -m benchmarks.bench_query_profiles [--countries N] [--offers-per-country N] [--iterations N]
+"""
+import argparse
+import gzip
+import json
+import statistics
+import time
+from typing import List
+from app.services.query_templates import FULL, OFFER_PROFILES, OfferProfile, QueryTemplates
+from benchmarks.fake_upstream import COUNTRIES, offers_payload
+
+
+# Package fields the pricing selection asks for
+_PRICING_PACKAGE_KEYS = {"id", "packageId", "clearName", "technicalName"}
+
+
+def _project(payload: dict, profile: OfferProfile) -> bytes:
+    """The body upstream would send for the profile - the synthetic payload is the full selection"""
+    if profile is FULL:
+        return json.dumps(payload).encode()
+    keys = {field.alias or name for name, field in profile.model.model_fields.items()}
+    node = {}
+    for country, offers in payload["data"]["node"].items():
+        node[country] = [
+            {
+                **{key: value for key, value in offer.items() if key in keys and key != "package"},
+                "package": {key: value for key, value in offer["package"].items() if key in _PRICING_PACKAGE_KEYS},
+            }
+            for offer in offers
+        ]
+    return json.dumps({"data": {"node": node}}).encode()
+
+
+def _parse_times(profile: OfferProfile, raw: bytes, iterations: int) -> List[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        profile.envelope.model_validate_json(raw)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--countries", type=int, default=100)
+    parser.add_argument("--offers-per-country", type=int, default=12)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    countries = COUNTRIES[:args.countries]
+    payload = offers_payload(countries, args.offers_per_country)
+    baseline = None
+    print(f"{args.countries} countries x {args.offers_per_country} offers")
+    for profile in OFFER_PROFILES.values():
+        raw = _project(payload, profile)
+        parse = statistics.median(_parse_times(profile, raw, args.iterations)) * 1000
+        if baseline is None:
+            baseline = (len(raw), parse)
+        print(f"{profile.name:<8} {len(raw) / 1024:8.0f} KiB  {len(gzip.compress(raw)) / 1024:6.0f} KiB gzip  "
+              f"parse {parse:7.2f} ms  ({len(raw) / baseline[0]:.0%} bytes, {parse / baseline[1]:.0%} parse)")
+
+    templates = QueryTemplates()
+    shards = [countries[i:i + 20] for i in range(0, len(countries), 20)]
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for shard in shards:
+            templates._render_title_offers(tuple(shard), FULL)
+    render = (time.perf_counter() - start) / args.iterations * 1e6
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for shard in shards:
+            templates.title_offers(shard)
+    cached = (time.perf_counter() - start) / args.iterations * 1e6
+    uncompacted = len(templates._render_title_offers(tuple(shards[0]), FULL).encode())
+    compacted = len(templates.title_offers(shards[0]).encode())
+    print(f"documents for {len(shards)} shards: rendered {render:.0f} us, from templates {cached:.0f} us; "
+          f"shard document {uncompacted} -> {compacted} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: title cache hit rate and latency at 1, 4 and 8 uvicorn workers, with and without
+the shared L2 cache
+
+Each run starts benchmarks.mock_upstream and the backend with --workers N, sends the same
+rotation of title requests, and reads the upstream's request counter. The hit rate is the
+share of requests answered without a GetTitleNode call upstream.
+
+Usage:
+    python -m benchmarks.bench_shared_cache [--workers 1,4,8] [--requests 2000] [--distinct-titles 200]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Dict
+import httpx
+from benchmarks.load_test import _free_port, run_level, spawn_stack
+
+
+async def measure(base_url: str, mock_url: str, requests: int, concurrency: int, distinct_titles: int) -> Dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    # A fresh connection per request spreads load across workers the way separate clients would
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits,
+                                 headers={"Connection": "close"}) as client:
+        result = await run_level(client, "title", concurrency, requests, distinct_titles)
+    upstream = httpx.get(f"{mock_url}/_stats").json()
+    title_calls = upstream.get("GetTitleNode", 0)
+    result["upstreamTitleCalls"] = title_calls
+    result["hitRate"] = round(1 - title_calls / requests, 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--distinct-titles", type=int, default=200)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'workers':>8}{'shared':>8}{'hit rate':>10}{'upstream':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rps':>9}")
+    for workers in [int(value) for value in args.workers.split(",")]:
+        for shared in (False, True):
+            mock_port = _free_port()
+            env = {"JUSTWATCH_SHARED_CACHE_ENABLED": "true" if shared else "false", "JUSTWATCH_PREFETCH_TOP_K": "0"}
+            with spawn_stack([], workers, env, mock_port) as base_url:
+                result = asyncio.run(measure(
+                    base_url, f"http://127.0.0.1:{mock_port}", args.requests, args.concurrency, args.distinct_titles
+                ))
+            result.update(workers=workers, shared=shared)
+            results.append(result)
+            latency = result["latencyMs"]
+            print(f"{workers:>8}{'on' if shared else 'off':>8}{result['hitRate']:>10.1%}{result['upstreamTitleCalls']:>10}"
+                  f"{latency['p50']:>9.1f}{latency['p95']:>9.1f}{latency['p99']:>9.1f}{result['rps']:>9.1f}")
+            sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
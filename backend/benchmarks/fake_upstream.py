@@ -0,0 +1,156 @@
+"""
+Synthetic JustWatch upstream for benchmarks - answers /graphql and /content/urls in-process
+"""
+import asyncio
+import json
+import random
+import re
+import httpx
+
+COUNTRIES = [
+    "US", "GB", "CA", "AU", "DE", "FR", "ES", "IT", "JP", "BR", "MX", "AR", "IN", "NL", "SE", "NO",
+    "DK", "FI", "IE", "NZ", "AT", "CH", "BE", "PT", "PL", "CZ", "GR", "TR", "ZA", "KR", "CL", "CO",
+    "PE", "EC", "VE", "UY", "PY", "BO", "CR", "PA", "GT", "HN", "SV", "NI", "DO", "JM", "TT", "BS",
+    "BB", "BM", "HU", "RO", "BG", "HR", "SI", "SK", "RS", "BA", "MK", "AL", "EE", "LV", "LT", "IS",
+    "LU", "MT", "CY", "UA", "MD", "BY", "RU", "KZ", "UZ", "AZ", "GE", "AM", "IL", "SA", "AE", "QA",
+    "KW", "BH", "OM", "JO", "LB", "EG", "MA", "DZ", "TN", "LY", "NG", "GH", "KE", "UG", "TZ", "ZM",
+    "SG", "MY", "TH", "ID", "PH", "VN", "HK", "TW", "PK", "LK",
+]
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "BRL", "CAD", "AUD", "INR", "SEK", "KRW"]
+PACKAGES = [
+    (8, "Netflix", "netflix"), (9, "Amazon Prime Video", "amazonprime"), (2, "Apple TV", "itunes"),
+    (3, "Google Play Movies", "play"), (337, "Disney Plus", "disneyplus"), (10, "Amazon Video", "amazon"),
+]
+_ALIAS_RE = re.compile(r"(\w+): offers\(country: (\w+)")
+
+
+def make_offer(country: str, index: int, rng: random.Random) -> dict:
+    package_id, clear_name, technical_name = rng.choice(PACKAGES)
+    price = round(rng.uniform(2, 25), 2)
+    currency = rng.choice(CURRENCIES)
+    return {
+        "id": f"b2Zm{country}{index}",
+        "presentationType": rng.choice(["SD", "HD", "_4K"]),
+        "monetizationType": rng.choice(["FLATRATE", "RENT", "BUY", "ADS", "FREE"]),
+        "retailPrice": f"{price} {currency}",
+        "retailPriceValue": price,
+        "currency": currency,
+        "lastChangeRetailPriceValue": None,
+        "type": "STANDARD",
+        "package": {
+            "id": f"cGF{package_id}",
+            "packageId": package_id,
+            "clearName": clear_name,
+            "technicalName": technical_name,
+            "icon": f"/icon/{package_id}/{{profile}}/{technical_name}.{{format}}",
+            "__typename": "Package",
+        },
+        "standardWebURL": f"https://tv.apple.com/{country.lower()}/movie/{index}?at=1000l3V2&ct=app",
+        "elementCount": 1,
+        "availableTo": None,
+        "deeplinkRoku": None,
+        "subtitleLanguages": ["en", "fr", "de", "es"],
+        "videoTechnology": ["DOLBY_VISION"],
+        "audioTechnology": ["DOLBY_ATMOS", ""],
+        "audioLanguages": ["en", "es"],
+        "__typename": "Offer",
+    }
+
+
+def offers_payload(countries: list, offers_per_country: int = 12, seed: int = 0) -> dict:
+    """Build a GetTitleOffers response body for the given country aliases"""
+    rng = random.Random(seed)
+    node = {
+        country.lower(): [make_offer(country, i, rng) for i in range(offers_per_country)]
+        for country in countries
+    }
+    return {"data": {"node": node}}
+
+
+def search_offers_payload(node_ids: dict, country: str, offers_per_country: int = 12) -> dict:
+    """Build a GetSearchOffers response body for {alias variable: node ID}"""
+    data = {}
+    for seed, key in enumerate(node_ids):
+        offers = offers_payload([country], offers_per_country, seed=seed)["data"]["node"][country.lower()]
+        data[f"n{key[2:]}"] = {"offers": offers}
+    return {"data": data}
+
+
+def url_metadata_payload(countries: list) -> dict:
+    return {
+        "id": 1,
+        "locale": "en_US",
+        "objectType": "MOVIE",
+        "objectId": 1,
+        "fullPath": "/us/movie/inception",
+        "hrefLangTags": [{"locale": f"en_{country}", "href": "/"} for country in countries],
+    }
+
+
+def title_payload(node_id: str) -> dict:
+    return {"data": {"node": {
+        "id": node_id,
+        "objectId": 1,
+        "objectType": "MOVIE",
+        "content": {"title": "Inception", "fullPath": "/us/movie/inception", "originalReleaseYear": 2010},
+    }}}
+
+
+def title_nodes_payload(node_ids: dict) -> dict:
+    """Build a GetTitleNodes response body for {alias variable: node ID}"""
+    return {"data": {f"n{key[2:]}": title_payload(node_id)["data"]["node"] for key, node_id in node_ids.items()}}
+
+
+def search_payload(count: int = 20) -> dict:
+    return {"data": {"popularTitles": {"edges": [
+        {"node": title_payload(f"tm{i}")["data"]["node"]} for i in range(count)
+    ]}}}
+
+
+def make_transport(
+    countries: list = COUNTRIES,
+    base_latency: float = 0.05,
+    per_country_latency: float = 0.004,
+    slow_country_latency: float = 0.0,
+    failing_countries: tuple = (),
+    offers_per_country: int = 12,
+) -> httpx.MockTransport:
+    """Mock transport whose offers latency grows with the number of countries in the document
+
+    The slowest country in a document delays the whole response, and a query containing
+    any failing country returns a GraphQL error for it (null alias), like the real API.
+    """
+    slow_country = countries[-1]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/content/urls":
+            await asyncio.sleep(base_latency)
+            return httpx.Response(200, json=url_metadata_payload(countries))
+
+        body = json.loads(request.content)
+        operation = body.get("operationName")
+        if operation == "GetTitleOffers":
+            aliases = _ALIAS_RE.findall(body["query"])
+            requested = [country for _, country in aliases]
+            delay = base_latency + per_country_latency * len(requested)
+            if slow_country in requested:
+                delay += slow_country_latency
+            await asyncio.sleep(delay)
+            payload = offers_payload(requested, offers_per_country)
+            for country in requested:
+                if country in failing_countries:
+                    payload["data"]["node"][country.lower()] = None
+            return httpx.Response(200, json=payload)
+
+        await asyncio.sleep(base_latency)
+        if operation == "GetSearchTitles":
+            return httpx.Response(200, json=search_payload())
+        if operation in ("GetSearchOffers", "GetTitleNodes"):
+            variables = body["variables"]
+            ids = {key: value for key, value in variables.items() if re.fullmatch(r"id\d+", key)}
+            if operation == "GetTitleNodes":
+                return httpx.Response(200, json=title_nodes_payload(ids))
+            return httpx.Response(200, json=search_offers_payload(ids, variables["country"], offers_per_country))
+        return httpx.Response(200, json=title_payload(body["variables"]["nodeId"]))
+
+    return httpx.MockTransport(handler)
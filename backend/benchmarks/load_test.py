@@ -0,0 +1,243 @@
+"""
+Load driver - p50/p95/p99 latency and RPS for the backend's endpoints at several concurrency levels
+
+With --spawn it starts benchmarks.mock_upstream and the backend (uvicorn) on free local ports,
+so no traffic reaches apis.justwatch.com. Results are written as JSON; pass a previous result
+file to --compare to print the change per endpoint and concurrency level.
+
+Usage:
+    python -m benchmarks.load_test --spawn --concurrency 1,8,32 --output results.json
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ("search", "title", "offers", "locales")
+TITLE_PATH = "/us/movie/inception"
+
+
+def _request_url(endpoint: str, index: int, distinct_titles: int) -> str:
+    title = index % distinct_titles
+    if endpoint == "search":
+        return f"/api/justwatch/search?q=query{title}&country=US"
+    if endpoint == "title":
+        return f"/api/justwatch/title/tm{title}"
+    if endpoint == "offers":
+        return f"/api/justwatch/offers/tm{title}?path={TITLE_PATH}{title}"
+    return f"/api/justwatch/locales?path={TITLE_PATH}{title}"
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(percentile / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    concurrency: int,
+    requests: int,
+    distinct_titles: int
+) -> Dict:
+    """Fire `requests` requests at one endpoint from `concurrency` workers"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.get(_request_url(endpoint, index, distinct_titles))
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latencyMs": {
+            "p50": round(_percentile(latencies_ms, 50), 2),
+            "p95": round(_percentile(latencies_ms, 95), 2),
+            "p99": round(_percentile(latencies_ms, 99), 2),
+            "mean": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+            "max": round(latencies_ms[-1], 2) if latencies_ms else 0.0,
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+@contextmanager
+def spawn_stack(
+    mock_args: List[str],
+    workers: int,
+    extra_env: Optional[Dict[str, str]] = None,
+    mock_port: Optional[int] = None
+) -> Iterator[str]:
+    """Start the upstream stand-in and the backend; yield the backend base URL"""
+    mock_port, backend_port = mock_port or _free_port(), _free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    state_dir = tempfile.mkdtemp(prefix="justwatch-load-")
+    env = {
+        **os.environ,
+        "JUSTWATCH_API_BASE_URL": mock_url,
+        "JUSTWATCH_EXCHANGE_RATE_URL": f"{mock_url}/v6/latest/USD",
+        "JUSTWATCH_CURRENCY_SNAPSHOT_PATH": os.path.join(state_dir, "exchange_rates.json"),
+        "JUSTWATCH_OFFER_STORE_PATH": os.path.join(state_dir, "offers.sqlite3"),
+        "JUSTWATCH_HTTP2": "false",
+        "JUSTWATCH_SUGGEST_SNAPSHOT_PATH": os.path.join(state_dir, "suggestions.json"),
+        "JUSTWATCH_SHARED_CACHE_PATH": os.path.join(state_dir, "shared_cache.sqlite3"),
+        **(extra_env or {}),
+    }
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_upstream", "--port", str(mock_port), *mock_args],
+            cwd=BACKEND_DIR, env=env
+        ),
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        ),
+    ]
+    try:
+        _wait_for(f"{mock_url}/v6/latest/USD")
+        backend_url = f"http://127.0.0.1:{backend_port}"
+        _wait_for(f"{backend_url}/api/health")
+        yield backend_url
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+def compare(previous: Dict, current: Dict):
+    """Print the change in p50/p99/RPS against a previous result file"""
+    baseline = {(r["endpoint"], r["concurrency"]): r for r in previous["results"]}
+    print(f"{'endpoint':<10}{'conc':>6}{'p50 Δ%':>10}{'p99 Δ%':>10}{'rps Δ%':>10}")
+    for result in current["results"]:
+        before = baseline.get((result["endpoint"], result["concurrency"]))
+        if before is None:
+            continue
+
+        def delta(new: float, old: float) -> str:
+            return f"{(new - old) / old * 100:+.1f}" if old else "n/a"
+
+        print(f"{result['endpoint']:<10}{result['concurrency']:>6}"
+              f"{delta(result['latencyMs']['p50'], before['latencyMs']['p50']):>10}"
+              f"{delta(result['latencyMs']['p99'], before['latencyMs']['p99']):>10}"
+              f"{delta(result['rps'], before['rps']):>10}")
+
+
+async def run(base_url: str, endpoints: List[str], levels: List[int], requests: int, distinct_titles: int) -> List[Dict]:
+    results = []
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        for endpoint in endpoints:
+            for concurrency in levels:
+                result = await run_level(client, endpoint, concurrency, requests, distinct_titles)
+                latency = result["latencyMs"]
+                print(f"{endpoint:<8} c={concurrency:<4} rps={result['rps']:>8.1f}  p50={latency['p50']:>8.1f}ms  "
+                      f"p95={latency['p95']:>8.1f}ms  p99={latency['p99']:>8.1f}ms  errors={result['errors']}",
+                      file=sys.stderr)
+                results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", help="Backend to test; omit together with --spawn")
+    parser.add_argument("--spawn", action="store_true", help="Start the mock upstream and backend locally")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when spawning")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and level")
+    parser.add_argument("--distinct-titles", type=int, default=50, help="Distinct titles/queries to rotate through")
+    parser.add_argument("--mock-arg", action="append", default=[], help="Extra argument for mock_upstream")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    if not args.base_url and not args.spawn:
+        parser.error("either --base-url or --spawn is required")
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    def execute(base_url: str) -> List[Dict]:
+        return asyncio.run(run(base_url, endpoints, levels, args.requests, args.distinct_titles))
+
+    if args.spawn:
+        with spawn_stack(args.mock_arg, args.workers) as base_url:
+            results = execute(base_url)
+    else:
+        results = execute(args.base_url)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "spawned": args.spawn,
+            "workers": args.workers if args.spawn else None,
+            "requestsPerLevel": args.requests,
+            "distinctTitles": args.distinct_titles,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Local JustWatch stand-in - serves /graphql, /content/urls and exchange rates with injected latency
+
+Replays recorded responses from --recordings (one JSON body per file: GetTitleOffers.json,
+GetTitleNode.json, GetSearchTitles.json, content_urls.json, exchange_rates.json) and falls back
+to the synthetic payloads in benchmarks.fake_upstream for anything not recorded.
+Recorded offers are trimmed to the countries each query asks for, so sharded fetches work.
+
+Usage:
+    python -m benchmarks.mock_upstream [--port 8900] [--recordings DIR] [--latency 0.08] [--error-rate 0.05]
+
+Then start the backend against it:
+    JUSTWATCH_API_BASE_URL=http://127.0.0.1:8900 \\
+    JUSTWATCH_EXCHANGE_RATE_URL=http://127.0.0.1:8900/v6/latest/USD uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+from collections import Counter
+from typing import Dict, Optional
+from fastapi import FastAPI, Request, Response
+from starlette.requests import ClientDisconnect
+from benchmarks.fake_upstream import (
+    COUNTRIES,
+    CURRENCIES,
+    offers_payload,
+    search_offers_payload,
+    search_payload,
+    title_payload,
+    url_metadata_payload,
+)
+
+_ALIAS_RE = re.compile(r"(\w+): offers\(country: (\w+)")
+
+
+class LatencyModel:
+    def __init__(self, base: float, per_country: float, jitter: float, seed: int = 0):
+        self.base = base
+        self.per_country = per_country
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+
+    def delay(self, countries: int = 0) -> float:
+        # Exponential jitter gives the long right tail real upstreams have
+        tail = self._rng.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0
+        return self.base + self.per_country * countries + tail
+
+
+def _load_recordings(directory: Optional[str]) -> Dict[str, bytes]:
+    recordings = {}
+    if directory:
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    recordings[name[:-len(".json")]] = f.read()
+    return recordings
+
+
+def create_app(
+    recordings_dir: Optional[str] = None,
+    latency: Optional[LatencyModel] = None,
+    countries: int = len(COUNTRIES),
+    offers_per_country: int = 12,
+    error_rate: float = 0.0,
+) -> FastAPI:
+    app = FastAPI(title="JustWatch upstream stand-in")
+    latency = latency or LatencyModel(0.08, 0.002, 0.02)
+    recordings = _load_recordings(recordings_dir)
+    recorded_offers = json.loads(recordings["GetTitleOffers"]) if "GetTitleOffers" in recordings else None
+    locale_countries = COUNTRIES[:countries]
+    synthetic = {
+        "GetSearchTitles": json.dumps(search_payload()).encode(),
+        "content_urls": json.dumps(url_metadata_payload(locale_countries)).encode(),
+        "exchange_rates": json.dumps({"result": "success", "rates": {
+            currency: 1.0 + index / 10 for index, currency in enumerate(CURRENCIES)
+        }}).encode(),
+    }
+
+    def body_for(name: str) -> Optional[bytes]:
+        return recordings.get(name) or synthetic.get(name)
+
+    def offers_body(requested: list) -> bytes:
+        if recorded_offers is None:
+            return json.dumps(offers_payload(requested, offers_per_country)).encode()
+        node = recorded_offers["data"]["node"] or {}
+        return json.dumps({"data": {"node": {
+            country.lower(): node.get(country.lower(), []) for country in requested
+        }}}).encode()
+
+    error_rng = random.Random(1)
+    # Requests served per operation, for benchmarks that measure upstream traffic
+    served: Counter = Counter()
+
+    def injected_error() -> Optional[Response]:
+        if error_rate and error_rng.random() < error_rate:
+            return Response(status_code=503, content=b'{"error": "injected"}', media_type="application/json")
+        return None
+
+    @app.post("/graphql")
+    async def graphql(request: Request):
+        error = injected_error()
+        if error is not None:
+            return error
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # The backend dropped a hedged or cancelled request
+            return Response(status_code=499)
+        operation = body.get("operationName")
+        served[operation] += 1
+        if operation == "GetTitleOffers":
+            requested = [country for _, country in _ALIAS_RE.findall(body["query"])]
+            await asyncio.sleep(latency.delay(len(requested)))
+            content = offers_body(requested)
+        else:
+            await asyncio.sleep(latency.delay())
+            if operation == "GetTitleNode":
+                content = recordings.get(operation) or json.dumps(title_payload(body["variables"]["nodeId"])).encode()
+            elif operation == "GetTitleNodes":
+                ids = {key: value for key, value in body["variables"].items() if re.fullmatch(r"id\d+", key)}
+                content = json.dumps({"data": {
+                    f"n{key[2:]}": title_payload(value)["data"]["node"] for key, value in ids.items()
+                }}).encode()
+            elif operation == "GetSearchOffers":
+                variables = body["variables"]
+                ids = {key: value for key, value in variables.items() if re.fullmatch(r"id\d+", key)}
+                content = json.dumps(search_offers_payload(ids, variables["country"], offers_per_country)).encode()
+            else:
+                content = body_for(operation) or b'{"data": null}'
+        return Response(content=content, media_type="application/json")
+
+    @app.get("/content/urls")
+    async def content_urls():
+        error = injected_error()
+        if error is not None:
+            return error
+        served["content_urls"] += 1
+        await asyncio.sleep(latency.delay())
+        return Response(content=body_for("content_urls"), media_type="application/json")
+
+    @app.get("/v6/latest/USD")
+    async def exchange_rates():
+        return Response(content=body_for("exchange_rates"), media_type="application/json")
+
+    @app.get("/_stats")
+    async def stats():
+        return dict(served)
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--recordings", help="Directory of recorded upstream JSON bodies")
+    parser.add_argument("--latency", type=float, default=0.08, help="Base latency per request (s)")
+    parser.add_argument("--per-country-latency", type=float, default=0.002, help="Extra offers latency per country (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Mean of the exponential latency tail (s)")
+    parser.add_argument("--countries", type=int, default=len(COUNTRIES), help="Locales reported per title")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    app = create_app(
+        args.recordings,
+        LatencyModel(args.latency, args.per_country_latency, args.jitter),
+        countries=args.countries,
+        error_rate=args.error_rate,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Bulk offers export - crawl offers for a list of titles into JSONL or Parquet
+
+Reads "node_id [full_path]" lines, fetches each title's offers across its countries
+(or a fixed --countries list) with bounded concurrency and a global upstream request
+rate, and streams one row per offer to the output. Progress is checkpointed, so
+re-running the same command after an interruption resumes where it stopped.
+
+Usage:
+    python crawl_offers.py titles.txt --output offers.jsonl [--rate 10] [--concurrency 8]
+    python crawl_offers.py titles.txt --output offers/ --format parquet
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from app import config
+from app.services.currency_converter import CurrencyConverter
+from app.services.http_client import create_http_client
+from app.services.justwatch_service import JustWatchService
+from app.services.offer_store import OfferStore
+from app.services import offers_crawler
+from app.services.offers_crawler import Checkpoint, OffersCrawler, RateLimiter, open_writer, read_titles
+
+
+async def crawl(args) -> dict:
+    limiter = RateLimiter(args.rate, args.burst)
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output.rstrip('/')}.checkpoint")
+    writer = open_writer(args.output, args.format)
+    offer_store = None
+    try:
+        async with create_http_client() as http_client:
+            currency_converter = CurrencyConverter(http_client)
+            await currency_converter.start()
+            if args.offer_store:
+                offer_store = OfferStore(
+                    config.OFFER_STORE_PATH,
+                    config.OFFER_STORE_RETENTION_DAYS,
+                    config.OFFER_STORE_MAX_TITLES
+                )
+            service = JustWatchService(currency_converter, http_client, offer_store, throttle=limiter.acquire)
+            crawler = OffersCrawler(
+                service,
+                writer,
+                checkpoint,
+                concurrency=args.concurrency,
+                batch_rows=args.batch_rows,
+                countries=[c.strip().upper() for c in args.countries.split(",")] if args.countries else None
+            )
+            try:
+                stats = await crawler.run(read_titles(args.input))
+            finally:
+                await currency_converter.stop()
+        return stats.summary()
+    finally:
+        writer.close()
+        checkpoint.close()
+        if offer_store is not None:
+            offer_store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="File of node IDs, one per line, optionally followed by the title's full path")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file, or a directory of part files for Parquet")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument("--checkpoint", help="Progress file (default: <output>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Titles crawled at once")
+    parser.add_argument("--rate", type=float, default=10.0, help="Upstream requests per second, 0 for no limit")
+    parser.add_argument("--burst", type=float, default=None, help="Requests allowed in a burst (default: --rate)")
+    parser.add_argument("--batch-rows", type=int, default=5000, help="Rows buffered before a write and checkpoint")
+    parser.add_argument("--countries", help="Comma-separated countries instead of each title's own locales")
+    parser.add_argument("--offer-store", action="store_true", help="Read and update the configured offer store")
+    args = parser.parse_args()
+    if args.format == "parquet" and offers_crawler.pyarrow is None:
+        parser.error("--format parquet requires the pyarrow package")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    try:
+        summary = asyncio.run(crawl(args))
+    except KeyboardInterrupt:
+        print("Interrupted - run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
+    print(json.dumps(summary))
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from app.api.justwatch import router as justwatch_router
+from app import config
+from app.api.justwatch import router as justwatch_router, justwatch_service, currency_converter, cache_policies
+from app.services import metrics
+from app.services.http_cache import NO_STORE, HttpCacheMiddleware
+from app.services.http_client import create_http_client
+from app.services.offer_store import OfferStore
+from app.services.shared_cache import SharedCache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled upstream client per process, shared by all services
+    async with create_http_client() as http_client:
+        justwatch_service.http_client = http_client
+        currency_converter.http_client = http_client
+        # Load exchange rates from the local snapshot and keep them fresh in the background
+        await currency_converter.start()
+        await justwatch_service.suggest_index.start()
+        if config.OFFER_STORE_ENABLED:
+            justwatch_service.offer_store = OfferStore(
+                config.OFFER_STORE_PATH,
+                config.OFFER_STORE_RETENTION_DAYS,
+                config.OFFER_STORE_MAX_TITLES
+            )
+            await asyncio.to_thread(justwatch_service.offer_store.prune)
+        shared_cache = None
+        if config.SHARED_CACHE_ENABLED:
+            # Lets workers reuse each other's cached titles, URL metadata and searches
+            shared_cache = SharedCache(config.SHARED_CACHE_PATH, config.SHARED_CACHE_MAX_ENTRIES)
+            justwatch_service.attach_shared_cache(shared_cache)
+        yield
+        await justwatch_service.prefetcher.stop()
+        await currency_converter.stop()
+        await justwatch_service.suggest_index.stop()
+        if justwatch_service.offer_store is not None:
+            justwatch_service.offer_store.close()
+            justwatch_service.offer_store = None
+        if shared_cache is not None:
+            await shared_cache.flush()
+            justwatch_service.attach_shared_cache(None)
+            shared_cache.close()
+        justwatch_service.http_client = None
+        currency_converter.http_client = None
+
 
 app = FastAPI(
     title="JustWatch Search API",
     description="API for searching movies and TV shows on JustWatch",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -17,7 +64,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Failed-Countries", "X-Failed-Ids", "X-Next-Cursor", "Server-Timing"],
 )
+app.add_middleware(
+    HttpCacheMiddleware,
+    policies={**cache_policies, "/api/health": NO_STORE, "/api/metrics": NO_STORE}
+)
+app.add_middleware(metrics.ServerTimingMiddleware, server_timing=config.SERVER_TIMING_ENABLED)
 
 # Include routers
 app.include_router(justwatch_router)
@@ -28,6 +81,11 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Check if static files exist and mount them
 static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
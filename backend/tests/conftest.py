@@ -0,0 +1,60 @@
+"""
+Shared fixtures - a counting fake upstream with injectable delays and failures, and a service wired to it
+"""
+import asyncio
+from collections import deque
+from typing import Deque, Iterable, List
+import httpx
+import pytest
+from app import config
+from app.services.currency_converter import CurrencyConverter
+from app.services.justwatch_service import JustWatchService
+from benchmarks.fake_upstream import make_transport
+
+
+class FakeUpstream:
+    """Answers like benchmarks.fake_upstream and records every request it receives
+
+    Queue a delay or an HTTP status in `delays` / `statuses` to apply it to the next
+    request; `delay` applies to requests with nothing queued. Offers for the countries
+    in `failing_countries` come back null, like a country the upstream failed to answer.
+    Exchange rate requests are answered too, and counted in `rate_requests` only.
+    """
+
+    def __init__(self, delay: float = 0.0, failing_countries: Iterable[str] = ()):
+        self.delay = delay
+        self.delays: Deque[float] = deque()
+        self.statuses: Deque[int] = deque()
+        self.requests: List[httpx.Request] = []
+        self.failing_countries = set(failing_countries)
+        self.rate_requests = 0
+        self._answer = make_transport(base_latency=0, per_country_latency=0, failing_countries=self.failing_countries)
+        self.transport = httpx.MockTransport(self._handle)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        if str(request.url) == config.EXCHANGE_RATE_URL:
+            self.rate_requests += 1
+            return httpx.Response(200, json={"rates": {"USD": 1.0, "EUR": 0.9, "GBP": 0.8}})
+        self.requests.append(request)
+        delay = self.delays.popleft() if self.delays else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        if self.statuses:
+            return httpx.Response(self.statuses.popleft())
+        return await self._answer.handle_async_request(request)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def upstream() -> FakeUpstream:
+    return FakeUpstream()
+
+
+@pytest.fixture
+async def service(upstream):
+    async with httpx.AsyncClient(transport=upstream.transport) as http_client:
+        yield JustWatchService(CurrencyConverter(snapshot_path=None), http_client)
@@ -0,0 +1,43 @@
+import asyncio
+import httpx
+import pytest
+from app.services.currency_converter import UNKNOWN_CURRENCY_PRICE, CurrencyConverter
+
+pytestmark = pytest.mark.anyio
+
+
+def rates_transport(requests: list) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"rates": {"USD": 1.0, "EUR": 0.5}})
+
+    return httpx.MockTransport(handler)
+
+
+async def test_concurrent_cold_start_fetches_rates_once():
+    requests = []
+    async with httpx.AsyncClient(transport=rates_transport(requests)) as http_client:
+        converter = CurrencyConverter(http_client, snapshot_path=None)
+        await asyncio.gather(*(converter.initialize() for _ in range(10)))
+
+    assert len(requests) == 1
+    assert converter.convert_to_usd("EUR", 10) == 20.0
+
+
+async def test_refresh_always_fetches():
+    requests = []
+    async with httpx.AsyncClient(transport=rates_transport(requests)) as http_client:
+        converter = CurrencyConverter(http_client, snapshot_path=None)
+        await converter.initialize()
+        await converter.refresh()
+
+    assert len(requests) == 2
+
+
+def test_unknown_currency_gets_placeholder_price():
+    converter = CurrencyConverter(snapshot_path=None)
+    converter._swap_rates({"USD": 1.0}, 0)
+
+    assert converter.convert_to_usd("XYZ", 5) == UNKNOWN_CURRENCY_PRICE
+    assert not converter.is_known("XYZ")
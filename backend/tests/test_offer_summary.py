@@ -0,0 +1,42 @@
+from app.models.justwatch_models import OfferPricing
+from app.services.currency_converter import CurrencyConverter
+from app.services.justwatch_service import JustWatchService
+
+
+def offer(offer_id: str, provider: str, price, currency: str, monetization: str = "RENT") -> OfferPricing:
+    return OfferPricing.model_validate({
+        "id": offer_id,
+        "monetizationType": monetization,
+        "retailPriceValue": price,
+        "currency": currency,
+        "package": {"id": provider, "packageId": 1, "clearName": provider}
+    })
+
+
+def make_service() -> JustWatchService:
+    converter = CurrencyConverter(snapshot_path=None)
+    converter._swap_rates({"USD": 1.0, "EUR": 0.5}, 0)
+    return JustWatchService(converter, http_client=None)
+
+
+def test_unknown_currency_is_never_the_cheapest():
+    offers = [
+        offer("a", "Known", 600.0, "EUR"),
+        offer("b", "Mystery", 1.0, "XYZ"),
+        offer("c", "Free", None, "USD", monetization="FREE")
+    ]
+
+    summary = make_service()._summarize("tm1", "US", offers)
+
+    assert summary.cheapest_price == 1200.0
+    assert summary.cheapest_provider == "Known"
+    assert summary.offer_count == 3
+
+
+def test_no_cheapest_price_when_only_unknown_currencies_are_paid():
+    offers = [offer("b", "Mystery", 1.0, "XYZ"), offer("c", "Free", None, "USD", monetization="FREE")]
+
+    summary = make_service()._summarize("tm1", "US", offers)
+
+    assert summary.cheapest_price is None
+    assert summary.cheapest_provider is None
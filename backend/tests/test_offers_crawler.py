@@ -0,0 +1,80 @@
+import json
+import httpx
+import pytest
+from app.services.currency_converter import CurrencyConverter
+from app.services.justwatch_service import JustWatchService
+from app.services.offers_crawler import Checkpoint, JsonlWriter, OffersCrawler
+from tests.conftest import FakeUpstream
+
+pytestmark = pytest.mark.anyio
+
+COUNTRIES = ["US", "GB", "DE"]
+
+
+async def crawl(tmp_path, upstream: FakeUpstream, titles, seed_rates: bool = True):
+    checkpoint = Checkpoint(str(tmp_path / "offers.checkpoint"))
+    writer = JsonlWriter(str(tmp_path / "offers.jsonl"))
+    try:
+        async with httpx.AsyncClient(transport=upstream.transport) as http_client:
+            converter = CurrencyConverter(http_client, snapshot_path=None)
+            if seed_rates:
+                converter._swap_rates({"USD": 1.0}, 0)
+            service = JustWatchService(converter, http_client)
+            crawler = OffersCrawler(service, writer, checkpoint, concurrency=2, countries=COUNTRIES)
+            return await crawler.run(iter(titles))
+    finally:
+        writer.close()
+        checkpoint.close()
+
+
+def written_countries(tmp_path) -> list:
+    with open(tmp_path / "offers.jsonl", encoding="utf-8") as f:
+        return sorted({json.loads(line)["country"] for line in f})
+
+
+def requested_countries(upstream: FakeUpstream) -> list:
+    return sorted(
+        country
+        for request in upstream.requests
+        for country in COUNTRIES
+        if f"offers(country: {country}" in json.loads(request.content)["query"]
+    )
+
+
+async def test_partial_title_is_resumed_for_its_failed_countries_only(tmp_path):
+    first = FakeUpstream(failing_countries=("DE",))
+    stats = await crawl(tmp_path, first, [("tm1", None)])
+
+    assert stats.partial == 1
+    assert written_countries(tmp_path) == ["GB", "US"]
+    assert Checkpoint(str(tmp_path / "offers.checkpoint")).missing_countries("tm1") == ["DE"]
+
+    second = FakeUpstream()
+    stats = await crawl(tmp_path, second, [("tm1", None)])
+
+    assert stats.resumed == 1
+    assert requested_countries(second) == ["DE"]
+    assert written_countries(tmp_path) == ["DE", "GB", "US"]
+    checkpoint = Checkpoint(str(tmp_path / "offers.checkpoint"))
+    assert "tm1" in checkpoint
+    assert checkpoint.missing_countries("tm1") is None
+
+
+async def test_complete_title_is_skipped_on_resume(tmp_path):
+    await crawl(tmp_path, FakeUpstream(), [("tm1", None)])
+
+    again = FakeUpstream()
+    stats = await crawl(tmp_path, again, [("tm1", None)])
+
+    assert stats.skipped == 1
+    assert again.requests == []
+
+
+async def test_fixed_countries_fetch_rates_before_building_rows(tmp_path):
+    upstream = FakeUpstream()
+    stats = await crawl(tmp_path, upstream, [("tm1", None), ("tm2", None)], seed_rates=False)
+
+    assert stats.failed == 0
+    assert stats.titles == 2
+    assert upstream.rate_requests == 1
+    assert written_countries(tmp_path) == ["DE", "GB", "US"]
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from app.services.scheduler import Priority, UpstreamScheduler, priority_floor
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_foreground_caller_promotes_a_queued_prefetch(service, upstream):
+    service.scheduler = UpstreamScheduler(
+        max_concurrency=1,
+        queue_limits={priority: 10 for priority in Priority},
+        queue_timeouts={Priority.INTERACTIVE: 2.0, Priority.BULK: 2.0, Priority.BACKGROUND: 2.0}
+    )
+    # Occupy the only slot
+    upstream.delays.append(0.2)
+    busy = asyncio.create_task(service.get_title("tm1"))
+    await asyncio.sleep(0.02)
+
+    async def prefetch():
+        with priority_floor(Priority.BACKGROUND):
+            return await service.get_title("tm2")
+
+    background = asyncio.create_task(prefetch())
+    await asyncio.sleep(0.02)
+    assert service.scheduler.queue_depth(Priority.BACKGROUND) == 1
+
+    foreground_task = asyncio.create_task(service.get_title("tm2"))
+    await asyncio.sleep(0.02)
+    # Joining moved the shared call out of the background queue
+    assert service.scheduler.queue_depth(Priority.BACKGROUND) == 0
+    assert service.scheduler.queue_depth(Priority.INTERACTIVE) == 1
+
+    foreground = await foreground_task
+    assert foreground.id == "tm2"
+    assert (await background).id == "tm2"
+    await busy
+    # tm1, then one shared request for tm2
+    assert len(upstream.requests) == 2
+    assert service._call_priorities == {}
@@ -0,0 +1,36 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+PATH = "/us/movie/inception"
+
+
+@pytest.fixture
+def priced_service(service):
+    service.currency_converter._swap_rates({"USD": 1.0, "EUR": 0.9, "GBP": 0.8}, 0)
+    return service
+
+
+async def test_partial_index_answers_but_is_not_cached(priced_service, upstream):
+    upstream.failing_countries.add("DE")
+
+    best = await priced_service.get_best_offers("tm1", PATH)
+
+    assert best.failed_countries == ["DE"]
+    assert best.offer_count > 0
+    assert len(priced_service.price_index_cache) == 0
+
+    # Once every country answers, the complete index is cached
+    upstream.failing_countries.clear()
+    best = await priced_service.get_best_offers("tm1", PATH)
+    assert best.failed_countries == []
+    assert len(priced_service.price_index_cache) == 1
+
+
+async def test_index_does_not_keep_view_models(priced_service):
+    await priced_service.get_best_offers("tm1", PATH)
+
+    index = priced_service.price_index_cache.get("tm1").value
+    kept = [offer for builder in index._builders.values() for _, offer in builder.cheapest.values()]
+    assert kept
+    assert not any(hasattr(offer, "offer_details") for offer in kept)
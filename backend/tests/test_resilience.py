@@ -0,0 +1,218 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.services.resilience import CircuitBreaker, ResilientCaller, RetryBudget, UpstreamUnavailableError
+
+pytestmark = pytest.mark.anyio
+
+OPERATION = "GetTitleNode"
+TITLE_QUERY = {"operationName": OPERATION, "variables": {"nodeId": "tm1"}}
+
+
+@pytest.fixture
+async def send(upstream):
+    async with httpx.AsyncClient(transport=upstream.transport) as http_client:
+        async def post() -> dict:
+            response = await http_client.post("https://upstream.test/graphql", json=TITLE_QUERY)
+            response.raise_for_status()
+            return response.json()
+
+        yield post
+
+
+def make_caller(
+    max_retries: int = 2,
+    budget: float = 10.0,
+    hedge_percentile=None,
+    failure_threshold: int = 5,
+    reset_timeout: float = 0.05,
+    throttle=None
+) -> ResilientCaller:
+    return ResilientCaller(
+        max_retries=max_retries,
+        backoff_base=0.001,
+        backoff_max=0.005,
+        hedge_percentile=hedge_percentile,
+        hedge_min_delay=0.02,
+        budget=RetryBudget(ratio=0.0, initial=budget, cap=budget),
+        breaker=CircuitBreaker(failure_threshold, reset_timeout),
+        throttle=throttle
+    )
+
+
+async def test_transient_errors_are_retried(upstream, send):
+    caller = make_caller()
+    upstream.statuses.extend([503, 502])
+
+    body = await caller.call(OPERATION, send)
+
+    assert body["data"]["node"]["id"] == "tm1"
+    assert len(upstream.requests) == 3
+    assert caller.budget.tokens == 8
+
+
+async def test_client_errors_are_not_retried(upstream, send):
+    caller = make_caller()
+    upstream.statuses.append(404)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await caller.call(OPERATION, send)
+    assert len(upstream.requests) == 1
+
+
+async def test_exhausted_retry_budget_stops_retries(upstream, send):
+    caller = make_caller(budget=0.0)
+    upstream.statuses.extend([503, 503])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await caller.call(OPERATION, send)
+    assert len(upstream.requests) == 1
+
+
+async def test_slow_request_is_hedged(upstream, send):
+    caller = make_caller(hedge_percentile=90)
+    for _ in range(20):
+        caller.latencies.record(OPERATION, 0.01)
+    # The first attempt stalls; the hedge answers at once
+    upstream.delays.append(1.0)
+
+    start = time.perf_counter()
+    body = await caller.call(OPERATION, send)
+
+    assert body["data"]["node"]["id"] == "tm1"
+    assert time.perf_counter() - start < 0.5
+    assert len(upstream.requests) == 2
+    assert caller.budget.tokens == 9
+
+
+async def test_hedge_is_skipped_without_budget(upstream, send):
+    caller = make_caller(hedge_percentile=90, budget=0.0)
+    for _ in range(20):
+        caller.latencies.record(OPERATION, 0.01)
+    upstream.delays.append(0.1)
+
+    await caller.call(OPERATION, send)
+    assert len(upstream.requests) == 1
+
+
+async def test_breaker_opens_probes_and_closes(upstream, send):
+    caller = make_caller(max_retries=0, failure_threshold=2)
+    upstream.statuses.extend([503, 503])
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(OPERATION, send)
+    assert caller.breaker.is_open
+
+    # Open: rejected locally, the upstream is not asked
+    with pytest.raises(UpstreamUnavailableError):
+        await caller.call(OPERATION, send)
+    assert len(upstream.requests) == 2
+
+    # Half-open: one probe goes through and its success closes the breaker
+    await asyncio.sleep(0.06)
+    await caller.call(OPERATION, send)
+    assert not caller.breaker.is_open
+    await caller.call(OPERATION, send)
+    assert len(upstream.requests) == 4
+
+
+async def test_failed_probe_reopens_the_breaker(upstream, send):
+    caller = make_caller(max_retries=0, failure_threshold=1)
+    upstream.statuses.extend([503, 503])
+    with pytest.raises(httpx.HTTPStatusError):
+        await caller.call(OPERATION, send)
+
+    await asyncio.sleep(0.06)
+    with pytest.raises(httpx.HTTPStatusError):
+        await caller.call(OPERATION, send)
+    assert caller.breaker.is_open
+    with pytest.raises(UpstreamUnavailableError):
+        await caller.call(OPERATION, send)
+
+
+async def test_only_one_probe_at_a_time(upstream, send):
+    caller = make_caller(max_retries=0, failure_threshold=1)
+    upstream.statuses.append(503)
+    with pytest.raises(httpx.HTTPStatusError):
+        await caller.call(OPERATION, send)
+    await asyncio.sleep(0.06)
+
+    upstream.delays.append(0.05)
+    probe = asyncio.create_task(caller.call(OPERATION, send))
+    await asyncio.sleep(0.01)
+    with pytest.raises(UpstreamUnavailableError):
+        await caller.call(OPERATION, send)
+    await probe
+    assert not caller.breaker.is_open
+
+
+async def test_cancelled_probe_releases_the_half_open_slot(upstream, send):
+    caller = make_caller(max_retries=0, failure_threshold=1)
+    upstream.statuses.append(503)
+    with pytest.raises(httpx.HTTPStatusError):
+        await caller.call(OPERATION, send)
+    await asyncio.sleep(0.06)
+
+    upstream.delays.append(1.0)
+    probe = asyncio.create_task(caller.call(OPERATION, send))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    # The next caller becomes the probe instead of being rejected forever
+    await caller.call(OPERATION, send)
+    assert not caller.breaker.is_open
+
+
+async def test_shed_probe_releases_the_half_open_slot(upstream, send):
+    caller = make_caller(max_retries=0, failure_threshold=1)
+    upstream.statuses.append(503)
+    with pytest.raises(httpx.HTTPStatusError):
+        await caller.call(OPERATION, send)
+    await asyncio.sleep(0.06)
+
+    async def shed():
+        raise UpstreamUnavailableError("Upstream queue is full", 1.0)
+
+    with pytest.raises(UpstreamUnavailableError):
+        await caller.call(OPERATION, shed)
+
+    # The shed request was not the probe; the next caller is
+    await caller.call(OPERATION, send)
+    assert not caller.breaker.is_open
+
+
+async def test_throttle_wait_is_not_timed_or_hedged(upstream, send):
+    waits = 0
+
+    async def throttle():
+        nonlocal waits
+        waits += 1
+        await asyncio.sleep(0.1)
+
+    caller = make_caller(hedge_percentile=90, throttle=throttle)
+    for _ in range(20):
+        caller.latencies.record(OPERATION, 0.01)
+
+    await caller.call(OPERATION, send)
+
+    assert len(upstream.requests) == 1
+    assert waits == 1
+    assert caller.latencies.percentile(OPERATION, 100) < 0.1
+
+
+async def test_every_attempt_takes_a_throttle_turn(upstream, send):
+    waits = 0
+
+    async def throttle():
+        nonlocal waits
+        waits += 1
+
+    caller = make_caller(throttle=throttle)
+    upstream.statuses.extend([503, 503])
+
+    await caller.call(OPERATION, send)
+
+    assert waits == len(upstream.requests) == 3
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.services.scheduler import (
+    Priority,
+    SharedPriority,
+    UpstreamOverloadedError,
+    UpstreamScheduler,
+    shared_priority
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def make_scheduler(max_concurrency: int = 4, background_share: float = 0.5) -> UpstreamScheduler:
+    return UpstreamScheduler(
+        max_concurrency=max_concurrency,
+        queue_limits={priority: 10 for priority in Priority},
+        queue_timeouts={priority: 0.2 for priority in Priority},
+        background_share=background_share
+    )
+
+
+async def hold(scheduler: UpstreamScheduler, priority: Priority, release: asyncio.Event):
+    async with scheduler.slot(priority):
+        await release.wait()
+
+
+async def test_background_work_is_capped_at_its_share():
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+    holders = [asyncio.create_task(hold(scheduler, Priority.BACKGROUND, release)) for _ in range(4)]
+    await asyncio.sleep(0.01)
+
+    assert scheduler.stats()["backgroundActive"] == 2
+    assert scheduler.queue_depth(Priority.BACKGROUND) == 2
+
+    # The reserved headroom is free for foreground work straight away
+    async with scheduler.slot(Priority.INTERACTIVE):
+        assert scheduler.queue_depth(Priority.INTERACTIVE) == 0
+
+    release.set()
+    await asyncio.gather(*holders)
+    assert scheduler.active == 0
+
+
+async def test_queued_background_work_starts_when_a_background_slot_frees():
+    scheduler = make_scheduler(max_concurrency=2)
+    first, second = asyncio.Event(), asyncio.Event()
+    running = asyncio.create_task(hold(scheduler, Priority.BACKGROUND, first))
+    queued = asyncio.create_task(hold(scheduler, Priority.BACKGROUND, second))
+    await asyncio.sleep(0.01)
+    assert scheduler.queue_depth(Priority.BACKGROUND) == 1
+
+    first.set()
+    await running
+    await asyncio.sleep(0.01)
+    assert scheduler.stats()["backgroundActive"] == 1
+    second.set()
+    await queued
+
+
+async def test_capped_background_waiter_is_shed_after_its_timeout():
+    scheduler = make_scheduler(max_concurrency=2)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(scheduler, Priority.BACKGROUND, release))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(UpstreamOverloadedError):
+        async with scheduler.slot(Priority.BACKGROUND):
+            pass
+    release.set()
+    await running
+    assert scheduler.active == 0
+
+
+async def test_promoted_waiter_moves_to_the_foreground_queue():
+    scheduler = UpstreamScheduler(
+        max_concurrency=1,
+        queue_limits={priority: 10 for priority in Priority},
+        queue_timeouts={Priority.INTERACTIVE: 1.0, Priority.BULK: 1.0, Priority.BACKGROUND: 0.05}
+    )
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(scheduler, Priority.INTERACTIVE, release))
+    await asyncio.sleep(0.01)
+
+    shared = SharedPriority(Priority.BACKGROUND)
+
+    async def shared_call():
+        with shared_priority(shared):
+            async with scheduler.slot(Priority.INTERACTIVE):
+                return "done"
+
+    call = asyncio.create_task(shared_call())
+    await asyncio.sleep(0.01)
+    assert scheduler.queue_depth(Priority.BACKGROUND) == 1
+
+    shared.raise_to(Priority.INTERACTIVE)
+    await asyncio.sleep(0.01)
+    assert scheduler.queue_depth(Priority.BACKGROUND) == 0
+    assert scheduler.queue_depth(Priority.INTERACTIVE) == 1
+
+    # Past the background timeout - a promoted waiter is held to the interactive one
+    await asyncio.sleep(0.1)
+    release.set()
+    assert await call == "done"
+    await running
+    assert scheduler.active == 0
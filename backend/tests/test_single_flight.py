@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.services.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+CALLERS = 20
+
+
+async def test_concurrent_title_lookups_share_one_upstream_call(service, upstream):
+    upstream.delay = 0.05
+    titles = await asyncio.gather(*(service.get_title("tm1") for _ in range(CALLERS)))
+
+    assert len(upstream.requests) == 1
+    assert {title.id for title in titles} == {"tm1"}
+    assert service.single_flight.stats() == {"inFlight": 0, "calls": 1, "coalesced": CALLERS - 1}
+
+
+async def test_concurrent_offer_lookups_share_one_upstream_call(service, upstream):
+    upstream.delay = 0.05
+    responses = await asyncio.gather(
+        *(service.get_title_offers("tm1", ["US", "GB", "DE"]) for _ in range(CALLERS))
+    )
+
+    assert len(upstream.requests) == 1
+    assert all(set(response.node) == {"us", "gb", "de"} for response in responses)
+
+
+async def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(flight.do("key", fetch))
+    second = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "result"
+    assert first.cancelled()
+    assert calls == 1
+    assert len(flight) == 0
+
+
+async def test_last_waiter_cancelling_cancels_the_shared_call():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flight.do("key", fetch))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    # The done callback that forgets the call runs on the next loop iteration
+    await asyncio.sleep(0)
+
+    assert len(flight) == 0
+
+
+async def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream broke")
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert calls == 1
+
+    with pytest.raises(ValueError):
+        await flight.do("key", fetch)
+    assert calls == 2
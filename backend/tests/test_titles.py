@@ -0,0 +1,46 @@
+import pytest
+from app import config
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_titles_are_served_from_the_title_cache(service, upstream):
+    await service.get_title("tm1")
+    upstream.requests.clear()
+
+    titles, failed_ids = await service.get_titles(["tm1", "tm2", "tm1"])
+
+    assert [title.id for title in titles] == ["tm1", "tm2", "tm1"]
+    assert failed_ids == []
+    # Only tm2 was fetched
+    assert len(upstream.requests) == 1
+
+
+async def test_stale_titles_are_served_and_revalidated(service, upstream):
+    await service.get_title("tm1")
+    service.title_cache.get("tm1").fresh_until = 0
+    upstream.requests.clear()
+
+    titles, _ = await service.get_titles(["tm1"])
+
+    assert titles[0].id == "tm1"
+    assert service.title_cache.stale_hits == 1
+
+
+async def test_failed_batch_only_fails_its_own_ids(service, upstream, monkeypatch):
+    monkeypatch.setattr(config, "TITLES_BATCH_SIZE", 2)
+    # A 4xx is not retried, so exactly one batch fails
+    upstream.statuses.append(400)
+
+    titles, failed_ids = await service.get_titles(["tm1", "tm2", "tm3", "tm4"])
+
+    assert len(failed_ids) == 2
+    for node_id, title in zip(["tm1", "tm2", "tm3", "tm4"], titles):
+        assert (title is None) == (node_id in failed_ids)
+
+
+async def test_all_batches_failing_raises(service, upstream):
+    upstream.statuses.append(400)
+
+    with pytest.raises(Exception):
+        await service.get_titles(["tm1"])
@@ -46,8 +46,17 @@ export interface SearchResult {
 	edges: TitleNodeWrapper[];
 }
 
+export interface OfferSummary {
+	offerCount: number;
+	monetizationCounts: Record<string, number>;
+	cheapestPrice?: number;
+	cheapestProvider?: string;
+	topProviders: string[];
+}
+
 export interface SearchTitlesResponse {
 	popularTitles: SearchResult;
+	offerSummaries?: Record<string, OfferSummary>;
 }
 
 export interface OfferPackage {
@@ -93,6 +102,209 @@ export interface TitleOfferViewModel {
 	offerDetails: OfferDetails;
 }
 
+export type OfferSortKey = 'country' | 'provider' | 'type' | 'priceLocal' | 'priceUSD' | 'quality';
+
+export interface OffersQuery {
+	monetizationType?: string[];
+	excludeMonetizationType?: string[];
+	presentationType?: string[];
+	country?: string[];
+	maxPrice?: number;
+	provider?: string;
+	cheapest?: boolean;
+	sort?: OfferSortKey;
+	order?: 'asc' | 'desc';
+	limit?: number;
+	cursor?: string;
+}
+
+export interface OffersPage {
+	offers: TitleOfferViewModel[];
+	nextCursor: string | null;
+	failedCountries: string[];
+}
+
+export interface OffersBatch {
+	offers: TitleOfferViewModel[];
+	failedCountries: string[];
+}
+
+export interface TitleFullResponse {
+	title: TitleNode;
+	locales: string[];
+	offers: TitleOfferViewModel[];
+	failedCountries: string[];
+}
+
+export interface PriceEntry {
+	country: string;
+	provider: string | null;
+	monetizationType: string | null;
+	presentationType: string | null;
+	retailPrice: string | null;
+	retailPriceValue: number | null;
+	currency: string | null;
+	normalizedPrice: number;
+	packageUrl: string | null;
+}
+
+export interface BestOffersQuery {
+	monetizationType?: string;
+	provider?: string;
+	quality?: '4K' | 'HD' | 'SD';
+	limit?: number;
+}
+
+export interface BestOffersResponse {
+	nodeId: string;
+	monetizationType: string | null;
+	provider: string | null;
+	quality: string | null;
+	offerCount: number;
+	pricedCount: number;
+	unknownCurrencyCount: number;
+	unknownCurrencies: string[];
+	cheapest: PriceEntry[];
+	percentiles: { min: number; p25: number; median: number; p75: number; max: number } | null;
+	facets: { monetizationTypes: string[]; providers: string[]; qualities: string[] };
+	builtAt: number;
+}
+
+export const COLUMNAR_OFFERS_MEDIA_TYPE = 'application/vnd.justwatch.offers+json; format=columnar-v1';
+
+type Nullable<T> = T | null;
+
+/** Offers as column arrays with dictionary-encoded repeats (`format=compact`). */
+export interface ColumnarOffers {
+	format: 'columnar-v1';
+	count: number;
+	dictionaries: {
+		countries: string[];
+		packages: OfferPackage[];
+		strings: string[];
+		lists: string[][];
+	};
+	columns: {
+		country: number[];
+		id: string[];
+		package: Nullable<number>[];
+		presentationType: Nullable<number>[];
+		monetizationType: Nullable<number>[];
+		type: Nullable<number>[];
+		currency: Nullable<number>[];
+		retailPrice: Nullable<string>[];
+		retailPriceValue: Nullable<number>[];
+		lastChangeRetailPriceValue: Nullable<number>[];
+		normalizedPrice: number[];
+		standardWebURL: Nullable<string>[];
+		/** A length means "this many leading characters of standardWebURL". */
+		packageUrl: Nullable<number | string>[];
+		elementCount: Nullable<number>[];
+		availableTo: any[];
+		deeplinkRoku: Nullable<string>[];
+		subtitleLanguages: Nullable<number>[];
+		audioLanguages: Nullable<number>[];
+		videoTechnology: Nullable<number>[];
+		audioTechnology: Nullable<number>[];
+	};
+}
+
+const joinOrUndefined = (values?: string[]) => (values && values.length > 0 ? values.join(', ') : undefined);
+
+/**
+ * One row of a columnar offers table. Fields are read from the columns on access,
+ * and the nested offer details are only built if something asks for them.
+ */
+class ColumnarOfferRow implements TitleOfferViewModel {
+	private details?: OfferDetails;
+
+	constructor(
+		private readonly table: ColumnarOffers,
+		private readonly index: number
+	) {}
+
+	private string(column: Nullable<number>[]): string | undefined {
+		const ref = column[this.index];
+		return ref === null ? undefined : this.table.dictionaries.strings[ref];
+	}
+
+	private list(column: Nullable<number>[]): string[] | undefined {
+		const ref = column[this.index];
+		return ref === null ? undefined : this.table.dictionaries.lists[ref];
+	}
+
+	private get pkg(): OfferPackage | undefined {
+		const ref = this.table.columns.package[this.index];
+		return ref === null ? undefined : this.table.dictionaries.packages[ref];
+	}
+
+	get country() {
+		return this.table.dictionaries.countries[this.table.columns.country[this.index]];
+	}
+	get packageUrl() {
+		const ref = this.table.columns.packageUrl[this.index];
+		if (typeof ref === 'number') return this.table.columns.standardWebURL[this.index]?.slice(0, ref);
+		return ref ?? undefined;
+	}
+	get packageClearName() {
+		return this.pkg?.clearName;
+	}
+	get retailPrice() {
+		return this.table.columns.retailPrice[this.index] ?? undefined;
+	}
+	get retailPriceValue() {
+		return this.table.columns.retailPriceValue[this.index] ?? undefined;
+	}
+	get normalizedPrice() {
+		return this.table.columns.normalizedPrice[this.index];
+	}
+	get presentationType() {
+		return this.string(this.table.columns.presentationType);
+	}
+	get monetizationType() {
+		return this.string(this.table.columns.monetizationType);
+	}
+	get subtitleLanguages() {
+		return joinOrUndefined(this.list(this.table.columns.subtitleLanguages));
+	}
+	get audioLanguages() {
+		return joinOrUndefined(this.list(this.table.columns.audioLanguages));
+	}
+	get technology() {
+		const video = this.list(this.table.columns.videoTechnology) ?? [];
+		const audio = this.list(this.table.columns.audioTechnology) ?? [];
+		return joinOrUndefined([...video, ...audio].filter(Boolean));
+	}
+	get offerDetails(): OfferDetails {
+		const { columns } = this.table;
+		const i = this.index;
+		return (this.details ??= {
+			id: columns.id[i],
+			presentationType: this.presentationType,
+			monetizationType: this.monetizationType,
+			retailPrice: this.retailPrice,
+			retailPriceValue: this.retailPriceValue,
+			currency: this.string(columns.currency),
+			lastChangeRetailPriceValue: columns.lastChangeRetailPriceValue[i] ?? undefined,
+			type: this.string(columns.type),
+			package: this.pkg,
+			standardWebURL: columns.standardWebURL[i] ?? undefined,
+			elementCount: columns.elementCount[i] ?? undefined,
+			availableTo: columns.availableTo[i],
+			deeplinkRoku: columns.deeplinkRoku[i] ?? undefined,
+			subtitleLanguages: this.list(columns.subtitleLanguages),
+			videoTechnology: this.list(columns.videoTechnology),
+			audioTechnology: this.list(columns.audioTechnology),
+			audioLanguages: this.list(columns.audioLanguages)
+		});
+	}
+}
+
+/** Wrap a columnar table as view models without decoding any row up front. */
+export function decodeColumnarOffers(table: ColumnarOffers): TitleOfferViewModel[] {
+	return Array.from({ length: table.count }, (_, index) => new ColumnarOfferRow(table, index));
+}
+
 class JustWatchAPI {
 	private baseUrl: string;
 
@@ -100,14 +312,24 @@ class JustWatchAPI {
 		this.baseUrl = baseUrl;
 	}
 
-	async searchTitles(query: string, country: string = 'US'): Promise<SearchTitlesResponse> {
-		const response = await fetch(`${this.baseUrl}/search?q=${encodeURIComponent(query)}&country=${country}`);
+	async searchTitles(query: string, country: string = 'US', enrich: boolean = false): Promise<SearchTitlesResponse> {
+		const params = new URLSearchParams({ q: query, country });
+		if (enrich) params.set('enrich', 'true');
+		const response = await fetch(`${this.baseUrl}/search?${params}`);
 		if (!response.ok) {
 			throw new Error(`Search failed: ${response.statusText}`);
 		}
 		return response.json();
 	}
 
+	async suggestTitles(query: string, limit: number = 10): Promise<TitleNode[]> {
+		const response = await fetch(`${this.baseUrl}/suggest?q=${encodeURIComponent(query)}&limit=${limit}`);
+		if (!response.ok) {
+			throw new Error(`Suggest failed: ${response.statusText}`);
+		}
+		return response.json();
+	}
+
 	async getTitle(nodeId: string): Promise<TitleNode> {
 		const response = await fetch(`${this.baseUrl}/title/${nodeId}`);
 		if (!response.ok) {
@@ -116,6 +338,27 @@ class JustWatchAPI {
 		return response.json();
 	}
 
+	async getTitleFull(nodeId: string, path?: string): Promise<TitleFullResponse> {
+		const params = path ? `?path=${encodeURIComponent(path)}` : '';
+		const response = await fetch(`${this.baseUrl}/title/${nodeId}/full${params}`, {
+			headers: { Accept: COLUMNAR_OFFERS_MEDIA_TYPE }
+		});
+		if (!response.ok) {
+			throw new Error(`Failed to get title: ${response.statusText}`);
+		}
+		const body = await response.json();
+		return { ...body, offers: decodeColumnarOffers(body.offers) };
+	}
+
+	async getTitles(nodeIds: string[]): Promise<(TitleNode | null)[]> {
+		const params = new URLSearchParams({ ids: nodeIds.join(',') });
+		const response = await fetch(`${this.baseUrl}/titles?${params}`);
+		if (!response.ok) {
+			throw new Error(`Failed to get titles: ${response.statusText}`);
+		}
+		return response.json();
+	}
+
 	async getTitleOffers(nodeId: string, path: string): Promise<TitleOfferViewModel[]> {
 		const response = await fetch(`${this.baseUrl}/offers/${nodeId}?path=${encodeURIComponent(path)}`);
 		if (!response.ok) {
@@ -124,6 +367,93 @@ class JustWatchAPI {
 		return response.json();
 	}
 
+	/**
+	 * Get a filtered, sorted page of offers. Filtering happens on the server,
+	 * so only the matching rows are downloaded.
+	 */
+	async queryTitleOffers(nodeId: string, path: string, query: OffersQuery = {}): Promise<OffersPage> {
+		const params = new URLSearchParams({ path });
+		const lists: [string, string[] | undefined][] = [
+			['monetization_type', query.monetizationType],
+			['exclude_monetization_type', query.excludeMonetizationType],
+			['presentation_type', query.presentationType],
+			['country', query.country]
+		];
+		for (const [name, values] of lists) {
+			values?.forEach((value) => params.append(name, value));
+		}
+		if (query.maxPrice !== undefined) params.set('max_price', String(query.maxPrice));
+		if (query.provider) params.set('provider', query.provider);
+		if (query.cheapest) params.set('cheapest', 'true');
+		if (query.sort) params.set('sort', query.sort);
+		if (query.order) params.set('order', query.order);
+		if (query.limit !== undefined) params.set('limit', String(query.limit));
+		if (query.cursor) params.set('cursor', query.cursor);
+
+		const response = await fetch(`${this.baseUrl}/offers/${nodeId}?${params}`, {
+			headers: { Accept: COLUMNAR_OFFERS_MEDIA_TYPE }
+		});
+		if (!response.ok) {
+			throw new Error(`Failed to get offers: ${response.statusText}`);
+		}
+		const failed = response.headers.get('X-Failed-Countries');
+		return {
+			offers: decodeColumnarOffers(await response.json()),
+			nextCursor: response.headers.get('X-Next-Cursor'),
+			failedCountries: failed ? failed.split(',') : []
+		};
+	}
+
+	/**
+	 * Stream offers shard by shard as the backend resolves them (NDJSON).
+	 * Yields each batch as soon as its line arrives.
+	 */
+	async *streamTitleOffers(nodeId: string, path: string): AsyncGenerator<OffersBatch> {
+		const response = await fetch(`${this.baseUrl}/offers/${nodeId}/stream?path=${encodeURIComponent(path)}`);
+		if (!response.ok || !response.body) {
+			throw new Error(`Failed to get offers: ${response.statusText}`);
+		}
+
+		const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+		let buffer = '';
+		try {
+			while (true) {
+				const { done, value } = await reader.read();
+				if (done) break;
+				buffer += value;
+
+				let newline: number;
+				while ((newline = buffer.indexOf('\n')) !== -1) {
+					const line = buffer.slice(0, newline).trim();
+					buffer = buffer.slice(newline + 1);
+					if (line) yield JSON.parse(line) as OffersBatch;
+				}
+			}
+			if (buffer.trim()) yield JSON.parse(buffer) as OffersBatch;
+		} finally {
+			reader.releaseLock();
+		}
+	}
+
+	/**
+	 * Cheapest countries for a title under a filter, from the server's price index.
+	 * Passing the path lets the server fetch offers if the title isn't indexed yet.
+	 */
+	async getBestOffers(nodeId: string, path?: string, query: BestOffersQuery = {}): Promise<BestOffersResponse> {
+		const params = new URLSearchParams();
+		if (path) params.set('path', path);
+		if (query.monetizationType) params.set('monetization_type', query.monetizationType);
+		if (query.provider) params.set('provider', query.provider);
+		if (query.quality) params.set('quality', query.quality);
+		if (query.limit !== undefined) params.set('limit', String(query.limit));
+
+		const response = await fetch(`${this.baseUrl}/offers/${nodeId}/best?${params}`);
+		if (!response.ok) {
+			throw new Error(`Failed to get best offers: ${response.statusText}`);
+		}
+		return response.json();
+	}
+
 	async getAvailableLocales(path: string): Promise<string[]> {
 		const response = await fetch(`${this.baseUrl}/locales?path=${encodeURIComponent(path)}`);
 		if (!response.ok) {